@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import zlib
+import random
+from typing import Optional, Iterator
+from urllib.parse import quote
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import SENTENCE_LEVEL_LAYERS, DOCUMENT_LEVEL_LAYERS
+
+"""
+Synthetic modu-format corpus generator for benchmarking
+
+All lexical items below are written in the same "form/TAG+form/TAG" notation as `POSLayer.tostring()`,
+so every word of a generated sentence carries its own morpheme analysis and the character spans of
+every layer (`pos`, `wsd`, `ner`, `el`, `dep`, `srl`, `za`, `cr`) are derived from the same layout.
+"""
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+COMMON_NOUNS = [
+    '학교/NNG', '정부/NNG', '회사/NNG', '시장/NNG', '문제/NNG', '사람/NNG', '경제/NNG', '도시/NNG', '대회/NNG',
+    '바람/NNG', '조건/NNG', '결과/NNG', '사회/NNG', '기술/NNG', '문화/NNG', '정책/NNG', '가격/NNG', '계획/NNG',
+    '선수/NNG', '시민/NNG', '환경/NNG', '교육/NNG', '연구/NNG', '지역/NNG', '사업/NNG', '관계/NNG', '방법/NNG'
+]
+ADVERBS = ['가장/MAG', '다시/MAG', '함께/MAG', '이미/MAG', '크게/MAG', '특히/MAG', '모두/MAG']
+VERB_STEMS = [
+    '받/VV', '만들/VV', '열/VV', '보/VV', '찾/VV', '늘/VV', '밝히/VV', '오르/VV', '나오/VV', '달/VV', '가/VV',
+    '알리/VV', '바꾸/VV', '이루/VV', '지키/VV', '높/VA', '크/VA', '어렵/VA'
+]
+PARTICLES = {
+    '이/JKS': ('NP_SBJ', 'ARG0'),
+    '는/JX': ('NP_SBJ', 'ARG0'),
+    '을/JKO': ('NP_OBJ', 'ARG1'),
+    '를/JKO': ('NP_OBJ', 'ARG1'),
+    '에/JKB': ('NP_AJT', 'ARGM-LOC'),
+    '에서/JKB': ('NP_AJT', 'ARGM-LOC'),
+    '의/JKG': ('NP_MOD', None),
+}
+CONNECTIVES = {'고/EC': 'VP', '면서/EC': 'VP', '어/EC': 'VP', '는/ETM': 'VP_MOD', '은/ETM': 'VP_MOD'}
+ENTITIES = {
+    'PS_NAME': ['김민수/NNP', '이영희/NNP', '박지성/NNP', '최현수/NNP'],
+    'LCP_COUNTRY': ['한국/NNP', '일본/NNP', '미국/NNP'],
+    'LCP_CITY': ['서울/NNP', '부산/NNP', '대구/NNP'],
+    'OGG_ECONOMY': ['삼성전자/NNP', '현대자동차/NNP', '한국/NNP 은행/NNG'],
+    'OGG_POLITICS': ['국회/NNG', '청와대/NNP'],
+    'OGG_SPORTS': ['한국/NNP 축구/NNG 대표팀/NNG'],
+    'AF_BUILDING': ['거가대교/NNP', '롯데월드타워/NNP'],
+    'EV_SPORTS': ['올림픽/NNP', '월드컵/NNP'],
+    'DT_DAY': ['오늘/NNG', '3/SN+일/NNB', '어제/NNG'],
+    'DT_MONTH': ['3/SN+월/NNB', '지난달/NNG'],
+    'DT_YEAR': ['2019/SN+년/NNB', '지난해/NNG', '올해/NNG'],
+    'DT_DURATION': ['사흘/NNG 동안/NNG', '3/SN+년/NNB 동안/NNG'],
+    'TI_HOUR': ['오후/NNG 3/SN+시/NNB', '오전/NNG 10/SN+시/NNB'],
+    'QT_COUNT': ['세/MM 명/NNB', '10/SN+개/NNB'],
+    'QT_PRICE': ['1/SN+만/NR 원/NNB', '500/SN+원/NNB'],
+}
+TEMPORAL_LABEL_PREFIXES = ('DT_', 'TI_')
+CONTENT_TAGS = ('NNG', 'NNP', 'VV', 'VA', 'MAG')
+
+
+def parse_word(tagged: str) -> list[tuple[str, str]]:
+    """ "3/SN+일/NNB" → [("3", "SN"), ("일", "NNB")] """
+    return [tuple(morpheme.rsplit('/', 1)) for morpheme in tagged.split('+')]
+
+
+class SyntheticWord:
+    def __init__(self, morphemes: list[tuple[str, str]], kind: str):
+        """
+        a single word (어절) of synthetic sentence
+        :param morphemes: list of (form, tag)
+        :param kind: one of "noun", "entity", "adverb", "predicate", "final"
+        """
+        self.morphemes = morphemes
+        self.kind = kind
+        self.form: str = ''.join([form for form, _ in morphemes])
+        self.id: Optional[int] = None
+        self.begin: Optional[int] = None
+        self.end: Optional[int] = None
+        self.head: Optional[int] = None
+        self.label: Optional[str] = None
+        self.role: Optional[str] = None
+        self.entity: Optional[tuple[str, int]] = None  # (ne_label, index of first word of the entity)
+
+
+class SyntheticCorpusGenerator:
+    def __init__(
+            self,
+            documents: int = 100,
+            sentences: Optional[int] = None,
+            sentences_per_document: tuple[int, int] = (5, 30),
+            words_per_sentence: tuple[int, int] = (4, 20),
+            words_mode: Optional[int] = None,
+            entity_density: float = 0.2,
+            predicate_density: float = 0.15,
+            random_state: int = 880830,
+            prefix: str = 'SYNT'
+    ):
+        """
+        generator of schema-valid modu layer files with spans consistent across layers.
+        generator = SyntheticCorpusGenerator(sentences=1000, random_state=1)
+        files = generator.to_files('fixtures/1k')
+        corpus = Corpus(files=files)
+        :param documents: number of documents, ignored if `sentences` is given
+        :param sentences: total number of sentences, the last document is truncated to fit it
+        :param sentences_per_document: (min, max) number of sentences in a document
+        :param words_per_sentence: (min, max) number of words in a sentence
+        :param words_mode: peak of triangular distribution of sentence length, uniform if None
+        :param entity_density: probability of a nominal slot in a sentence to be a named-entity
+        :param predicate_density: probability of a slot in a sentence to be an embedded predicate
+        :param random_state: seed of generation. each document is seeded independently from it.
+        :param prefix: prefix of document ids
+        """
+        assert 2 <= words_per_sentence[0] <= words_per_sentence[-1]
+        assert 1 <= sentences_per_document[0] <= sentences_per_document[-1]
+        assert 0.0 <= entity_density <= 1.0 and 0.0 <= predicate_density <= 1.0
+        self.documents = documents
+        self.sentences = sentences
+        self.sentences_per_document = sentences_per_document
+        self.words_per_sentence = words_per_sentence
+        self.words_mode = words_mode
+        self.entity_density = entity_density
+        self.predicate_density = predicate_density
+        self.random_state = random_state
+        self.prefix = prefix
+
+    def __repr__(self):
+        size = f'sentences: {self.sentences}' if self.sentences else f'documents: {self.documents}'
+        return f'<{self.__class__.__name__} → {size}, random_state: {self.random_state}>'
+
+    def sample_length(self, rng: random.Random) -> int:
+        low, high = self.words_per_sentence[0], self.words_per_sentence[-1]
+        if self.words_mode is None:
+            return rng.randint(low, high)
+        return int(round(rng.triangular(low, high, self.words_mode)))
+
+    def make_words(self, rng: random.Random) -> list[SyntheticWord]:
+        n_words = self.sample_length(rng)
+        words: list[SyntheticWord] = []
+        while len(words) < n_words - 1:
+            room = n_words - 1 - len(words)
+            dice = rng.random()
+            if dice < self.predicate_density:
+                if not words or words[-1].kind == 'predicate':
+                    continue
+                ending = rng.choice(list(CONNECTIVES))
+                words.append(SyntheticWord(parse_word(rng.choice(VERB_STEMS)) + parse_word(ending), kind='predicate'))
+                words[-1].label = CONNECTIVES[ending]
+            elif dice < self.predicate_density + self.entity_density:
+                label = rng.choice(list(ENTITIES))
+                tagged = rng.choice(ENTITIES[label]).split()
+                if len(tagged) > room:
+                    continue
+                first = len(words)
+                for tagged_word in tagged:
+                    words.append(SyntheticWord(parse_word(tagged_word), kind='entity'))
+                    words[-1].entity = (label, first)
+                self.attach_particle(rng, words[-1])
+            elif dice < self.predicate_density + self.entity_density + 0.1:
+                words.append(SyntheticWord(parse_word(rng.choice(ADVERBS)), kind='adverb'))
+                words[-1].label = 'AP'
+            else:
+                words.append(SyntheticWord(parse_word(rng.choice(COMMON_NOUNS)), kind='noun'))
+                self.attach_particle(rng, words[-1])
+        final = parse_word(rng.choice(VERB_STEMS)) + [('었', 'EP'), ('다', 'EF'), ('.', 'SF')]
+        words.append(SyntheticWord(final, kind='final'))
+        words[-1].label = 'VP'
+        return words
+
+    @staticmethod
+    def attach_particle(rng: random.Random, word: SyntheticWord):
+        if rng.random() < 0.8:
+            particle = rng.choice(list(PARTICLES))
+            word.morphemes = word.morphemes + parse_word(particle)
+            word.form = ''.join([form for form, _ in word.morphemes])
+            word.label, word.role = PARTICLES[particle]
+        else:
+            word.label = 'NP'
+
+    @staticmethod
+    def layout(words: list[SyntheticWord]) -> str:
+        """ assigns word ids, character spans and dependency heads, then returns the sentence form """
+        cursor = 0
+        for n, word in enumerate(words):
+            word.id = n + 1
+            word.begin = cursor
+            word.end = cursor + len(word.form)
+            cursor = word.end + 1
+        next_predicate = -1
+        for word in reversed(words):
+            if word.kind == 'final':
+                word.head = -1
+                next_predicate = word.id
+                continue
+            if word.entity and words[word.id].entity == word.entity:
+                # non-final word of a multi-word entity is governed by the next word of the entity
+                word.head = word.id + 1
+                word.label = 'NP'
+            else:
+                word.head = next_predicate
+            if word.kind == 'predicate':
+                next_predicate = word.id
+        return ' '.join([word.form for word in words])
+
+    def make_sentence(self, rng: random.Random, snt_id: str) -> dict:
+        words = self.make_words(rng)
+        form = self.layout(words)
+
+        morphemes, wsd = [], []
+        for word in words:
+            offset = word.begin
+            for position, (morph, tag) in enumerate(word.morphemes):
+                morphemes.append(dict(id=len(morphemes) + 1, form=morph, label=tag, word_id=word.id, position=position + 1))
+                if tag in CONTENT_TAGS:
+                    wsd.append(dict(
+                        word=morph, sense_id=rng.randint(1, 3), pos=tag,
+                        begin=offset, end=offset + len(morph), word_id=word.id
+                    ))
+                offset += len(morph)
+
+        dep = [
+            dict(
+                word_id=word.id, word_form=word.form, head=word.head, label=word.label,
+                dependent=[w.id for w in words if w.head == word.id]
+            ) for word in words
+        ]
+
+        ne = []
+        for word in words:
+            if word.entity is None or (word.id < len(words) and words[word.id].entity == word.entity):
+                continue
+            label, first = word.entity
+            span = words[first:word.id]
+            last_morpheme = span[-1].morphemes[-1]
+            end = span[-1].end - (len(last_morpheme[0]) if last_morpheme[1].startswith('J') else 0)
+            entity_form = form[span[0].begin:end]
+            ne.append(dict(id=len(ne) + 1, form=entity_form, label=label, begin=span[0].begin, end=end))
+        el = []
+        for item in ne:
+            temporal = item['label'].startswith(TEMPORAL_LABEL_PREFIXES) or item['label'].startswith('QT_')
+            el.append(dict(
+                item,
+                kid='NA' if temporal else f'K{zlib.crc32(item["form"].encode()) % 10**6:06d}',
+                wikiid='NA' if temporal else f'Q{sum(map(ord, item["form"]))}',
+                URL='NA' if temporal else 'https://ko.wikipedia.org/wiki/' + quote(item['form'].replace(' ', '_'))
+            ))
+
+        srl = []
+        for predicate in [w for w in words if w.kind in ('predicate', 'final')]:
+            stem = predicate.morphemes[0][0]
+            arguments = []
+            for word in words:
+                if word.head != predicate.id or not word.role:
+                    continue
+                begin = words[word.entity[1]].begin if word.entity else word.begin
+                role = 'ARGM-TMP' if word.entity and word.entity[0].startswith(TEMPORAL_LABEL_PREFIXES) else word.role
+                arguments.append(dict(form=form[begin:word.end], label=role, begin=begin, end=word.end, word_id=word.id))
+            srl.append(dict(
+                predicate=dict(form=stem, begin=predicate.begin, end=predicate.begin + len(stem), lemma=stem + '다'),
+                argument=arguments
+            ))
+
+        word_index = [dict(id=w.id, form=w.form, begin=w.begin, end=w.end) for w in words]
+        return dict(id=snt_id, form=form, morpheme=morphemes, WSD=wsd, NE=ne, EL=el, DP=dep, SRL=srl, word=word_index)
+
+    @staticmethod
+    def make_zero_anaphora(rng: random.Random, sentences: list[dict]) -> list[dict]:
+        za = []
+        for sentence in sentences:
+            for srl in sentence['SRL']:
+                if any([arg['label'] == 'ARG0' for arg in srl['argument']]) or rng.random() < 0.5:
+                    continue
+                predicate = dict(srl['predicate'], sentence_id=sentence['id'])
+                del predicate['lemma']
+                if sentence['NE']:
+                    ne = rng.choice(sentence['NE'])
+                    antecedent = dict(form=ne['form'], type='subject', sentence_id=sentence['id'], begin=ne['begin'], end=ne['end'])
+                else:
+                    antecedent = dict(form='', type='subject', sentence_id='-1', begin=-1, end=-1)
+                za.append(dict(predicate=predicate, antecedent=[antecedent]))
+        return za
+
+    @staticmethod
+    def make_coreference(sentences: list[dict]) -> list[dict]:
+        clusters: dict[str, list[dict]] = dict()
+        for sentence in sentences:
+            for ne in sentence['NE']:
+                if ne['label'].startswith(TEMPORAL_LABEL_PREFIXES):
+                    continue
+                mention = dict(sentence_id=sentence['id'], form=ne['form'], begin=ne['begin'], end=ne['end'], NE_id=ne['id'])
+                clusters.setdefault(ne['form'], []).append(mention)
+        return [dict(mention=mentions) for mentions in clusters.values() if len(mentions) > 1]
+
+    def make_document(self, index: int, n_sentences: Optional[int] = None) -> dict[str, dict]:
+        """
+        generates a single document as payloads of every layer
+        :param index: index of the document, which seeds the document independently
+        :param n_sentences: overrides the number of sentences of the document
+        :return: a dict of {layer: document object of the layer}
+        """
+        rng = random.Random(self.random_state * 1_000_003 + index)
+        doc_id = f'{self.prefix}{index + 1:010d}'
+        low, high = self.sentences_per_document[0], self.sentences_per_document[-1]
+        size = rng.randint(low, high)
+        size = min(size, n_sentences) if n_sentences else size
+        sentences = [self.make_sentence(rng, snt_id=f'{doc_id}.1.{n + 1}') for n in range(size)]
+        metadata = dict(title=f'synthetic document #{index + 1}', author='synthetics', publisher='synthetics')
+
+        payloads = dict()
+        for layer, key in SENTENCE_LEVEL_LAYERS.items():
+            layer_sentences = []
+            for sentence in sentences:
+                layer_sentence = dict(id=sentence['id'], form=sentence['form'])
+                layer_sentence[key] = sentence['EL' if layer == 'el' else key]
+                if layer == 'dep':
+                    layer_sentence['word'] = sentence['word']
+                layer_sentences.append(layer_sentence)
+            payloads[layer] = dict(id=doc_id, metadata=metadata, sentence=layer_sentences)
+        bare_sentences = [dict(id=sentence['id'], form=sentence['form']) for sentence in sentences]
+        payloads['za'] = dict(id=doc_id, metadata=metadata, sentence=bare_sentences, ZA=self.make_zero_anaphora(rng, sentences))
+        payloads['cr'] = dict(id=doc_id, metadata=metadata, sentence=bare_sentences, CR=self.make_coreference(sentences))
+        return payloads
+
+    def iter_documents(self) -> Iterator[dict[str, dict]]:
+        index = 0
+        produced = 0
+        while (produced < self.sentences) if self.sentences else (index < self.documents):
+            remains = self.sentences - produced if self.sentences else None
+            payloads = self.make_document(index=index, n_sentences=remains)
+            produced += len(payloads['pos']['sentence'])
+            index += 1
+            yield payloads
+
+    def to_files(self, out_dir: str, filename: str = 'synthetic.json') -> dict[str, str]:
+        """
+        streams generated documents into `{out_dir}/{layer}/{filename}` for all layers,
+        so memory usage does not depend on the size of corpus.
+        :return: a dict of {layer: filepath} which can be passed to `Corpus(files=...)`
+        """
+        layers = list(SENTENCE_LEVEL_LAYERS) + list(DOCUMENT_LEVEL_LAYERS)
+        files = {layer: os.path.join(out_dir, layer, filename) for layer in layers}
+        pointers = dict()
+        for layer, filepath in files.items():
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            pointers[layer] = open(filepath, encoding='utf-8', mode='w')
+            pointers[layer].write(f'{{"id": "{self.prefix}-{layer}", "metadata": {{"title": "synthetic {layer}"}}, "document": [')
+        try:
+            total = self.sentences if self.sentences else None
+            with tqdm(total=total, desc=f'- generating synthetic corpus into `{out_dir}`') as progress:
+                for n, payloads in enumerate(self.iter_documents()):
+                    for layer, fp in pointers.items():
+                        fp.write((',\n' if n else '\n') + json.dumps(payloads[layer], ensure_ascii=False))
+                    progress.update(len(payloads['pos']['sentence']) if total else 1)
+        finally:
+            for fp in pointers.values():
+                fp.write('\n]}\n')
+                fp.close()
+        return files
+
+
+if __name__ == '__main__':
+    scale = sys.argv[1] if len(sys.argv) > 1 else '1k'
+    generator = SyntheticCorpusGenerator(sentences=SCALES[scale], random_state=880830)
+    print(generator)
+    print(generator.to_files(out_dir=f'synthetic-{scale}'))
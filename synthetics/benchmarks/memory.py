@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import Counter
+from typing import Iterator, Optional
+from synthetics.benchmarks.generator import SyntheticCorpusGenerator, SCALES
+from synthetics.benchmarks.suite import FIXTURE_SEED
+from synthetics.primitives.corpus import Corpus, Item, SENTENCE_LEVEL_LAYERS, DOCUMENT_LEVEL_LAYERS
+from synthetics.utils.originals import timestamp
+
+"""
+Memory report of annotation items
+
+$ python -m synthetics.benchmarks.memory --pickle ../corpus.pkl --output memory.json
+
+loads a corpus (a pickle, or the fixture of `SyntheticCorpusGenerator`) under tracemalloc and reports
+bytes per POS token, then per item class the size of instances with `__slots__` against the same attributes
+held in a `__dict__`, and how many distinct string objects back the interned attributes.
+"""
+
+
+def iter_items(corpus: Corpus) -> Iterator[Item]:
+    """ every item of sentence-level layers and document-level layers, sub-items included """
+    stack: list = []
+    for document in corpus.documents.values():
+        for layer in document.annotations.values():
+            stack.extend(layer.data)
+        for sentence in document.sentences.values():
+            for layer in SENTENCE_LEVEL_LAYERS:
+                instance = sentence.annotations.get(layer)
+                if instance is not None:
+                    stack.extend(instance.data)
+    while stack:
+        item = stack.pop()
+        yield item
+        for key in item.__slots__:
+            value = getattr(item, key)
+            if isinstance(value, Item):
+                stack.append(value)
+            elif isinstance(value, list) and value and isinstance(value[0], Item):
+                stack.extend(value)
+
+
+def dict_size(item: Item) -> int:
+    """ bytes of an equivalent instance holding the attributes of `item` in `__dict__`, as items did without slots """
+    twin = type(item.__class__.__name__, (), dict())()
+    twin.__dict__.update(item.todict())
+    return sys.getsizeof(twin) + sys.getsizeof(twin.__dict__)
+
+
+def report(corpus: Corpus) -> dict:
+    instances, slots_bytes, dict_bytes = Counter(), Counter(), Counter()
+    references, objects = Counter(), dict()
+    for item in iter_items(corpus):
+        name = item.__class__.__name__
+        if name not in slots_bytes:
+            slots_bytes[name], dict_bytes[name] = sys.getsizeof(item), dict_size(item)
+        instances[name] += 1
+        for key in item.interned:
+            value = getattr(item, key)
+            if isinstance(value, str):
+                references[f'{name}.{key}'] += 1
+                objects.setdefault(f'{name}.{key}', set()).add(id(value))
+
+    classes = dict()
+    for name, count in instances.most_common():
+        classes[name] = dict(
+            instances=count,
+            slots_bytes=slots_bytes[name],
+            dict_bytes=dict_bytes[name],
+            saved_kb=(dict_bytes[name] - slots_bytes[name]) * count / 1024
+        )
+    interned = {key: dict(references=count, objects=len(objects[key])) for key, count in references.most_common()}
+    return dict(classes=classes, interned=interned)
+
+
+def load(pickle: Optional[str], scale: str, fixture_dir: Optional[str]) -> Corpus:
+    if pickle:
+        return Corpus.from_pickle(pickle)
+    fixture_dir = fixture_dir or os.path.join(tempfile.gettempdir(), f'synthetics-fixture-{scale}')
+    layers = list(SENTENCE_LEVEL_LAYERS) + list(DOCUMENT_LEVEL_LAYERS)
+    files = {layer: os.path.join(fixture_dir, layer, 'synthetic.json') for layer in layers}
+    if not all([os.path.exists(f) for f in files.values()]):
+        files = SyntheticCorpusGenerator(sentences=SCALES[scale], random_state=FIXTURE_SEED).to_files(out_dir=fixture_dir)
+    return Corpus(files=files)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='memory report of annotation items')
+    parser.add_argument('--pickle', default=None, help='pickled corpus, the fixture is used if not given')
+    parser.add_argument('--scale', default='1k', choices=list(SCALES))
+    parser.add_argument('--fixtures', default=None, help='directory of fixture corpus (generated if missing)')
+    parser.add_argument('--output', default=None, help='machine-readable report')
+    args = parser.parse_args()
+
+    start = time.time()
+    tracemalloc.start()
+    corpus = load(args.pickle, scale=args.scale, fixture_dir=args.fixtures)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'- {len(corpus)} sentences loaded, {time.time() - start:.2f} sec lapsed')
+
+    results = report(corpus)
+    tokens = results['classes'].get('POSItem', dict(instances=0))['instances']
+    results['meta'] = dict(
+        update=timestamp(),
+        sentences=len(corpus),
+        tokens=tokens,
+        current_kb=current / 1024,
+        peak_kb=peak / 1024,
+        bytes_per_token=current / tokens if tokens else None
+    )
+    print(f'- corpus: {current / 1024 ** 2:.1f} MB (peak {peak / 1024 ** 2:.1f} MB), '
+          f'{results["meta"]["bytes_per_token"] or 0:.1f} bytes per POS token')
+    print(f'{"class":<14}{"instances":>12}{"slots":>8}{"dict":>8}{"saved MB":>11}')
+    for name, row in results['classes'].items():
+        print(f'{name:<14}{row["instances"]:>12}{row["slots_bytes"]:>8}{row["dict_bytes"]:>8}{row["saved_kb"] / 1024:>11.2f}')
+    saved = sum([row['saved_kb'] for row in results['classes'].values()])
+    print(f'- {saved / 1024:.1f} MB saved by slots, {saved * 1024 / tokens if tokens else 0:.1f} bytes per POS token')
+    for key, row in results['interned'].items():
+        print(f'- interned `{key}`: {row["references"]} references to {row["objects"]} objects')
+
+    if args.output:
+        with open(args.output, encoding='utf-8', mode='w') as fp:
+            json.dump(results, fp, ensure_ascii=False, indent=4)
+        print(f'- results are saved at `{args.output}`')
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Optional
+from synthetics.benchmarks.generator import SyntheticCorpusGenerator, SCALES
+from synthetics.primitives.corpus import Corpus, Sentence, SENTENCE_LEVEL_LAYERS, DOCUMENT_LEVEL_LAYERS
+from synthetics.utils.originals import load_json, timestamp
+
+"""
+End-to-end benchmark suite with regression tracking
+
+$ python -m synthetics.benchmarks.suite --scale 1k --output bench.json --baseline baseline.json
+
+every benchmark runs against the fixture generated by `SyntheticCorpusGenerator` with a fixed seed,
+then reports ops/s, p50/p99 latency per operation and peak memory (tracemalloc) in a json file.
+if a baseline is given, the run fails (exit code 1) when any benchmark crosses the thresholds.
+"""
+
+FIXTURE_SEED = 880830
+TESTERS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'rules', 'testers.txt')
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Benchmark:
+    def __init__(
+            self,
+            name: str,
+            func: Callable,
+            items: Optional[list] = None,
+            repeat: int = 1,
+            setup: Callable = None,
+            timed: bool = False
+    ):
+        """
+        a single benchmark. `func` is called once per item of `items` (or once without args if `items` is None),
+        and the whole set of calls is repeated `repeat` times. each call is timed as an operation.
+        :param name: name of benchmark. it is the key of result and baseline.
+        :param func: function to be measured
+        :param items: arguments of each operation
+        :param repeat: number of repetitions
+        :param setup: optional function called with each item before the call and excluded from timing,
+                      the return value of setup is passed to `func` instead of the item.
+        :param timed: `func` measures itself and returns seconds, which are taken instead of the wall time of the call.
+                      ex) a subprocess of which startup is not a part of the operation.
+        """
+        self.name = name
+        self.func = func
+        self.items = items
+        self.repeat = repeat
+        self.setup = setup
+        self.timed = timed
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.name}>'
+
+    def operations(self):
+        for _ in range(self.repeat):
+            if self.items is None:
+                yield ()
+            else:
+                for item in self.items:
+                    yield (self.setup(item) if self.setup else item, )
+
+    def run(self) -> dict:
+        samples = []
+        for args in self.operations():
+            start = time.perf_counter()
+            lapsed = self.func(*args)
+            samples.append(lapsed if self.timed else time.perf_counter() - start)
+
+        # peak memory is measured on a separated pass, tracemalloc distorts the timings otherwise.
+        tracemalloc.start()
+        for args in self.operations():
+            self.func(*args)
+            break
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        total = sum(samples)
+        return dict(
+            ops=len(samples),
+            total_sec=total,
+            ops_per_sec=len(samples) / total if total else float('inf'),
+            p50_ms=percentile(samples, 50) * 1000,
+            p99_ms=percentile(samples, 99) * 1000,
+            peak_memory_kb=peak / 1024
+        )
+
+
+class BenchmarkSuite:
+    def __init__(self, scale: str = '1k', fixture_dir: Optional[str] = None, sample: int = 300):
+        """
+        :param scale: one of `SCALES` of synthetic fixture corpus
+        :param fixture_dir: where the fixture is generated. it is reused if already exists.
+        :param sample: number of sentences for per-sentence benchmarks (AMR stages, render)
+        """
+        self.scale = scale
+        self.fixture_dir = fixture_dir or os.path.join(tempfile.gettempdir(), f'synthetics-fixture-{scale}')
+        self.sample = sample
+        self.files: dict[str, str] = dict()
+        self.corpus: Optional[Corpus] = None
+        self.benchmarks: list[Benchmark] = []
+
+    def prepare(self):
+        generator = SyntheticCorpusGenerator(sentences=SCALES[self.scale], random_state=FIXTURE_SEED)
+        layers = list(SENTENCE_LEVEL_LAYERS) + list(DOCUMENT_LEVEL_LAYERS)
+        files = {layer: os.path.join(self.fixture_dir, layer, 'synthetic.json') for layer in layers}
+        if all([os.path.exists(f) for f in files.values()]):
+            self.files = files
+        else:
+            self.files = generator.to_files(out_dir=self.fixture_dir)
+        self.corpus = Corpus(files=self.files)
+        self.register()
+        return self
+
+    def register(self):
+        # the `from ... import ...` statements below are located here to measure their side effects apart.
+        from synthetics.primitives.amr.graph import AbstractMeaningRepresentation, warm_up
+        from synthetics.rules.date_entities import DateTimeNormalizer
+        from synthetics.utils.kr2num import kr2num, kr2num_batch, parse
+
+        # a fresh interpreter per operation, since modules are imported only once in a process.
+        # the child reports the time of the import only, interpreter startup is excluded.
+        def import_module(module: str) -> float:
+            statement = f'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+            child = subprocess.run([sys.executable, '-c', statement], check=True, capture_output=True, text=True)
+            return float(child.stdout.strip().splitlines()[-1])
+
+        self.add(Benchmark(
+            'import.amr_graph', func=import_module, items=['synthetics.primitives.amr.graph'], repeat=5, timed=True
+        ))
+
+        # lexicons are loaded lazily, it is excluded from the timings of graph construction.
+        warm_up()
+
+        corpus = self.corpus
+        sentences: list[Sentence] = corpus.sample_sentences(k=min(self.sample, len(corpus)), random_state=FIXTURE_SEED)
+        pickle_file = os.path.join(self.fixture_dir, 'corpus.pkl')
+
+        def round_trip():
+            corpus.to_pickle(pickle_file)
+            Corpus.from_pickle(pickle_file)
+
+        self.add(Benchmark('corpus.from_files', func=lambda: Corpus(files=self.files), repeat=3))
+        self.add(Benchmark('corpus.pickle_round_trip', func=round_trip, repeat=3))
+        self.add(Benchmark(
+            'corpus.filter_by',
+            func=lambda: list(corpus.filter_by(len_range=(10, 45), exclude='\"\',“”‘’…;[]()<>', endswith='.!?', random_state=FIXTURE_SEED)),
+            repeat=5
+        ))
+
+        def prepare_stage(stage: int):
+            def setup(sentence: Sentence):
+                amr = AbstractMeaningRepresentation(annotations=sentence.annotations, build=False)
+                for process in amr.pipeline[:stage]:
+                    process()
+                return amr.pipeline[stage]
+            return setup
+
+        stages = AbstractMeaningRepresentation(annotations=sentences[0].annotations, build=False).pipeline
+        for n, process in enumerate(stages):
+            self.add(Benchmark(f'amr.{process.__name__}', func=lambda p: p(), items=sentences, setup=prepare_stage(n)))
+
+        def prepare_render(sentence: Sentence):
+            amr = AbstractMeaningRepresentation(annotations=sentence.annotations)
+            amr.metadata['pos'] = sentence.annotations.pos.tostring()
+            return amr
+
+        self.add(Benchmark('amr.render', func=lambda amr: amr.encode(), items=sentences, setup=prepare_render))
+        self.add(Benchmark('amr.end_to_end', func=lambda s: AbstractMeaningRepresentation(annotations=s.annotations).encode(), items=sentences))
+
+        numerals = ['12만2천', '삼천오백', '3만', '이십일', '일억 이천만', '칠점오', '스물하나', '100', '구십구만 구천구백구십구']
+        self.add(Benchmark('kr2num', func=kr2num, items=numerals, repeat=200))
+        self.add(Benchmark('kr2num.parse', func=parse, items=numerals, repeat=200))
+        self.add(Benchmark('kr2num.batch', func=kr2num_batch, items=[numerals * 100], repeat=20))
+
+        with open(TESTERS, encoding='utf-8') as fp:
+            date_spans = [line for line in fp.read().splitlines() if line.strip()]
+        normalizer = DateTimeNormalizer()
+        self.add(Benchmark('date_time_normalizer', func=lambda span: normalizer('DT_DAY', span), items=date_spans, repeat=20))
+        temporal = [
+            (item.label, item.form) for sentence in sentences for item in sentence.annotations.ner.tolist()
+            if item.label in normalizer.allow
+        ]
+        self.add(Benchmark('date_time_normalizer.batch', func=normalizer.batch, items=[temporal], repeat=20))
+
+    def add(self, benchmark: Benchmark):
+        self.benchmarks.append(benchmark)
+
+    def run(self, only: Optional[list[str]] = None) -> dict:
+        results = dict()
+        for benchmark in self.benchmarks:
+            if only and not any([benchmark.name.startswith(prefix) for prefix in only]):
+                continue
+            print(f'- running benchmark `{benchmark.name}`', end=' ', flush=True)
+            results[benchmark.name] = benchmark.run()
+            print(f'{results[benchmark.name]["ops_per_sec"]:.2f} ops/s, p50 {results[benchmark.name]["p50_ms"]:.3f} ms')
+        meta = dict(
+            update=timestamp(),
+            scale=self.scale,
+            sentences=len(self.corpus),
+            python=platform.python_version(),
+            platform=platform.platform()
+        )
+        return dict(meta=meta, results=results)
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2, memory_threshold: float = 0.2) -> list[str]:
+    """
+    compares results with baseline and returns messages of regressions
+    :param current: results of current run
+    :param baseline: results of stored baseline
+    :param threshold: allowed ratio of throughput (ops/s) drop
+    :param memory_threshold: allowed ratio of peak memory growth
+    :return: list of regressions, empty if nothing crosses the thresholds
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        reference = baseline['results'][name]
+        if result['ops_per_sec'] < reference['ops_per_sec'] * (1 - threshold):
+            drop = 1 - result['ops_per_sec'] / reference['ops_per_sec']
+            regressions.append(f'{name}: throughput {reference["ops_per_sec"]:.2f} → {result["ops_per_sec"]:.2f} ops/s (-{drop:.1%})')
+        if reference['peak_memory_kb'] and result['peak_memory_kb'] > reference['peak_memory_kb'] * (1 + memory_threshold):
+            growth = result['peak_memory_kb'] / reference['peak_memory_kb'] - 1
+            regressions.append(f'{name}: peak memory {reference["peak_memory_kb"]:.1f} → {result["peak_memory_kb"]:.1f} KB (+{growth:.1%})')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='end-to-end benchmarks of korean-amr-synthetics')
+    parser.add_argument('--scale', default='1k', choices=list(SCALES))
+    parser.add_argument('--fixtures', default=None, help='directory of fixture corpus (generated if missing)')
+    parser.add_argument('--sample', type=int, default=300, help='number of sentences for per-sentence benchmarks')
+    parser.add_argument('--only', nargs='*', default=None, help='prefixes of benchmark names to run')
+    parser.add_argument('--output', default='bench.json', help='machine-readable results')
+    parser.add_argument('--baseline', default=None, help='stored results to be compared with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed ratio of throughput drop')
+    parser.add_argument('--memory-threshold', type=float, default=0.2, help='allowed ratio of peak memory growth')
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(scale=args.scale, fixture_dir=args.fixtures, sample=args.sample).prepare()
+    report = suite.run(only=args.only)
+
+    with open(args.output, encoding='utf-8', mode='w') as fp:
+        json.dump(report, fp, ensure_ascii=False, indent=4)
+    print(f'- results are saved at `{args.output}`')
+
+    if args.baseline:
+        failures = compare(report, load_json(args.baseline), threshold=args.threshold, memory_threshold=args.memory_threshold)
+        for failure in failures:
+            print(f'- regression: {failure}')
+        sys.exit(1 if failures else 0)
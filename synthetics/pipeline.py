@@ -0,0 +1,315 @@
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional, TextIO
+from synthetics.primitives.corpus import Sentence
+from synthetics.primitives.amr.graph import AbstractMeaningRepresentation
+from synthetics.resources.predicates import VerbFrameLexicon
+from synthetics.rules.fingerprints import RuleFingerprints, could_fire, digest, ruleset_keys
+from synthetics.utils.lru import LRUCache
+from synthetics.utils.originals import timestamp
+
+INCREMENTAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rulesets (ruleset TEXT PRIMARY KEY, rules TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS graphs (
+    ref_id TEXT PRIMARY KEY,
+    annotation TEXT NOT NULL,
+    ruleset TEXT NOT NULL,
+    dependencies TEXT NOT NULL,
+    graph TEXT
+) WITHOUT ROWID;
+"""
+
+_END = object()  # end-of-stream marker passed through the queues
+_FAILED = object()  # memoized marker of graphs which are not encodable
+
+
+def synthesize(sentence: Sentence, dependencies: Optional[set[str]] = None) -> Optional[str]:
+    """
+    builds and encodes AMR graph of a single sentence
+    :param sentence: Sentence instance with annotations
+    :param dependencies: if given, filled with ids of rules the graph depends on (see `synthetics.rules.fingerprints`)
+    :return: penman-encoded graph with metadata, or None if it is not encodable
+    """
+    amr = AbstractMeaningRepresentation(annotations=sentence.annotations)
+    amr.metadata['pos'] = sentence.annotations.pos.tostring()
+    graph = amr.encode()
+    if dependencies is not None:
+        dependencies.update(amr.dependencies)
+    amr.release()
+    return graph
+
+
+def relabel(graph: str, snt_id: str) -> str:
+    """ replaces `::id` and `::update` of encoded graph, the rest of graph is kept as it is """
+    lines = graph.split('\n')
+    for n, line in enumerate(lines):
+        if not line.startswith('#'):
+            break
+        if line.startswith('# ::id '):
+            lines[n] = f'# ::id {snt_id}'
+        elif line.startswith('# ::update '):
+            lines[n] = f'# ::update {timestamp()}'
+    return '\n'.join(lines)
+
+
+class MemoizedBuilder:
+    def __init__(self, builder: Callable[[Sentence], Optional[str]] = synthesize, maxsize: int = 100_000):
+        """
+        memoizes encoded graphs by `Annotations.fingerprint()`, so a sentence of which form and annotations are
+        identical to the one already built (boilerplate lines, repeated quotes, ...) only gets a new `::id` header.
+        :param builder: function from Sentence to encoded graph (or None on failure)
+        :param maxsize: max number of memoized graphs (LRU eviction)
+        """
+        self.builder = builder
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.cache.stats()}>'
+
+    def __call__(self, sentence: Sentence) -> Optional[str]:
+        key = sentence.annotations.fingerprint()
+        graph = self.cache.get(key, default=None)
+        if graph is _FAILED:
+            return None
+        if graph is not None:
+            return relabel(graph, snt_id=sentence.ref_id)
+        graph = self.builder(sentence)
+        self.cache.put(key, _FAILED if graph is None else graph)
+        return graph
+
+
+class IncrementalBuilder:
+    def __init__(self, database: str = 'synthesis-cache.db', flush_every: int = 1000):
+        """
+        persistent cache of built graphs by `::id`, keyed on `Annotations.fingerprint()` and fingerprints of the rules
+        each graph depends on. a graph is rebuilt only if its annotations changed, a rule it depends on changed,
+        or a rule added or modified since could fire on the sentence. the rest only get a new `::update`.
+        builder = IncrementalBuilder('synthesis-cache.db')
+        pipeline = StreamingPipeline(builder=builder, memo_size=0)
+        ...
+        builder.close()
+        :param database: filename of SQLite database
+        :param flush_every: number of built graphs written at once
+        """
+        self.database = database
+        self.flush_every = flush_every
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.executescript(INCREMENTAL_SCHEMA)
+        self.lock = threading.Lock()
+        self.fingerprints = RuleFingerprints()
+        self.ruleset = self.fingerprints.resolve(ruleset_keys())
+        self.ruleset_id = digest(sorted(self.ruleset.items()))
+        self.connection.execute(
+            'INSERT OR IGNORE INTO rulesets (ruleset, rules) VALUES (?, ?)',
+            (self.ruleset_id, json.dumps(self.ruleset, ensure_ascii=False))
+        )
+        self.candidates: dict[str, list[str]] = dict()  # {ruleset: rules added or modified since}
+        self.pending: list[tuple] = []
+        self.counts = Counter()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.database}, {self.stats()}>'
+
+    def __call__(self, sentence: Sentence) -> Optional[str]:
+        key = sentence.annotations.fingerprint()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT annotation, ruleset, dependencies, graph FROM graphs WHERE ref_id = ?', (sentence.ref_id, )
+            ).fetchone()
+        reason = self.outdated(sentence, key, row)
+        if reason is None:
+            with self.lock:
+                self.counts['reused'] += 1
+            graph = row[-1]
+            return relabel(graph, snt_id=sentence.ref_id) if graph is not None else None
+        dependencies = set()
+        graph = synthesize(sentence, dependencies=dependencies)
+        recorded = json.dumps(self.fingerprints.resolve(dependencies), ensure_ascii=False)
+        with self.lock:
+            self.counts[reason] += 1
+            self.pending.append((sentence.ref_id, key, self.ruleset_id, recorded, graph))
+            if len(self.pending) >= self.flush_every:
+                self.flush()
+        return graph
+
+    def outdated(self, sentence: Sentence, key: str, row: Optional[tuple]) -> Optional[str]:
+        """
+        :return: reason to rebuild ("new", "annotations", "rules") or None if the cached graph is valid
+        """
+        if row is None:
+            return 'new'
+        annotation, ruleset, recorded, _ = row
+        if annotation != key:
+            return 'annotations'
+        recorded = json.loads(recorded)
+        if self.fingerprints.outdated(recorded):
+            return 'rules'
+        candidates = [rule for rule in self.changed_rules(ruleset) if rule not in recorded]
+        if candidates:
+            numbered_words = sentence.annotations.pos.numbered_items()
+            if any(could_fire(rule, numbered_words) for rule in candidates):
+                return 'rules'
+        return None
+
+    def changed_rules(self, ruleset: str) -> list[str]:
+        """ rules added or modified since a graph was built with `ruleset`, which did not fire on it back then """
+        if ruleset not in self.candidates:
+            with self.lock:
+                row = self.connection.execute('SELECT rules FROM rulesets WHERE ruleset = ?', (ruleset, )).fetchone()
+            previous = json.loads(row[0]) if row else dict()
+            self.candidates[ruleset] = [
+                rule for rule, fingerprint in self.ruleset.items()
+                if fingerprint is not None and previous.get(rule, None) != fingerprint
+            ]
+        return self.candidates[ruleset]
+
+    def flush(self):
+        """ writes pending graphs, the lock must be held by the caller """
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO graphs (ref_id, annotation, ruleset, dependencies, graph) VALUES (?, ?, ?, ?, ?)',
+            self.pending
+        )
+        self.connection.commit()
+        self.pending = []
+
+    def stats(self) -> dict[str, int]:
+        return dict(reused=self.counts['reused'], new=self.counts['new'], annotations=self.counts['annotations'],
+                    rules=self.counts['rules'])
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+
+class StreamingPipeline:
+    def __init__(
+            self,
+            builder: Callable[[Sentence], Optional[str]] = synthesize,
+            queue_size: int = 64,
+            workers: int = 1,
+            executor: Optional[Executor] = None,
+            limit: Optional[int] = None,
+            memo_size: int = 0,
+            release: bool = False,
+            verbose: bool = False
+    ):
+        """
+        asyncio pipeline of reader → builder → writer stages connected by bounded queues.
+        reading the candidates and writing the graphs run on an I/O thread, and building runs on `executor`,
+        so disk I/O is overlapped with graph construction. the number of sentences in flight never exceeds
+        `2 * queue_size + workers` no matter how large the corpus is, and graphs are written in input order.
+        pipeline = StreamingPipeline(queue_size=64)
+        with open('outputs.txt', encoding='utf-8', mode='w') as fp:
+            report = asyncio.run(pipeline.run(corpus.filter_by(...), fp))
+        :param builder: function from Sentence to encoded graph (or None on failure)
+        :param queue_size: max size of each bounded queue (backpressure)
+        :param workers: number of builder threads, used only if `executor` is None
+        :param executor: executor for building graphs. Sentence instances keep back-references to
+                         their Document and Corpus, so a process pool would pickle the whole corpus per item.
+        :param limit: max number of sentences to be processed
+        :param memo_size: if positive, graphs are memoized by annotation hash with `MemoizedBuilder` of this size
+        :param release: streaming consumption mode. each sentence is released by `Sentence.release()` once its
+                        graph is written, which drops the document as well when all of its sentences are done.
+                        use it with `corpus.filter_by(..., release=True)` to keep memory flat for a full pass.
+        :param verbose: print each graph to stdout as well
+        """
+        assert queue_size > 0 and workers > 0
+        self.builder = MemoizedBuilder(builder=builder, maxsize=memo_size) if memo_size > 0 else builder
+        self.queue_size = queue_size
+        self.workers = workers
+        self.executor = executor
+        self.limit = limit
+        self.release = release
+        self.verbose = verbose
+        self.counts = 0
+        self.failed = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → queue_size: {self.queue_size}, workers: {self.workers}, limit: {self.limit}>'
+
+    async def read(self, sentences: Iterable[Sentence], inbox: asyncio.Queue, io_executor: Executor):
+        loop = asyncio.get_running_loop()
+        iterator = iter(sentences)
+        n = 0
+        while self.limit is None or n < self.limit:
+            # pulling from the iterator may hit the disk (or a lazy generator), so it is off the event loop
+            sentence = await loop.run_in_executor(io_executor, next, iterator, _END)
+            if sentence is _END:
+                break
+            await inbox.put(sentence)
+            n += 1
+        await inbox.put(_END)
+
+    async def build(self, inbox: asyncio.Queue, outbox: asyncio.Queue, executor: Executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            sentence = await inbox.get()
+            if sentence is _END:
+                break
+            # futures are queued in input order, so the writer keeps the order while builders run ahead
+            await outbox.put((sentence, loop.run_in_executor(executor, self.builder, sentence)))
+        await outbox.put(_END)
+
+    async def write(self, outbox: asyncio.Queue, fp: TextIO, io_executor: Executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await outbox.get()
+            if item is _END:
+                break
+            sentence, future = item
+            graph = await future
+            self.counts += 1
+            if graph is None:
+                self.failed += 1
+            else:
+                if self.verbose:
+                    print('\n\n')
+                    print(graph)
+                await loop.run_in_executor(io_executor, fp.write, graph + '\n\n')
+            if self.release:
+                sentence.release()
+
+    async def run(self, sentences: Iterable[Sentence], fp: TextIO) -> dict[str, Any]:
+        """
+        :param sentences: iterable of Sentence, ex) `corpus.filter_by(...)` or `corpus.iter_sentences()`
+        :param fp: writable text file object for encoded graphs
+        :return: report of the run
+        """
+        self.counts, self.failed = 0, 0
+        start = time.time()
+        inbox, outbox = asyncio.Queue(maxsize=self.queue_size), asyncio.Queue(maxsize=self.queue_size)
+        io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='synthetics-io')
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='synthetics-builder')
+        tasks = [
+            asyncio.create_task(self.read(sentences, inbox, io_executor)),
+            asyncio.create_task(self.build(inbox, outbox, executor)),
+            asyncio.create_task(self.write(outbox, fp, io_executor))
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+        finally:
+            io_executor.shutdown(wait=True)
+            if self.executor is None:
+                executor.shutdown(wait=True)
+        return self.report(lapse=time.time() - start)
+
+    def report(self, lapse: float) -> dict[str, Any]:
+        report = dict(counts=self.counts, failed=self.failed, lapse=round(lapse, 2))
+        if isinstance(self.builder, MemoizedBuilder):
+            report['memo'] = self.builder.cache.stats()
+        incremental = self.builder.builder if isinstance(self.builder, MemoizedBuilder) else self.builder
+        if isinstance(incremental, IncrementalBuilder):
+            report['incremental'] = incremental.stats()
+        if not VerbFrameLexicon.intact:
+            report['frames'] = VerbFrameLexicon().cache_stats()
+        return report
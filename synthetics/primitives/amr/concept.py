@@ -131,6 +131,29 @@ class AMRGenericNameConcept(AMRIndexFreeConcept):
         return super().product(global_idx=self.generic_idx) + generic_triples + wikification
 
 
+class AMRIdiomConcept(AMRIndexFreeConcept):
+    def __init__(
+            self,
+            concept_type: str,
+            idiom_str: str,
+            mapping: Optional[set[int]] = None
+    ):
+        """
+        idiomatic verb frame collapsed from multiple words, the frame of Sejong idiom lexicon is the concept.
+        node = AMRIdiomConcept(concept_type="가슴에-못을-박다-01", idiom_str="가슴에 못을 박았다", mapping={2, 3, 4})
+        node.product(global_idx="g")
+        >> (g / 가슴에-못을-박다-01~w.2,3,4)
+        :param concept_type: frame id of idiom
+        :param idiom_str: surface form of the words
+        :param mapping: Any. tuple of ints or tuples for generating alignment information.
+        """
+        super().__init__(concept_type=concept_type, mapping=mapping)
+        self.idiom_str: str = re.sub(r'\s+', ' ', idiom_str.strip())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.concept_type} → "{self.idiom_str}" {self.mapping}>'
+
+
 class AMRTerminologyConcept(AMRIndexFreeConcept):
     def __init__(
             self,
@@ -3,8 +3,14 @@ from typing import Any, Optional
 from synthetics.primitives.amr.concept import AMRIndexFreeConcept
 
 
+def quote(value: Any) -> str:
+    """ numbers and english symbols are left as they are, the others are quoted. ex) "28" → 28, "year" → year, "수요일" → "수요일" """
+    value = str(value)
+    return value if re.fullmatch(r'[+-]?\d+(\.\d+)?|[a-z][a-z-]*', value) else f'"{value}"'
+
+
 class AMRDateEntityConcept(AMRIndexFreeConcept):
-    ### covers DT_DAY, DT_WEEK, DT_MONTH, DT_YEAR, DT_SEASON
+    ### covers DT_DAY, DT_WEEK, DT_MONTH, DT_YEAR, DT_SEASON, TI_HOUR, TI_MINUTE, TI_SECOND, TI_OTHERS
     def __init__(
             self,
             concept_type: str,
@@ -13,14 +19,61 @@ class AMRDateEntityConcept(AMRIndexFreeConcept):
             wiki: Optional[str] = None,
             mapping: Optional[set[int]] = None
     ):
+        """
+        date/time entity of which attributes are normalized by `DateTimeNormalizer`. without any attribute,
+        the surface form is the concept as `AMRDummyNEConcept` does.
+        node = AMRDateEntityConcept(concept_type="date-entity", entity_idx=3, entity_str="지난 28일", mapping={4, 5})
+        node.add_attribute(":day", "28")
+        node.product(global_idx="d")
+        >> (d / date-entity~w.4,5 :day 28)
+        :param concept_type: structured concept, ex) "date-entity"
+        :param entity_str: surface form of entity
+        """
+        self.entity_idx: Any = entity_idx
         self.entity_str: str = re.sub(r'\s+', ' ', entity_str.strip())
+        self.structured_type: str = concept_type.split('|')[0]
         super().__init__(concept_type='-'.join(self.entity_str.split()), mapping=mapping)
 
     def __repr__(self):
-        return f'<{self.__class__.__name__}: {self.concept_type} → "{self.entity_str}" {self.mapping}>'
+        return f'<{self.__class__.__name__}: {self.structured_concept()} → "{self.entity_str}" {self.mapping}>'
+
+    def structured_concept(self) -> str:
+        return self.structured_type if self.attributes else self.concept_type
+
+    def head_triple(self, global_idx: Any):
+        return global_idx, ':instance', self.structured_concept()
 
     def product(self, global_idx: Any) -> list:
-        return super().product(global_idx=global_idx)
+        attributes = [(global_idx, relation, quote(value)) for relation, value in self.attributes.items()]
+        return [self.head_triple(global_idx=global_idx)] + attributes
+
+
+class AMRTemporalQuantityConcept(AMRDateEntityConcept):
+    ### covers DT_DURATION, TI_DURATION, DT_OTHERS
+    def structured_concept(self) -> str:
+        if ':op1' in self.attributes:
+            return 'date-interval'
+        elif ':quant' in self.attributes:
+            return 'temporal-quantity'
+        elif self.attributes:
+            return 'date-entity'
+        return self.concept_type
+
+    def product(self, global_idx: Any) -> list:
+        """
+        operands of date-interval are date-entity nodes of their own
+        ex) (d / date-interval :op1 (d3_1 / date-entity :day 16) :op2 (d3_2 / date-entity :day 20))
+        """
+        triples = [self.head_triple(global_idx=global_idx)]
+        for relation, value in self.attributes.items():
+            if isinstance(value, tuple):
+                operand_idx = f'd{self.entity_idx}_{relation[3:]}'
+                triples.append((global_idx, relation, operand_idx))
+                triples.append((operand_idx, ':instance', 'date-entity'))
+                triples.extend([(operand_idx, r, quote(v)) for r, v in value])
+            else:
+                triples.append((global_idx, relation, quote(value)))
+        return triples
 
 
 class AMRDateIntervalConcept(AMRIndexFreeConcept):
@@ -1,33 +1,65 @@
 import penman
+from os.path import exists
 from synthetics.primitives.corpus import *
 from synthetics.primitives.amr.concept import *
 from synthetics.rules.named_entities import NAMED_ENTITIES
-from synthetics.rules.periphrastic_constructions import PeriphrasticConstructions
+from synthetics.rules.date_entities import DateTimeNormalizer, TemporalSpanTable
+from synthetics.rules.periphrastic_constructions import PeriphrasticConstructions, match_windows
 from synthetics.resources.predicates import VerbFrameLexicon
-from synthetics.utils.originals import ngrams
-
-# initiating singletons
-VerbFrameLexicon()
-PeriphrasticConstructions()
+from synthetics.resources.sejong import IdiomLexicon
+from synthetics.utils.originals import subgroups
+
+# normalized attributes are memoized per distinct span, and `warm_up()` attaches the table of precomputed spans
+NORMALIZER = DateTimeNormalizer()
+
+
+def warm_up(
+        framefiles: Optional[str] = None,
+        cache_file: Optional[str] = 'verb-frames.pkl',
+        idioms: Optional[str] = None,
+        idiom_cache_file: Optional[str] = 'idioms.pkl',
+        temporal_table: Optional[str] = 'temporal-spans.json'
+):
+    """
+    loads the lexicon and rule singletons ahead, which are loaded lazily on their first use otherwise.
+    call it before timing or forking workers, it does nothing if they are already loaded.
+    :param framefiles: glob pattern of framefiles, `$SYNTHETICS_FRAMEFILES` or `predicates.FRAMEFILES` if None
+    :param cache_file: compiled cache of the parsed lexicon
+    :param idioms: glob pattern of Sejong idiom files, `$SYNTHETICS_IDIOMS` or `sejong.IDIOMS` if None
+    :param idiom_cache_file: cached index of idioms
+    :param temporal_table: normalized temporal spans by `scripts/temporal-spans.py`, consulted by the NER stage
+    """
+    VerbFrameLexicon(filepath=framefiles, cache_file=cache_file)
+    PeriphrasticConstructions()
+    IdiomLexicon(filepath=idioms, cache_file=idiom_cache_file)
+    if temporal_table and exists(temporal_table) and NORMALIZER.table is None:
+        NORMALIZER.table = TemporalSpanTable.from_json(temporal_table)
 
 
 class AbstractMeaningRepresentation:
-    def __init__(self, annotations: Annotations):
+    def __init__(self, annotations: Annotations, build: bool = True):
         self.id: Optional[str] = annotations.ref_id
         self.text: Optional[str] = annotations.form
         self.metadata: dict[str, str] = dict(id=self.id, snt=self.text)
         self.annotations: Optional[Annotations] = annotations
         self.sentence: Sentence = self.annotations.super
         self.graph: AMRGraph = AMRGraph(super_instance=self)
+        # ids of rules and lookups the graph depends on, see `synthetics.rules.fingerprints`
+        self.dependencies: set[str] = {'code:amr'}
 
         # initializing pipeline
         self.pipeline = [
             self.update_from_dep,
             self.update_from_mwe,
+            self.update_from_idioms,
             self.update_from_ner,
             self.update_from_srl,
             self.update_from_wsd
         ]
+        if build:
+            self.build()
+
+    def build(self):
         for process in self.pipeline:
             process()
 
@@ -38,6 +70,14 @@ class AbstractMeaningRepresentation:
     def encode(self, surface_alignment: bool = True):
         return self.graph.render(surface_alignment=surface_alignment)
 
+    def release(self):
+        """ breaks references to annotations, the sentence and the graph, so they are freed without cyclic gc """
+        self.graph.super = None
+        self.graph.annotations = None
+        self.annotations = None
+        self.sentence = None
+        self.pipeline = []
+
     def update_from_dep(self):
         # instances
         for word in self.annotations.dep.tolist():
@@ -54,16 +94,29 @@ class AbstractMeaningRepresentation:
 
     def update_from_mwe(self):
         numbered_words = self.annotations.pos.numbered_items()
-        for pattern, guides in PeriphrasticConstructions().get_patterns():
-            queries = pattern.split()
-            for numbered_ngram in ngrams(items=numbered_words, n=len(queries)):
-                window = [w for _, w in numbered_ngram]
-                if all([re.search(pattern=q, string=w) for q, w in zip(queries, window)]):
-                    nodes = [idx for idx, _ in numbered_ngram]
-                    new_node_idx = self.graph.amalgamate(nodes, redirect_true_node=True)
-                    if guides:
-                        for relation, value in guides:
-                            self.graph.instances[new_node_idx].add_attribute(relation, value)
+        for key, (pattern, guides) in PeriphrasticConstructions().get_rules():
+            for nodes in match_windows(pattern, numbered_words):
+                self.dependencies.add(f'mwe:{key}')
+                new_node_idx = self.graph.amalgamate(nodes, redirect_true_node=True)
+                if guides:
+                    for relation, value in guides:
+                        self.graph.instances[new_node_idx].add_attribute(relation, value)
+
+    def update_from_idioms(self):
+        words = subgroups(items=self.annotations.pos.tolist(), by='word_id', starts_from=1)
+        words = [[(token.form, token.label) for token in word] for word in words]
+        self.dependencies.add('idioms:')
+        for begin, end, frames in IdiomLexicon().match(words):
+            nodes = list(range(begin, end + 1))
+            new_node_idx = self.graph.amalgamate(nodes=nodes, redirect_true_node=True)
+            merged = self.graph.instances[new_node_idx]
+            self.graph.instances[new_node_idx] = AMRIdiomConcept(
+                concept_type=frames[0],
+                idiom_str=' '.join([self.annotations.word(word_id) for word_id in nodes]),
+                mapping=merged.mapping
+            )
+            for relation, value in merged.attributes.items():
+                self.graph.instances[new_node_idx].add_attribute(relation, value)
 
     def update_from_srl(self):
         for srl in self.annotations.srl.tolist():
@@ -88,6 +141,7 @@ class AbstractMeaningRepresentation:
                 new_node_idx = self.graph.redirect_node(word_end)
             else:
                 raise ValueError
+            self.dependencies.add(f'ne:{ner.label}')
             concept_type, named_entity_concept = NAMED_ENTITIES[ner.label]
             positional_args = [
                 concept_type,  # concept_type
@@ -97,6 +151,10 @@ class AbstractMeaningRepresentation:
                 self.graph.instances[new_node_idx].mapping  # mapping
             ]
             self.graph.instances[new_node_idx] = named_entity_concept(*positional_args)
+            if ner.label in NORMALIZER.allow:
+                self.dependencies.add('dates:')
+                for relation, value in NORMALIZER(ner.label, ner.form):
+                    self.graph.instances[new_node_idx].add_attribute(relation, value)
 
     def update_from_wsd(self):
         predicates = [srl.predicate for srl in self.annotations.srl.tolist()]
@@ -108,17 +166,16 @@ class AbstractMeaningRepresentation:
                 root_forms = self.annotations.wsd.get_forms(index=first_idx)
                 if target_idx in pred_indices:
                     if root_forms:
-                        frames = None
-                        for end in range(len(root_forms)+1):
-                            query = ''.join([i[0] for i in root_forms[:end]])
-                            frames = VerbFrameLexicon().get_frames_by_root(query)
-                            if frames:
-                                break
+                        # the shortest known root of leading WSD forms, in a single walk over the trie
+                        forms = [form for form, _ in root_forms]
+                        self.dependencies.add('roots:' + '\t'.join(forms))
+                        frames = VerbFrameLexicon().match_frames_by_roots(forms)
                         if not frames:
                             # as a last attempt
                             pred_pointer = pred_indices.index(target_idx)
                             lemma = self.annotations.srl.tolist()[pred_pointer].predicate.lemma
-                            frames = VerbFrameLexicon().get_frames_by_lemma(lemma_form=lemma)
+                            self.dependencies.add(f'lemma:{lemma}')
+                            frames = VerbFrameLexicon().match_frames_by_lemma(lemma_form=lemma)
                         if frames:
                             self.graph.instances[target_idx].concept_type = frames[0].frame_id
                         else:
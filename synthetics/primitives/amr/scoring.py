@@ -0,0 +1,329 @@
+import os
+import time
+import random
+import argparse
+from collections import ChainMap, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Mapping, Optional
+from tqdm import tqdm
+from synthetics.utils.outputs import BlockReader, ParsedGraph, index_blocks, parse_graph
+
+"""
+Smatch-style comparison of two synthesis runs
+
+$ python -m synthetics.primitives.amr.scoring before.outputs.txt after.outputs.txt --output scores.tsv
+
+graphs are paired by `::id`. variables are aligned by the `~w.` surface alignments first, since a node of
+a synthesized graph is anchored to the same words in both runs, then the mapping is refined by a bounded
+hill-climb over reassignments and swaps. graphs of identical text are scored without alignment.
+"""
+
+# readers of the two files in each worker process, opened once by `_open_readers`
+_READERS: dict = dict()
+
+
+class Alignment:
+    def __init__(self, gold: ParsedGraph, test: ParsedGraph):
+        """
+        tables of matching triples by candidate pairs of variables (gold → test), as Smatch builds them.
+        single: {(g, t): matches of instance and attribute triples if g is mapped to t}
+        pair: {(g, t): {(g2, t2): matches of relation triples if g → t and g2 → t2}}
+        """
+        self.gold = gold
+        self.test = test
+        self.single: dict[tuple[str, str], int] = defaultdict(int)
+        self.pair: dict[tuple[str, str], dict[tuple[str, str], int]] = defaultdict(lambda: defaultdict(int))
+        self.targets: dict[str, set[str]] = defaultdict(set)  # {g: candidates of t}, sorted lists after `build()`
+        self.mapping: dict[str, str] = dict()
+        self.used: dict[str, str] = dict()  # inverse of mapping
+        self.build()
+
+    def build(self):
+        by_concept = defaultdict(list)
+        for t, concept in self.test.instances.items():
+            by_concept[concept].append(t)
+        for g, concept in self.gold.instances.items():
+            for t in by_concept.get(concept, []):
+                self.single[(g, t)] += 1
+
+        by_attribute = defaultdict(list)
+        for t, role, constant in self.test.attributes:
+            by_attribute[(role, constant)].append(t)
+        for g, role, constant in self.gold.attributes:
+            for t in by_attribute.get((role, constant), []):
+                self.single[(g, t)] += 1
+
+        by_role = defaultdict(list)
+        for t1, role, t2 in self.test.relations:
+            by_role[role].append((t1, t2))
+        for g1, role, g2 in self.gold.relations:
+            for t1, t2 in by_role.get(role, []):
+                if g1 == g2 or t1 == t2:
+                    if g1 == g2 and t1 == t2:
+                        self.single[(g1, t1)] += 1
+                    continue
+                self.pair[(g1, t1)][(g2, t2)] += 1
+                self.pair[(g2, t2)][(g1, t1)] += 1
+        for g, t in list(self.single) + list(self.pair):
+            self.targets[g].add(t)
+        # sorted, so that ties of hill-climb are broken regardless of hash seeds
+        self.targets = {g: sorted(targets) for g, targets in self.targets.items()}
+
+    def local(self, variables: Iterable[str], mapping: Mapping[str, Optional[str]]) -> float:
+        """ matches of triples involving `variables` under `mapping`, each triple counted once """
+        variables = set(variables)
+        total = 0.0
+        for g in variables:
+            t = mapping.get(g, None)
+            if t is None:
+                continue
+            total += self.single.get((g, t), 0)
+            for (g2, t2), weight in self.pair.get((g, t), dict()).items():
+                if mapping.get(g2, None) == t2:
+                    total += weight / 2 if g2 in variables else weight
+        return total
+
+    def score(self) -> int:
+        return int(round(self.local(self.mapping, self.mapping)))
+
+    def assign(self, g: str, t: Optional[str]):
+        previous = self.mapping.pop(g, None)
+        if previous is not None:
+            del self.used[previous]
+        if t is not None:
+            self.mapping[g] = t
+            self.used[t] = g
+
+    def gain(self, changes: dict[str, Optional[str]]) -> float:
+        # unmapped variables are None in `changes`, which hides the current mapping
+        return self.local(changes, ChainMap(changes, self.mapping)) - self.local(changes, self.mapping)
+
+    def reset(self):
+        self.mapping, self.used = dict(), dict()
+
+    def seed(self, anchored: bool = True):
+        """
+        maps variables of the same `~w.` anchors, then of the largest overlap, then of the best gain
+        :param anchored: use `~w.` anchors, otherwise variables are mapped by the best gain only
+        """
+        test_anchors = defaultdict(list)
+        for t, anchor in self.test.anchors.items():
+            test_anchors[anchor].append(t)
+        pending = []
+        for g, anchor in self.gold.anchors.items() if anchored else ():
+            exact = [t for t in test_anchors.get(anchor, []) if t not in self.used]
+            if exact:
+                self.assign(g, max(exact, key=lambda t: self.single.get((g, t), 0)))
+            else:
+                pending.append(g)
+        for g in pending:
+            anchor = self.gold.anchors[g]
+            overlaps = [
+                (len(anchor & self.test.anchors[t]), self.single.get((g, t), 0), t)
+                for t in self.test.anchors if t not in self.used and anchor & self.test.anchors[t]
+            ]
+            if overlaps:
+                self.assign(g, max(overlaps)[-1])
+        for g in self.gold.instances:
+            if g in self.mapping:
+                continue
+            best, best_gain = None, 0.0
+            for t in self.targets.get(g, ()):
+                if t in self.used:
+                    continue
+                gain = self.gain({g: t})
+                if gain > best_gain:
+                    best, best_gain = t, gain
+            if best is not None:
+                self.assign(g, best)
+
+    def climb(self, max_steps: int = 64) -> int:
+        """
+        bounded hill-climb, takes the best positive move of reassignments and swaps at each step
+        :return: number of steps taken
+        """
+        for step in range(max_steps):
+            best_move, best_gain = None, 0.0
+            for g, targets in self.targets.items():
+                for t in targets:
+                    if self.mapping.get(g, None) == t:
+                        continue
+                    if t in self.used:
+                        # swap with the variable already mapped to t
+                        other = self.used[t]
+                        move = {g: t, other: self.mapping.get(g, None)}
+                    else:
+                        move = {g: t}
+                    gain = self.gain(move)
+                    if gain > best_gain + 1e-9:
+                        best_move, best_gain = move, gain
+            if best_move is None:
+                return step
+            for g in best_move:
+                self.assign(g, None)
+            for g, t in best_move.items():
+                if t is not None:
+                    self.assign(g, t)
+        return max_steps
+
+    def shuffle(self, rng: random.Random):
+        """ random injective mapping among the candidates, a restart point of hill-climb """
+        gold = list(self.targets)
+        rng.shuffle(gold)
+        for g in gold:
+            targets = [t for t in self.targets[g] if t not in self.used]
+            if targets:
+                self.assign(g, rng.choice(targets))
+
+    def search(self, max_steps: int = 64, restarts: int = 4, random_state: int = 880830) -> int:
+        """
+        hill-climbs from the anchored seed, and restarts from the unanchored seed and random mappings
+        unless every triple is matched. the best mapping is kept.
+        :return: matching triples of the best mapping
+        """
+        perfect = min(len(self.gold), len(self.test))
+        rng = random.Random(random_state)
+        best, best_mapping = -1, dict()
+        for start in range(restarts + 1):
+            self.reset()
+            if start < 2:
+                self.seed(anchored=start == 0)
+            else:
+                self.shuffle(rng)
+            self.climb(max_steps=max_steps)
+            matched = self.score()
+            if matched > best:
+                best, best_mapping = matched, dict(self.mapping)
+            if best >= perfect:
+                break
+        self.reset()
+        for g, t in best_mapping.items():
+            self.assign(g, t)
+        return best
+
+
+def compare(gold: str, test: str, max_steps: int = 64, restarts: int = 4) -> tuple[int, int, int]:
+    """
+    :param gold: graph text of the reference run
+    :param test: graph text of the compared run
+    :param max_steps: bound of hill-climb per start
+    :param restarts: number of restarts if the anchored start does not match every triple
+    :return: (matching triples, triples of gold, triples of test)
+    """
+    if gold == test:
+        n = len(parse_graph(gold))
+        return n, n, n
+    gold_graph, test_graph = parse_graph(gold), parse_graph(test)
+    matched = Alignment(gold_graph, test_graph).search(max_steps=max_steps, restarts=restarts)
+    return matched, len(gold_graph), len(test_graph)
+
+
+def f_score(matched: int, gold: int, test: int) -> tuple[float, float, float]:
+    precision = matched / test if test else 0.0
+    recall = matched / gold if gold else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def _open_readers(gold: tuple[str, dict], test: tuple[str, dict]):
+    _READERS['gold'] = BlockReader(gold[0], index=gold[1])
+    _READERS['test'] = BlockReader(test[0], index=test[1])
+
+
+def _compare_chunk(job: tuple[list[str], int, int]) -> list[tuple[str, int, int, int]]:
+    """ worker of process pool: (ids, max_steps, restarts) → [(id, matched, gold, test), ...] """
+    snt_ids, max_steps, restarts = job
+    results = []
+    for snt_id in snt_ids:
+        gold, test = _READERS['gold'].get(snt_id), _READERS['test'].get(snt_id)
+        results.append((snt_id, *compare(gold.graph, test.graph, max_steps=max_steps, restarts=restarts)))
+    return results
+
+
+class RunComparison:
+    def __init__(self, gold_file: str, test_file: str):
+        """
+        compares two output files graph by graph, paired by `::id`
+        :param gold_file: output file of the reference run
+        :param test_file: output file of the compared run
+        """
+        self.gold_file = gold_file
+        self.test_file = test_file
+        self.scores: dict[str, tuple[int, int, int]] = dict()  # {snt_id: (matched, gold, test)}
+        self.missing: list[str] = []  # ids only in gold
+        self.added: list[str] = []  # ids only in test
+
+    def __repr__(self):
+        precision, recall, f1 = self.corpus_score()
+        return f'<{self.__class__.__name__} → graphs: {len(self.scores)}, P: {precision:.4f}, R: {recall:.4f}, F1: {f1:.4f}>'
+
+    def run(self, processes: Optional[int] = None, chunksize: int = 256, max_steps: int = 64, restarts: int = 4):
+        """
+        :param processes: number of worker processes, `os.cpu_count()` if None. 1 for comparing in this process.
+        :param chunksize: number of graphs sent to a worker at once
+        :param max_steps: bound of hill-climb per start
+        :param restarts: number of restarts of hill-climb per graph, if the anchored start is not perfect
+        """
+        start = time.time()
+        gold_index, test_index = index_blocks(self.gold_file), index_blocks(self.test_file)
+        common = [snt_id for snt_id in gold_index if snt_id in test_index]
+        self.missing = [snt_id for snt_id in gold_index if snt_id not in test_index]
+        self.added = [snt_id for snt_id in test_index if snt_id not in gold_index]
+        jobs = [(common[i:i + chunksize], max_steps, restarts) for i in range(0, len(common), chunksize)]
+
+        processes = min(processes or os.cpu_count() or 1, max(1, len(jobs)))
+        desc = f'- comparing {len(common)} graphs ({processes} processes)'
+        readers = ((self.gold_file, gold_index), (self.test_file, test_index))
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_open_readers, initargs=readers) as executor:
+                for results in tqdm(executor.map(_compare_chunk, jobs), total=len(jobs), desc=desc):
+                    self.scores.update((snt_id, scores) for snt_id, *scores in results)
+        else:
+            _open_readers(*readers)
+            for results in tqdm(map(_compare_chunk, jobs), total=len(jobs), desc=desc):
+                self.scores.update((snt_id, scores) for snt_id, *scores in results)
+            for reader in _READERS.values():
+                reader.close()
+        print(f'- {len(self.missing)} missing, {len(self.added)} added, {time.time() - start:.2f} sec lapsed')
+        return self
+
+    def graph_score(self, snt_id: str) -> tuple[float, float, float]:
+        return f_score(*self.scores[snt_id])
+
+    def corpus_score(self) -> tuple[float, float, float]:
+        """ micro-averaged (precision, recall, f1) over all the paired graphs """
+        matched, gold, test = (sum(column) for column in zip(*self.scores.values())) if self.scores else (0, 0, 0)
+        return f_score(matched, gold, test)
+
+    def changed(self, below: float = 1.0) -> list[tuple[str, float]]:
+        """ [(snt_id, f1)] of graphs of which f1 is lower than `below`, from the lowest """
+        scored = [(snt_id, self.graph_score(snt_id)[-1]) for snt_id in self.scores]
+        return sorted([(snt_id, f1) for snt_id, f1 in scored if f1 < below], key=lambda x: x[1])
+
+    def to_tsv(self, filename: str):
+        with open(filename, encoding='utf-8', mode='w') as fp:
+            fp.write('id\tmatched\tgold\ttest\tprecision\trecall\tf1\n')
+            for snt_id, (matched, gold, test) in self.scores.items():
+                precision, recall, f1 = f_score(matched, gold, test)
+                fp.write(f'{snt_id}\t{matched}\t{gold}\t{test}\t{precision:.4f}\t{recall:.4f}\t{f1:.4f}\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='smatch-style comparison of two synthesis runs')
+    parser.add_argument('gold', help='output file of the reference run')
+    parser.add_argument('test', help='output file of the compared run')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-steps', type=int, default=64, help='bound of hill-climb per start')
+    parser.add_argument('--restarts', type=int, default=4, help='restarts of hill-climb per graph')
+    parser.add_argument('--output', default=None, help='per-graph scores in tsv')
+    parser.add_argument('--top', type=int, default=20, help='number of the most changed graphs to be printed')
+    args = parser.parse_args()
+
+    comparison = RunComparison(args.gold, args.test)
+    comparison.run(processes=args.processes, max_steps=args.max_steps, restarts=args.restarts)
+    for changed_id, changed_f1 in comparison.changed()[:args.top]:
+        print(f'{changed_id}\t{changed_f1:.4f}')
+    corpus_precision, corpus_recall, corpus_f1 = comparison.corpus_score()
+    print(f'- P: {corpus_precision:.4f}, R: {corpus_recall:.4f}, F1: {corpus_f1:.4f}')
+    if args.output:
+        comparison.to_tsv(args.output)
@@ -1,6 +1,8 @@
 import glob
+import hashlib
 import time
 import random
+import threading
 from typing import Any, Union, Optional
 from collections import defaultdict
 from tqdm import tqdm
@@ -10,6 +12,9 @@ from synthetics.utils.originals import load_json, save_pickle, load_pickle, time
 
 SENTENCE_LEVEL_LAYERS = {'pos': 'morpheme', 'wsd': 'WSD', 'ner': 'NE', 'el': 'NE', 'dep': 'DP', 'srl': 'SRL'}
 DOCUMENT_LEVEL_LAYERS = {'za': 'ZA', 'cr': 'CR'}
+# sentences are released by the writer of `StreamingPipeline` and rejected ones by the reader thread of
+# `filter_by(release=True)`, the count of released sentences of a document is updated under this lock.
+_RELEASE_LOCK = threading.Lock()
 DATATYPES_BY_LAYER = {
     'pos': POSLayer,
     'wsd': WSDLayer,
@@ -56,8 +61,26 @@ class Annotations:
     def word(self, word_id: int):
         return self.super.word.get(word_id, None)
 
+    def fingerprint(self) -> str:
+        """
+        content hash over the form, the word index and payloads of all layers of the sentence.
+        ids of sentences referred by ZA/CR items are left out, so that identical sentences in different documents
+        share the same fingerprint.
+        :return: hex digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.form.encode('utf-8'))
+        digest.update(repr((sorted(self.super.index.items()), sorted(self.super.word.items()))).encode('utf-8'))
+        for layer in DATATYPES_BY_LAYER:
+            instance = getattr(self, layer)
+            payload = instance.astuple(exclude=('sentence_id', )) if instance is not None else None
+            digest.update(f'{layer}={payload!r};'.encode('utf-8'))
+        return digest.hexdigest()
+
 
 class Sentence:
+    released: bool = False  # class-level default keeps corpora pickled before `release()` loadable
+
     def __init__(self, snt_id: str, super_instance: Any = None):
         self.ref_id = snt_id
         self.forms = defaultdict(set)
@@ -105,7 +128,7 @@ class Sentence:
             return self.annotations.get('za')
         # filter by sentence_id in predicate to get rid of irrelevant items to current Sentence
         za_list = [za for za in self.super.doc_za if za.predicate.sentence_id == self.ref_id]
-        za_dict = [dict(predicate=z.predicate.__dict__, antecedent=[a.__dict__ for a in z.antecedent]) for z in za_list]
+        za_dict = [dict(predicate=z.predicate.todict(), antecedent=[a.todict() for a in z.antecedent]) for z in za_list]
         for za_item in za_dict:
             za_item['antecedent'] = [a for a in za_item['antecedent'] if a['sentence_id'] in ('-1', self.ref_id)]
         return ZALayer(layer='za', data=[za_item for za_item in za_dict if za_item['antecedent']], super_instance=self)
@@ -119,7 +142,7 @@ class Sentence:
             return self.annotations.get('cr')
         valid_clusters = []
         for cr_item in self.super.doc_cr:
-            intra_sentence_coreference = [m.__dict__ for m in cr_item.mention if m.sentence_id == self.ref_id]
+            intra_sentence_coreference = [m.todict() for m in cr_item.mention if m.sentence_id == self.ref_id]
             if len(intra_sentence_coreference) > 1:
                 valid_clusters.append(intra_sentence_coreference)
         return CRLayer(layer='cr', data=[dict(mention=cluster) for cluster in valid_clusters], super_instance=self)
@@ -175,8 +198,25 @@ class Sentence:
         assert layer in SENTENCE_LEVEL_LAYERS
         self.annotations.add(layer, DATATYPES_BY_LAYER[layer](layer=layer, data=data, super_instance=self))
 
+    def release(self):
+        """
+        streaming consumption: drops layer objects and the word index once the sentence is consumed,
+        only `ref_id` and `forms` are kept. the document is released as well when all of its sentences are.
+        """
+        with _RELEASE_LOCK:
+            if self.released:
+                return
+            self.annotations = Annotations(self)
+            self.index = dict()
+            self.word = dict()
+            self.released = True
+            if self.super is not None:
+                self.super.release_sentence(self)
+
 
 class Document:
+    released_sentences: int = 0  # class-level default keeps corpora pickled before `release()` loadable
+
     def __init__(self, doc_id: str, super_instance=None):
         self.ref_id = doc_id
         self.sentences = defaultdict(Sentence)
@@ -200,6 +240,17 @@ class Document:
         assert layer in DOCUMENT_LEVEL_LAYERS
         self.annotations[layer] = DATATYPES_BY_LAYER[layer](layer=layer, data=data, super_instance=self)
 
+    def release_sentence(self, sentence: Sentence):
+        self.released_sentences += 1
+        if self.released_sentences >= len(self.sentences):
+            self.release()
+
+    def release(self):
+        """ drops document-level layers, and detaches the document from the corpus """
+        self.annotations = defaultdict(Layer)
+        if self.super is not None:
+            self.super.release_document(self)
+
     @property
     def doc_cr(self) -> list[CRItem]:
         return self.get_annotation('cr').data
@@ -245,7 +296,15 @@ class Corpus:
         return (document for document in self.documents)
 
     def iter_sentences(self):
-        return (self.get_sentence(snt_id) for snt_id in self.index)
+        # iterates over a snapshot of ids, since released documents are removed from the index on the way
+        return (self.get_sentence(snt_id) for snt_id in list(self.index) if snt_id in self.index)
+
+    def release_document(self, document: Document):
+        for snt_id in document.sentences:
+            if self.index.get(snt_id, None) == document.ref_id:
+                del self.index[snt_id]
+        if self.documents.get(document.ref_id, None) is document:
+            del self.documents[document.ref_id]
 
     def filter_by(
             self,
@@ -254,13 +313,22 @@ class Corpus:
             exclude: Optional[Union[str, list]] = None,
             startswith: Optional[Union[str, list]] = None,
             endswith:  Optional[Union[str, list]] = None,
-            random_state: int = None
+            random_state: int = None,
+            release: bool = False
     ):
+        """
+        yields sentences satisfying all the conditions
+        :param release: streaming consumption mode. rejected sentences are released at once, and yielded ones
+                        are expected to be released by the consumer with `Sentence.release()` after use,
+                        so that each document is dropped from the corpus as soon as all of its sentences are done.
+        """
         pool = list(self.index)
         if random_state:
             random.seed(random_state)
             random.shuffle(pool)
         for snt_id in pool:
+            if snt_id not in self.index:
+                continue
             sentence = self.get_sentence(snt_id).canonical_form
             valid = True
             valid = len_range[0] <= len(sentence) <= len_range[-1] and valid if len_range else valid
@@ -270,6 +338,8 @@ class Corpus:
             valid = any([sentence.endswith(suffix) for suffix in list(endswith)]) and valid if endswith else valid
             if valid:
                 yield self.get_sentence(snt_id)
+            elif release:
+                self.get_sentence(snt_id).release()
 
     def sample_documents(self, k: int, random_state: int = None):
         assert k <= len(self.documents)
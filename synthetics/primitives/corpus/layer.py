@@ -1,11 +1,52 @@
+import sys
 import pprint
 from synthetics.utils.originals import subgroups
 
 
+def intern(value):
+    """ `sys.intern()` for strings, so that repeated labels and URLs share a single object. the others as is. """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
 class Item:
-    """ super class for individual label or sub-structural items in annotation layer """
+    """
+    super class for individual label or sub-structural items in annotation layer.
+    subclasses declare `__slots__` in the order of assignment in `__init__`, which is the order of `astuple()`,
+    and `interned` for string attributes to be interned.
+    """
+    __slots__ = ()
+    interned: tuple[str, ...] = ()
+
     def __repr__(self):
-        return f'<{self.__class__.__name__}→{self.__dict__}>'
+        return f'<{self.__class__.__name__}→{self.todict()}>'
+
+    def __getstate__(self):
+        return self.todict()
+
+    def __setstate__(self, state):
+        # `dict` of pickles made before items had slots, or of `__getstate__()`
+        if isinstance(state, tuple):
+            state = {**(state[0] or dict()), **state[1]}
+        for key, value in state.items():
+            setattr(self, key, intern(value) if key in self.interned else value)
+
+    def todict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def astuple(self, exclude: tuple[str, ...] = ()) -> tuple:
+        """
+        nested tuple of (attribute, value) pairs. sub-items and lists of sub-items are converted recursively.
+        :param exclude: names of attributes to be left out (ex. "sentence_id")
+        """
+        return tuple((key, _astuple(getattr(self, key), exclude)) for key in self.__slots__ if key not in exclude)
+
+
+def _astuple(value, exclude: tuple[str, ...]):
+    if isinstance(value, Item):
+        return value.astuple(exclude=exclude)
+    if isinstance(value, list):
+        return tuple(_astuple(v, exclude) for v in value)
+    return value
 
 
 class Layer:
@@ -29,12 +70,18 @@ class Layer:
     def tolist(self):
         return self.data
 
+    def astuple(self, exclude: tuple[str, ...] = ()) -> tuple:
+        return tuple(_astuple(item, exclude) for item in self.data)
+
 
 class POSItem(Item):
+    __slots__ = ('id', 'form', 'label', 'word_id', 'position')
+    interned = ('label',)
+
     def __init__(self, **kwargs):
         self.id: int = kwargs['id']
         self.form: str = kwargs['form']
-        self.label: str = kwargs['label']
+        self.label: str = intern(kwargs['label'])
         self.word_id: int = kwargs['word_id']
         self.position: int = kwargs['position']
 
@@ -79,10 +126,13 @@ class POSLayer(Layer):
 
 
 class NERItem(Item):
+    __slots__ = ('id', 'form', 'label', 'begin', 'end')
+    interned = ('label',)
+
     def __init__(self, **kwargs):
         self.id: int = kwargs['id']
         self.form: str = kwargs['form']
-        self.label: str = kwargs['label']
+        self.label: str = intern(kwargs['label'])
         self.begin: int = kwargs['begin']
         self.end: int = kwargs['end']
 
@@ -96,15 +146,18 @@ class NERLayer(Layer):
 
 
 class ELItem(Item):
+    __slots__ = ('id', 'form', 'label', 'begin', 'end', 'k_id', 'wiki_id', 'url')
+    interned = ('label', 'url')
+
     def __init__(self, **kwargs):
         self.id: int = kwargs['id']
         self.form: str = kwargs['form']
-        self.label: str = kwargs['label']
+        self.label: str = intern(kwargs['label'])
         self.begin: int = kwargs['begin']
         self.end: int = kwargs['end']
         self.k_id: str = kwargs['kid'] if 'kid' in kwargs else kwargs['k_id']
         self.wiki_id: str = kwargs['wikiid'] if 'wikiid' in kwargs else kwargs['wiki_id']
-        self.url: str = kwargs['URL'] if 'URL' in kwargs else kwargs['url']
+        self.url: str = intern(kwargs['URL'] if 'URL' in kwargs else kwargs['url'])
 
 
 class ELLayer(Layer):
@@ -116,10 +169,13 @@ class ELLayer(Layer):
 
 
 class WSDItem(Item):
+    __slots__ = ('word', 'sense_id', 'pos', 'begin', 'end', 'word_id')
+    interned = ('pos',)
+
     def __init__(self, **kwargs):
         self.word: str = kwargs['word']
         self.sense_id: int = kwargs['sense_id']
-        self.pos: str = kwargs['pos']
+        self.pos: str = intern(kwargs['pos'])
         self.begin: int = kwargs['begin']
         self.end: int = kwargs['end']
         self.word_id: int = kwargs['word_id']
@@ -137,11 +193,14 @@ class WSDLayer(Layer):
 
 
 class DEPItem(Item):
+    __slots__ = ('word_id', 'word_form', 'head', 'label', 'dependent')
+    interned = ('label',)
+
     def __init__(self, **kwargs):
         self.word_id: int = kwargs['word_id']
         self.word_form: str = kwargs['word_form']
         self.head: int = kwargs['head']
-        self.label: str = kwargs['label']
+        self.label: str = intern(kwargs['label'])
         self.dependent: list[int] = kwargs['dependent']
 
 
@@ -154,6 +213,8 @@ class DEPLayer(Layer):
 
 
 class SRLPredicate(Item):
+    __slots__ = ('form', 'begin', 'end', 'lemma')
+
     def __init__(self, **kwargs):
         self.form: str = kwargs['form']
         self.begin: int = kwargs['begin']
@@ -162,21 +223,26 @@ class SRLPredicate(Item):
 
 
 class SRLArgument(Item):
+    __slots__ = ('form', 'label', 'begin', 'end', 'word_id')
+    interned = ('label',)
+
     def __init__(self, **kwargs):
         self.form: str = kwargs['form']
-        self.label: str = kwargs['label']
+        self.label: str = intern(kwargs['label'])
         self.begin: int = kwargs['begin']
         self.end: int = kwargs['end']
         self.word_id: int = kwargs['word_id']
 
 
 class SRLItem(Item):
+    __slots__ = ('predicate', 'argument')
+
     def __init__(self, **kwargs):
         self.predicate: SRLPredicate = SRLPredicate(**kwargs['predicate'])
         self.argument: list[SRLArgument] = [SRLArgument(**arg) for arg in kwargs['argument']]
 
     def __repr__(self):
-        return f'<{self.__class__.__name__}→\n{pprint.pformat(self.__dict__, indent=2)}>'
+        return f'<{self.__class__.__name__}→\n{pprint.pformat(self.todict(), indent=2)}>'
 
 
 class SRLLayer(Layer):
@@ -188,6 +254,8 @@ class SRLLayer(Layer):
 
 
 class CRMention(Item):
+    __slots__ = ('sentence_id', 'form', 'begin', 'end', 'ne_id')
+
     def __init__(self, **kwargs):
         self.sentence_id: str = kwargs['sentence_id']
         self.form: str = kwargs['form']
@@ -197,6 +265,8 @@ class CRMention(Item):
 
 
 class CRItem(Item):
+    __slots__ = ('mention',)
+
     def __init__(self, **kwargs):
         self.mention: list[CRMention] = [CRMention(**arg) for arg in kwargs['mention']]
 
@@ -210,6 +280,8 @@ class CRLayer(Layer):
 
 
 class ZAPredicate(Item):
+    __slots__ = ('form', 'sentence_id', 'begin', 'end')
+
     def __init__(self, **kwargs):
         self.form: str = kwargs['form']
         self.sentence_id: str = kwargs['sentence_id']
@@ -218,21 +290,26 @@ class ZAPredicate(Item):
 
 
 class ZAAntecedent(Item):
+    __slots__ = ('form', 'type', 'sentence_id', 'begin', 'end')
+    interned = ('type',)
+
     def __init__(self, **kwargs):
         self.form: str = kwargs['form']
-        self.type: str = kwargs['type']
+        self.type: str = intern(kwargs['type'])
         self.sentence_id: str = kwargs['sentence_id']
         self.begin: int = kwargs['begin']
         self.end: int = kwargs['end']
 
 
 class ZAItem(Item):
+    __slots__ = ('predicate', 'antecedent')
+
     def __init__(self, **kwargs):
         self.predicate: ZAPredicate = ZAPredicate(**kwargs['predicate'])
         self.antecedent: list[ZAAntecedent] = [ZAAntecedent(**a_kwargs) for a_kwargs in kwargs['antecedent']]
 
     def __repr__(self):
-        return f'<{self.__class__.__name__}→\n{pprint.pformat(self.__dict__, indent=2)}>'
+        return f'<{self.__class__.__name__}→\n{pprint.pformat(self.todict(), indent=2)}>'
 
 
 class ZALayer(Layer):
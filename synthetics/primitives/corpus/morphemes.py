@@ -0,0 +1,208 @@
+import re
+import sys
+import time
+from array import array
+from os.path import exists
+from typing import Iterable, Iterator, Optional
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import Corpus, Sentence
+from synthetics.utils.originals import save_pickle, load_pickle, subgroups
+
+# bump it whenever the layout of `MorphemeIndex` changes, to invalidate stale pickles
+MORPHEME_INDEX_VERSION = 1
+
+# `form/TAG` literals of a query, which are required by the regex if they are outside of groups
+LITERAL = re.compile(r'[^\\^$.|?*+()\[\]{}/\s]+/[A-Z]+')
+QUANTIFIERS = frozenset('?*{')
+
+
+def required_literals(query: str) -> list[str]:
+    """
+    `form/TAG` literals which every word matching `query` must contain, used to narrow the vocabulary down.
+    literals in groups are skipped, and nothing is returned for top-level alternations.
+    ex) r"^결과/NNG(\\+,/SP)?$" → ["결과/NNG"], r"(NNG|VV)\\+.+/ETM$" → []
+    """
+    literals, depth, n = [], 0, 0
+    while n < len(query):
+        char = query[n]
+        if char == '\\':
+            n += 2
+            continue
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and char == '|':
+            return []
+        elif depth == 0:
+            matched = LITERAL.match(query, n)
+            if matched:
+                end = matched.end()
+                # a quantifier right after makes the last character optional
+                if end >= len(query) or query[end] not in QUANTIFIERS:
+                    literals.append(matched.group())
+                n = end
+                continue
+        n += 1
+    return literals
+
+
+class MorphemeIndex:
+    def __init__(self):
+        """
+        inverted index of POS-tagged words and their morphemes to positions in sentences.
+        words are strings of `POSLayer.numbered_items()` (ex. "크/VA+ㄴ/ETM") and morphemes are their `form/TAG` parts.
+        index = MorphemeIndex.from_corpus(corpus)
+        index.query(r"ETM$ ^가운데/NNG")
+        >> [('NWRW1800000022.417.1.1', [3, 4]), ...]
+        """
+        self.sentences: list[str] = []  # handle → snt_id
+        self.sequences: list[array] = []  # handle → word ids of the sentence in order
+        self.words: list[str] = []  # word id → word string
+        self.vocabulary: dict[str, int] = dict()  # word string → word id
+        self.postings: dict[int, array] = dict()  # word id → interleaved (handle, position) pairs
+        self.morphemes: dict[str, array] = dict()  # morpheme → word ids which contain it
+        self.memo: dict[str, frozenset[int]] = dict()  # query → matching word ids
+        self.version = MORPHEME_INDEX_VERSION
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} → sentences: {len(self)}, words: {len(self.words)}, '
+                f'morphemes: {len(self.morphemes)}>')
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['memo'] = dict()
+        return state
+
+    @staticmethod
+    def from_corpus(corpus: Corpus) -> 'MorphemeIndex':
+        index = MorphemeIndex()
+        for sentence in tqdm(corpus.iter_sentences(), total=len(corpus), desc=f'- indexing {len(corpus)} sentences'):
+            index.add_sentence(sentence)
+        return index
+
+    def add_sentence(self, sentence: Sentence):
+        pos = sentence.annotations.pos
+        if pos is None:
+            return
+        handle = len(self.sentences)
+        self.sentences.append(sentence.ref_id)
+        sequence = array('I')
+        # morphemes are taken from items, since forms may contain "+" (ex. "+/SW")
+        groups = subgroups(items=pos.tolist(), by='word_id', starts_from=1)
+        for (position, word), items in zip(pos.numbered_items(), groups):
+            word_id = self.vocabulary.get(word, None)
+            if word_id is None:
+                word_id = self.add_word(word, morphemes=[f'{item.form}/{item.label}' for item in items])
+            sequence.append(word_id)
+            postings = self.postings[word_id]
+            postings.append(handle)
+            postings.append(position)
+        self.sequences.append(sequence)
+        self.memo = dict()
+
+    def add_word(self, word: str, morphemes: list[str]) -> int:
+        word_id = len(self.words)
+        self.words.append(word)
+        self.vocabulary[word] = word_id
+        self.postings[word_id] = array('I')
+        for morpheme in dict.fromkeys(morphemes):
+            self.morphemes.setdefault(morpheme, array('I')).append(word_id)
+        return word_id
+
+    def lookup_word(self, word: str) -> list[tuple[str, int]]:
+        """ [(snt_id, position)] of an exact word string, ex. "받/VV+는/ETM" """
+        word_id = self.vocabulary.get(word, None)
+        return list(self.iter_postings([word_id])) if word_id is not None else []
+
+    def lookup_morpheme(self, morpheme: str) -> list[tuple[str, int]]:
+        """ [(snt_id, position)] of words which contain an exact morpheme, ex. "가운데/NNG" """
+        return list(self.iter_postings(self.morphemes.get(morpheme, [])))
+
+    def iter_postings(self, word_ids: Iterable[int]) -> Iterator[tuple[str, int]]:
+        for word_id in word_ids:
+            postings = self.postings[word_id]
+            for n in range(0, len(postings), 2):
+                yield self.sentences[postings[n]], postings[n + 1]
+
+    def candidate_words(self, query: str) -> Iterable[int]:
+        """ word ids which may match `query`, narrowed by its required literals through the morpheme index """
+        literals = required_literals(query)
+        if not literals:
+            return range(len(self.words))
+        candidates = None
+        for literal in literals:
+            # a literal may be a part of longer morphemes (ex. "가운데/NN" of "한가운데/NNG")
+            word_ids = set()
+            for morpheme, ids in self.morphemes.items():
+                if literal in morpheme:
+                    word_ids.update(ids)
+            candidates = word_ids if candidates is None else candidates & word_ids
+        return candidates
+
+    def match_words(self, query: str) -> frozenset[int]:
+        """ word ids of which string matches `query` by `re.search()`, memoized per query """
+        if query not in self.memo:
+            compiled = re.compile(query)
+            self.memo[query] = frozenset(i for i in self.candidate_words(query) if compiled.search(self.words[i]))
+        return self.memo[query]
+
+    def query(self, pattern: str, limit: Optional[int] = None) -> list[tuple[str, list[int]]]:
+        """
+        windows of consecutive words matching space-separated regexes of `pattern`, as `match_windows()` finds them
+        over every sentence. the rarest query drives the candidate positions, and the others are checked by
+        the word ids of the sentence.
+        :param pattern: ex. r"ETM$ ^가운데/NNG", as the first element of values of `PERIPHRASTIC_CONSTRUCTIONS`
+        :param limit: max number of windows
+        :return: [(snt_id, [word positions of window])] in the order of sentences and positions
+        """
+        queries = pattern.split()
+        matched = [self.match_words(q) for q in queries]
+        if not all(matched):
+            return []
+        sizes = [sum(len(self.postings[i]) for i in word_ids) for word_ids in matched]
+        pivot = sizes.index(min(sizes))
+        windows = set()
+        for word_id in matched[pivot]:
+            postings = self.postings[word_id]
+            for n in range(0, len(postings), 2):
+                handle, position = postings[n], postings[n + 1]
+                begin = position - pivot  # 1-based position of the first word of window
+                sequence = self.sequences[handle]
+                if begin < 1 or begin + len(queries) - 1 > len(sequence):
+                    continue
+                if all(sequence[begin - 1 + k] in matched[k] for k in range(len(queries)) if k != pivot):
+                    windows.add((handle, begin))
+        results = []
+        for handle, begin in sorted(windows)[:limit]:
+            results.append((self.sentences[handle], list(range(begin, begin + len(queries)))))
+        return results
+
+    def to_pickle(self, filename: str):
+        save_pickle(filename=filename, instance=self)
+
+    @staticmethod
+    def from_pickle(filename: str) -> Optional['MorphemeIndex']:
+        index = load_pickle(filename)
+        if getattr(index, 'version', None) != MORPHEME_INDEX_VERSION:
+            return None
+        return index
+
+
+if __name__ == '__main__':
+    # python -m synthetics.primitives.corpus.morphemes "ETM$ ^가운데/NNG"
+    # the index is built once and reused by later queries, delete `morphemes.pkl` to rebuild it
+    morpheme_index = MorphemeIndex.from_pickle('morphemes.pkl') if exists('morphemes.pkl') else None
+    if morpheme_index is None:
+        morpheme_index = MorphemeIndex.from_corpus(Corpus.from_pickle('../corpus.pkl'))
+        morpheme_index.to_pickle('morphemes.pkl')
+    print(morpheme_index)
+
+    start = time.time()
+    found = morpheme_index.query(sys.argv[1])
+    print(f'- {len(found)} windows of `{sys.argv[1]}`, {time.time() - start:.2f} sec lapsed')
+    for snt_id, positions in found[:20]:
+        print(snt_id, positions)
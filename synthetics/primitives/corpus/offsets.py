@@ -0,0 +1,181 @@
+import re
+import json
+import mmap
+import time
+from os.path import exists
+from typing import Any, Optional
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import Document, Sentence, SENTENCE_LEVEL_LAYERS, DOCUMENT_LEVEL_LAYERS
+from synthetics.utils.originals import save_pickle, load_pickle, file_signature, timestamp
+
+# bump it whenever the layout of `OffsetIndex` changes, to invalidate stale caches
+OFFSET_INDEX_VERSION = 1
+
+# strings (with or without following `:` of keys) and brackets. numbers, literals, commas and blanks are skipped,
+# and brackets inside of strings are never matched since the whole string is consumed at once.
+TOKENS = re.compile(rb'"(?:[^"\\]|\\.)*"(\s*:)?|[{}\[\]]')
+
+
+def scan_offsets(filename: str) -> tuple[dict[str, tuple[int, int]], dict[str, tuple[str, int, int]]]:
+    """
+    byte offsets of document objects in `$.document[*]` and sentence objects in `$.document[*].sentence[*]`
+    :param filename: modu corpus json file
+    :return: ({doc_id: (begin, end)}, {snt_id: (doc_id, begin, end)})
+    """
+    documents, sentences = dict(), dict()
+    with open(filename, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        # stack of [bracket, key in the parent object, begin, id of the object]
+        stack: list[list[Any]] = []
+        key: Optional[bytes] = None
+        for token in TOKENS.finditer(buffer):
+            char = token.group()[:1]
+            if char == b'"':
+                if token.group(1):
+                    key = token.group()[:token.start(1) - token.start()]
+                    continue
+                if key == b'"id"' and stack and stack[-1][0] == b'{' and stack[-1][3] is None:
+                    stack[-1][3] = json.loads(token.group())
+                key = None
+            elif char in b'{[':
+                stack.append([char, key, token.start(), None])
+                key = None
+            else:
+                bracket, parent_key, begin, ref_id = stack.pop()
+                key = None
+                if bracket != b'{' or len(stack) < 2:
+                    continue
+                # a document is the object in `document` array of the root, a sentence is in `sentence` of a document
+                if len(stack) == 2 and stack[-1][1] == b'"document"':
+                    documents[ref_id] = (begin, token.end())
+                elif len(stack) == 4 and stack[-1][1] == b'"sentence"' and stack[-3][1] == b'"document"':
+                    sentences[ref_id] = (stack[-2][3], begin, token.end())
+    return documents, sentences
+
+
+class OffsetIndex:
+    def __init__(self, files: dict[str, str], cache_file: Optional[str] = 'offsets.pkl'):
+        """
+        one-time scan of byte offsets of documents and sentences in every layer file. the index is cached,
+        and it is rebuilt if any layer file is added, removed or modified since.
+        index = OffsetIndex(files={'pos': '.../pos/NXMP1902008040.json', ...})
+        index.load_sentence('NWRW1800000022.417.1.1')
+        >> <Sentence → id: NWRW1800000022.417.1.1, ...>
+        :param files: {layer: filename}, same as `Corpus(files=...)`
+        :param cache_file: pickled offsets. pass None to scan files every time.
+        """
+        self.files = dict(files)
+        self.signature = file_signature(self.files.values())
+        self.documents: dict[str, dict[str, tuple[int, int]]] = dict()  # {doc_id: {layer: (begin, end)}}
+        self.sentences: dict[str, dict[str, tuple[int, int]]] = dict()  # {snt_id: {layer: (begin, end)}}
+        self.parents: dict[str, str] = dict()  # {snt_id: doc_id}
+        self.buffers: dict[str, mmap.mmap] = dict()
+        if not (cache_file and self.from_cache(cache_file)):
+            self.scan()
+            if cache_file:
+                self.to_cache(cache_file)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → layers: {tuple(self.files)}, documents: {len(self.documents)}, sentences: {len(self)}>'
+
+    def __contains__(self, snt_id: str):
+        return snt_id in self.sentences
+
+    def scan(self):
+        for layer, filename in tqdm(self.files.items(), desc=f'- scanning offsets of {len(self.files)} layer files'):
+            documents, sentences = scan_offsets(filename)
+            for doc_id, span in documents.items():
+                self.documents.setdefault(doc_id, dict())[layer] = span
+            for snt_id, (doc_id, begin, end) in sentences.items():
+                self.sentences.setdefault(snt_id, dict())[layer] = (begin, end)
+                self.parents[snt_id] = doc_id
+
+    def to_cache(self, filename: str):
+        payload = dict(
+            version=OFFSET_INDEX_VERSION,
+            signature=self.signature,
+            update=timestamp(),
+            documents=self.documents,
+            sentences=self.sentences,
+            parents=self.parents
+        )
+        save_pickle(filename=filename, instance=payload)
+
+    def from_cache(self, filename: str) -> bool:
+        if not exists(filename):
+            return False
+        payload = load_pickle(filename)
+        if payload.get('version') != OFFSET_INDEX_VERSION or payload.get('signature') != self.signature:
+            return False
+        self.documents, self.sentences, self.parents = payload['documents'], payload['sentences'], payload['parents']
+        return True
+
+    def close(self):
+        for buffer in self.buffers.values():
+            buffer.close()
+        self.buffers = dict()
+
+    def buffer(self, layer: str) -> mmap.mmap:
+        if layer not in self.buffers:
+            with open(self.files[layer], 'rb') as fp:
+                # the mapping stays valid after the file object is closed
+                self.buffers[layer] = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.buffers[layer]
+
+    def read(self, layer: str, span: tuple[int, int]) -> dict:
+        """ decodes only the slice of json object """
+        begin, end = span
+        return json.loads(self.buffer(layer)[begin:end])
+
+    def read_sentence(self, snt_id: str, layer: str) -> Optional[dict]:
+        span = self.sentences.get(snt_id, dict()).get(layer)
+        return self.read(layer, span) if span else None
+
+    def read_document(self, doc_id: str, layer: str) -> Optional[dict]:
+        span = self.documents.get(doc_id, dict()).get(layer)
+        return self.read(layer, span) if span else None
+
+    def load_sentence(self, snt_id: str) -> Optional[Sentence]:
+        """
+        rebuilds a Sentence with all of its layers as `Corpus.from_files()` does, from the slices of layer files.
+        the sentence is bound to a standalone Document which has document-level layers only.
+        :param snt_id: id of sentence
+        :return: Sentence or None if unknown
+        """
+        if snt_id not in self.sentences:
+            return None
+        doc_id = self.parents[snt_id]
+        document = Document(doc_id=doc_id)
+        sentence = Sentence(snt_id=snt_id, super_instance=document)
+        document.add_sentence(snt_id=snt_id, instance=sentence)
+        for layer, span in self.sentences[snt_id].items():
+            _snt = self.read(layer, span)
+            sentence.add_form(form=_snt['form'], layer=layer)
+            if layer in SENTENCE_LEVEL_LAYERS:
+                sentence.add_annotation(layer=layer, data=_snt[SENTENCE_LEVEL_LAYERS[layer]])
+                if layer == 'dep' and 'word' in _snt:
+                    sentence.add_word_index(_snt['word'])
+        for layer in DOCUMENT_LEVEL_LAYERS:
+            if layer in self.files and layer in self.documents.get(doc_id, dict()):
+                _doc = self.read_document(doc_id, layer)
+                document.add_annotation(layer=layer, data=_doc[DOCUMENT_LEVEL_LAYERS[layer]])
+        sentence.doc_to_snt_annotation()
+        return sentence
+
+
+if __name__ == '__main__':
+    import glob
+    from synthetics.pipeline import synthesize
+
+    # macOS: '/Users/choe.hyonsu.gabrielle/modu-corenlp-essential/layers-complete/*/*.json'
+    search_space = 'D:/Corpora & Language Resources/modu-corenlp/layers-complete/*/*.json'
+    target_files = {layer.replace('\\', '/').split('/')[-2]: layer for layer in glob.glob(search_space)}
+    offsets = OffsetIndex(files=target_files)
+    print(offsets)
+
+    start = time.time()
+    snt = offsets.load_sentence(next(iter(offsets.sentences)))
+    print(f'- loading {snt}, {(time.time() - start) * 1000:.2f} ms lapsed')
+    print(synthesize(snt))
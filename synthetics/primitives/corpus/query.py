@@ -0,0 +1,368 @@
+import re
+import sys
+import time
+from array import array
+from typing import Any, Iterator, Optional, Union
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import Corpus, Sentence
+from synthetics.utils.originals import save_pickle, load_pickle, subgroups
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+Structural queries over DEP, SRL and NER layers of a corpus
+
+    srl[role = ARGM-LOC and arg.pos ~ ^NNP]       an SRL argument of ARGM-LOC whose word starts with NNP
+    ner[words > 3] and not dep[label = VNP]       an NE spanning more than 3 words, and no VNP word
+    dep[label ~ _SBJ$ and head.pos ~ VV] or len >= 30
+
+a query is a boolean expression (`and`, `or`, `not`, parentheses) of sentence-level comparisons and
+`table[...]` clauses, which are true if any row of the table in the sentence satisfies the row expression.
+operators are `=`, `!=`, `<`, `<=`, `>`, `>=` and `~`, `!~` for regex search over categorical values.
+every comparison runs over a whole column at once, with numpy if it is installed and arrays otherwise.
+"""
+
+QUERY_INDEX_VERSION = 1
+
+# {table: {column: categorical or not}}, `sentence` column of each table refers to handles of sentences
+SCHEMA = {
+    'sentence': {'len': False, 'chars': False},
+    'dep': {
+        'word': False, 'head': False, 'label': True, 'pos': True, 'form': True, 'head.label': True, 'head.pos': True
+    },
+    'srl': {
+        'role': True, 'pred.lemma': True, 'pred.word': False, 'pred.pos': True,
+        'arg.word': False, 'arg.pos': True, 'arg.label': True, 'arg.form': True
+    },
+    'ner': {'label': True, 'form': True, 'begin': False, 'end': False, 'words': False, 'chars': False}
+}
+
+TOKENS = re.compile(r'\s*(?:(?P<punct>[()\[\]])|(?P<op>!=|<=|>=|!~|=|<|>|~)|(?P<string>"(?:[^"\\]|\\.)*")'
+                    r'|(?P<word>[^\s()\[\]=<>!~"]+))')
+KEYWORDS = frozenset({'and', 'or', 'not'})
+
+
+class Column:
+    def __init__(self, categorical: bool = False):
+        """
+        a column of integers. categorical values are stored as codes of `vocabulary`.
+        :param categorical: whether values are strings
+        """
+        self.categorical = categorical
+        self.values: Any = array('i')
+        self.vocabulary: list[str] = []
+        self.codes: dict[str, int] = dict()
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value: Union[int, str, None]):
+        if self.categorical:
+            value = '' if value is None else value
+            code = self.codes.get(value, None)
+            if code is None:
+                code = self.codes[value] = len(self.vocabulary)
+                self.vocabulary.append(value)
+            self.values.append(code)
+        else:
+            self.values.append(-1 if value is None else value)
+
+    def freeze(self):
+        if numpy is not None and not isinstance(self.values, numpy.ndarray):
+            self.values = numpy.frombuffer(self.values, dtype=numpy.int32) if len(self.values) else \
+                numpy.zeros(0, dtype=numpy.int32)
+
+    def compare(self, op: str, literal: str):
+        """ mask of rows satisfying `value op literal` """
+        if self.categorical:
+            if op in ('~', '!~'):
+                pattern = re.compile(literal)
+                codes = [code for code, value in enumerate(self.vocabulary) if pattern.search(value)]
+                mask = isin(self.values, codes)
+                return mask if op == '~' else negate(mask)
+            if op not in ('=', '!='):
+                raise ValueError(f'`{op}` is not applicable to categorical values: {literal}')
+            code = self.codes.get(literal, -1)
+            return compare(self.values, op, code)
+        if op in ('~', '!~'):
+            raise ValueError(f'`{op}` is not applicable to numerical values: {literal}')
+        return compare(self.values, op, int(literal))
+
+
+# vectorized operations, over numpy arrays if available and over arrays (as lists of bools) otherwise
+
+def compare(values, op: str, scalar: int):
+    if numpy is not None:
+        return {'=': numpy.equal, '!=': numpy.not_equal, '<': numpy.less, '<=': numpy.less_equal,
+                '>': numpy.greater, '>=': numpy.greater_equal}[op](values, scalar)
+    if op == '=':
+        return [v == scalar for v in values]
+    if op == '!=':
+        return [v != scalar for v in values]
+    if op == '<':
+        return [v < scalar for v in values]
+    if op == '<=':
+        return [v <= scalar for v in values]
+    if op == '>':
+        return [v > scalar for v in values]
+    return [v >= scalar for v in values]
+
+
+def isin(values, codes: list[int]):
+    if numpy is not None:
+        return numpy.isin(values, numpy.asarray(codes, dtype=numpy.int32))
+    codes = set(codes)
+    return [v in codes for v in values]
+
+
+def conjunct(left, right):
+    if numpy is not None:
+        return numpy.logical_and(left, right)
+    return [a and b for a, b in zip(left, right)]
+
+
+def disjunct(left, right):
+    if numpy is not None:
+        return numpy.logical_or(left, right)
+    return [a or b for a, b in zip(left, right)]
+
+
+def negate(mask):
+    if numpy is not None:
+        return numpy.logical_not(mask)
+    return [not m for m in mask]
+
+
+def any_by_sentence(sentences, mask, size: int):
+    """ mask of sentences which have any row in `mask` """
+    if numpy is not None:
+        found = numpy.zeros(size, dtype=bool)
+        found[sentences[mask]] = True
+        return found
+    found = [False] * size
+    for handle, m in zip(sentences, mask):
+        if m:
+            found[handle] = True
+    return found
+
+
+def nonzero(mask) -> list[int]:
+    if numpy is not None:
+        return numpy.flatnonzero(mask).tolist()
+    return [n for n, m in enumerate(mask) if m]
+
+
+class Table:
+    def __init__(self, name: str):
+        self.name = name
+        self.columns: dict[str, Column] = {'sentence': Column()}
+        self.columns.update({column: Column(categorical) for column, categorical in SCHEMA[name].items()})
+
+    def __len__(self):
+        return len(self.columns['sentence'])
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.name}, rows: {len(self)}, columns: {tuple(self.columns)}>'
+
+    def append(self, handle: int, **values):
+        self.columns['sentence'].append(handle)
+        for column in SCHEMA[self.name]:
+            self.columns[column].append(values[column.replace('.', '_')])
+
+    def column(self, name: str) -> Column:
+        if name not in self.columns or name == 'sentence':
+            raise ValueError(f'`{name}` is unknown column of `{self.name}`: {list(SCHEMA[self.name])}')
+        return self.columns[name]
+
+
+def parse(query: str) -> tuple:
+    """
+    parses a query into a tree of tuples
+    ("or", a, b), ("and", a, b), ("not", a), ("any", table, row expression), ("cmp", column, op, literal)
+    """
+    tokens = []
+    for matched in TOKENS.finditer(query):
+        kind = matched.lastgroup
+        if kind is None:
+            continue
+        token = matched.group(kind)
+        if kind == 'string':
+            token = token[1:-1].replace('\\"', '"')
+        elif kind == 'word' and token.lower() in KEYWORDS:
+            kind, token = 'keyword', token.lower()
+        tokens.append((kind, token))
+    position = [0]
+
+    def peek(n: int = 0) -> tuple[Optional[str], Optional[str]]:
+        return tokens[position[0] + n] if position[0] + n < len(tokens) else (None, None)
+
+    def take(expected: Optional[str] = None) -> str:
+        kind, token = peek()
+        if token is None or (expected and token != expected):
+            raise ValueError(f'`{expected or "a token"}` is expected at {position[0]} of the query: {query}')
+        position[0] += 1
+        return token
+
+    def expression():
+        node = term()
+        while peek() == ('keyword', 'or'):
+            take()
+            node = ('or', node, term())
+        return node
+
+    def term():
+        node = factor()
+        while peek() == ('keyword', 'and'):
+            take()
+            node = ('and', node, factor())
+        return node
+
+    def factor():
+        kind, token = peek()
+        if (kind, token) == ('keyword', 'not'):
+            take()
+            return 'not', factor()
+        if (kind, token) == ('punct', '('):
+            take()
+            node = expression()
+            take(')')
+            return node
+        if kind == 'word' and peek(1) == ('punct', '['):
+            take()
+            take('[')
+            node = expression()
+            take(']')
+            return 'any', token, node
+        if kind == 'word' and peek(1)[0] == 'op' and peek(2)[0] in ('word', 'string'):
+            return 'cmp', take(), take(), take()
+        raise ValueError(f'a comparison or a clause is expected at {position[0]} of the query: {query}')
+
+    tree = expression()
+    if position[0] != len(tokens):
+        raise ValueError(f'unexpected `{peek()[1]}` at {position[0]} of the query: {query}')
+    return tree
+
+
+class QueryEngine:
+    def __init__(self):
+        """
+        columnar indexes of DEP, SRL and NER layers, and the engine of queries over them.
+        engine = QueryEngine.from_corpus(corpus)
+        candidates = engine.select(corpus, 'srl[role = ARGM-LOC and arg.pos ~ ^NNP]')
+        pipeline.run(sentences=candidates, fp=fp)
+        """
+        self.sentences: list[str] = []  # handle → snt_id
+        self.tables: dict[str, Table] = {name: Table(name) for name in SCHEMA}
+        self.version = QUERY_INDEX_VERSION
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __repr__(self):
+        tables = {name: len(table) for name, table in self.tables.items()}
+        return f'<{self.__class__.__name__} → sentences: {len(self)}, rows: {tables}, numpy: {numpy is not None}>'
+
+    @staticmethod
+    def from_corpus(corpus: Corpus) -> 'QueryEngine':
+        engine = QueryEngine()
+        for sentence in tqdm(corpus.iter_sentences(), total=len(corpus), desc=f'- indexing {len(corpus)} sentences'):
+            engine.add_sentence(sentence)
+        engine.freeze()
+        return engine
+
+    def add_sentence(self, sentence: Sentence):
+        handle = len(self.sentences)
+        self.sentences.append(sentence.ref_id)
+        annotations = sentence.annotations
+        pos = annotations.pos
+        words = {word_id: '+'.join(item.label for item in items)
+                 for word_id, items in enumerate(subgroups(items=pos.tolist(), by='word_id', starts_from=1), 1)
+                 } if pos else dict()
+        dep = annotations.dep.tolist() if annotations.dep else []
+        labels = {word.word_id: word.label for word in dep}
+        forms = {word.word_id: word.word_form for word in dep}
+        self.tables['sentence'].append(handle, len=len(dep) or len(words), chars=len(annotations.form or ''))
+
+        for word in dep:
+            self.tables['dep'].append(
+                handle, word=word.word_id, head=word.head, label=word.label, pos=words.get(word.word_id, None),
+                form=word.word_form, head_label=labels.get(word.head, None), head_pos=words.get(word.head, None)
+            )
+        for srl in annotations.srl.tolist() if annotations.srl else []:
+            _, pred_word = sentence.span_ids_to_word_id(begin=srl.predicate.begin, end=srl.predicate.end)
+            for arg in srl.argument:
+                self.tables['srl'].append(
+                    handle, role=arg.label, pred_lemma=srl.predicate.lemma, pred_word=pred_word,
+                    pred_pos=words.get(pred_word, None), arg_word=arg.word_id, arg_pos=words.get(arg.word_id, None),
+                    arg_label=labels.get(arg.word_id, None), arg_form=forms.get(arg.word_id, arg.form)
+                )
+        for ne in annotations.ner.tolist() if annotations.ner else []:
+            begin, end = sentence.span_ids_to_word_id(begin=ne.begin, end=ne.end)
+            self.tables['ner'].append(
+                handle, label=ne.label, form=ne.form, begin=begin, end=end,
+                words=end - begin + 1 if begin is not None and end is not None else None, chars=len(ne.form)
+            )
+
+    def freeze(self):
+        for table in self.tables.values():
+            for column in table.columns.values():
+                column.freeze()
+
+    def evaluate(self, node: tuple, table: str = 'sentence'):
+        """ mask over rows of `table` (sentences if "sentence") """
+        if node[0] == 'or':
+            return disjunct(self.evaluate(node[1], table), self.evaluate(node[2], table))
+        if node[0] == 'and':
+            return conjunct(self.evaluate(node[1], table), self.evaluate(node[2], table))
+        if node[0] == 'not':
+            return negate(self.evaluate(node[1], table))
+        if node[0] == 'any':
+            if table != 'sentence':
+                raise ValueError(f'`{node[1]}[...]` cannot be nested in `{table}[...]`')
+            if node[1] not in self.tables or node[1] == 'sentence':
+                raise ValueError(f'`{node[1]}` is unknown table: {[t for t in SCHEMA if t != "sentence"]}')
+            rows = self.tables[node[1]]
+            return any_by_sentence(rows.columns['sentence'].values, self.evaluate(node[2], node[1]), len(self))
+        _, column, op, literal = node
+        return self.tables[table].column(column).compare(op, literal)
+
+    def query(self, query: str, limit: Optional[int] = None) -> list[str]:
+        """
+        :param query: ex. "srl[role = ARGM-LOC and arg.pos ~ ^NNP] and len < 20"
+        :param limit: max number of sentences
+        :return: ids of matching sentences in the order of the corpus
+        """
+        handles = nonzero(self.evaluate(parse(query)))[:limit]
+        return [self.sentences[handle] for handle in handles]
+
+    def select(self, corpus: Corpus, query: str, limit: Optional[int] = None) -> Iterator[Sentence]:
+        """ matching Sentences of `corpus`, to be used as candidates of synthesis in place of `corpus.filter_by()` """
+        for snt_id in self.query(query, limit=limit):
+            sentence = corpus.get_sentence(snt_id)
+            if sentence is not None:
+                yield sentence
+
+    def to_pickle(self, filename: str):
+        save_pickle(filename=filename, instance=self)
+
+    @staticmethod
+    def from_pickle(filename: str) -> Optional['QueryEngine']:
+        engine = load_pickle(filename)
+        if getattr(engine, 'version', None) != QUERY_INDEX_VERSION:
+            return None
+        engine.freeze()
+        return engine
+
+
+if __name__ == '__main__':
+    # python -m synthetics.primitives.corpus.query "ner[words > 3] and srl[role = ARGM-LOC]"
+    query_engine = QueryEngine.from_corpus(Corpus.from_pickle('../corpus.pkl'))
+    print(query_engine)
+
+    start = time.time()
+    found = query_engine.query(sys.argv[1])
+    print(f'- {len(found)} sentences of `{sys.argv[1]}`, {time.time() - start:.3f} sec lapsed')
+    print(found[:20])
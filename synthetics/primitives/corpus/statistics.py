@@ -0,0 +1,268 @@
+import os
+import copy
+import json
+import time
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import Corpus, Sentence, DATATYPES_BY_LAYER
+
+# {name: subclass of Aggregator}, filled by `@register`
+AGGREGATORS: dict[str, type] = dict()
+
+# corpus shared with worker processes. it is inherited by forked workers instead of being pickled per shard.
+_SHARED: dict = dict()
+
+
+def register(cls):
+    """ class decorator registering an aggregator by its `name` """
+    AGGREGATORS[cls.name] = cls
+    return cls
+
+
+class Aggregator:
+    """
+    super class for statistics collected over sentences in a single pass.
+    an aggregator must be picklable, and merging partial results of contiguous shards in order
+    must give the same result as a single serial pass (including the order of ties).
+    """
+    name = 'aggregator'
+
+    def __init__(self):
+        self.counts = Counter()
+        self.sentences = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → sentences: {self.sentences}, types: {len(self.counts)}>'
+
+    def update(self, sentence: Sentence):
+        self.sentences += 1
+        self.counts.update(self.keys(sentence))
+
+    def keys(self, sentence: Sentence) -> Iterable:
+        raise NotImplementedError
+
+    def merge(self, other: 'Aggregator'):
+        self.sentences += other.sentences
+        self.counts.update(other.counts)
+        return self
+
+    def spawn(self) -> 'Aggregator':
+        """ an empty aggregator with the same parameters, to be filled by a shard """
+        instance = self.__class__.__new__(self.__class__)
+        instance.__dict__.update(self.__dict__)
+        instance.counts, instance.sentences = Counter(), 0
+        return instance
+
+    def most_common(self) -> list[tuple]:
+        # sorted() is stable, so ties keep the order of first occurrence as `Counter.most_common()` does
+        return sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+
+    def write(self, directory: str = '.'):
+        raise NotImplementedError
+
+
+@register
+class NamedEntityForms(Aggregator):
+    name = 'named-entity'
+
+    def __init__(self, labels: Optional[Iterable[str]] = None):
+        """
+        frequencies of forms by NE label, written as `named-entity.json` and `named-entity-set.tsv`
+        :param labels: labels of the catalog, `NAMED_ENTITIES` if None. unseen ones are left with no forms.
+        """
+        super().__init__()
+        if labels is None:
+            from synthetics.rules.named_entities import NAMED_ENTITIES
+            labels = NAMED_ENTITIES
+        self.labels = list(labels)
+
+    def keys(self, sentence: Sentence) -> Iterable[tuple[str, str]]:
+        ner = sentence.annotations.ner
+        return [(ne.label, ne.form) for ne in ner.tolist()] if ner else []
+
+    def by_label(self) -> dict[str, list[tuple[str, int]]]:
+        catalog = dict()
+        for (label, form), freq in self.most_common():
+            catalog.setdefault(label, []).append((form, freq))
+        return catalog
+
+    def write(self, directory: str = '.'):
+        ne_counts = self.by_label()
+        print(f'- unseen labels: {set(self.labels).difference(set(ne_counts))}')
+        catalog = dict()
+        catalog_set = dict()
+        for key in self.labels:
+            catalog[key] = dict(types=len(ne_counts.get(key, [])))
+            catalog_set[key] = list()
+            for span, freq in ne_counts.get(key, []):
+                catalog[key][span] = freq
+                catalog_set[key].append(span)
+
+        with open(os.path.join(directory, 'named-entity.json'), encoding='utf-8', mode='w') as fp:
+            json.dump(catalog, fp, ensure_ascii=False, indent=4)
+
+        with open(os.path.join(directory, 'named-entity-set.tsv'), encoding='utf-8', mode='w') as fp:
+            fp.write('label\ttypes\n')
+            for key, items in catalog_set.items():
+                fp.write(key + ':\t')
+                fp.write(', '.join(items) + '\n')
+
+
+@register
+class PredicateLemmas(Aggregator):
+    name = 'srl-predicates'
+
+    def keys(self, sentence: Sentence) -> Iterable[str]:
+        srl = sentence.annotations.srl
+        return [item.predicate.lemma for item in srl.tolist()] if srl else []
+
+    def write(self, directory: str = '.'):
+        with open(os.path.join(directory, 'srl-predicates.tsv'), encoding='utf-8', mode='w') as fp:
+            fp.write('pred\tcount\n')
+            for pred, freq in self.most_common():
+                fp.write(f'{pred}\t{freq}\n')
+
+
+@register
+class POSNGrams(Aggregator):
+    name = 'pos-ngrams'
+
+    def __init__(self, n: int = 2):
+        """
+        frequencies of POS label n-grams within sentences, written as `pos-{n}grams.tsv`
+        :param n: length of n-grams
+        """
+        super().__init__()
+        self.n = n
+
+    def keys(self, sentence: Sentence) -> Iterable[tuple[str, ...]]:
+        pos = sentence.annotations.pos
+        if not pos:
+            return []
+        labels = [item.label for item in pos.tolist()]
+        return [tuple(labels[i:i + self.n]) for i in range(len(labels) - self.n + 1)]
+
+    def write(self, directory: str = '.'):
+        with open(os.path.join(directory, f'pos-{self.n}grams.tsv'), encoding='utf-8', mode='w') as fp:
+            fp.write('ngram\tcount\n')
+            for ngram, freq in self.most_common():
+                fp.write(f'{" ".join(ngram)}\t{freq}\n')
+
+
+@register
+class DEPLabels(Aggregator):
+    name = 'dep-labels'
+
+    def keys(self, sentence: Sentence) -> Iterable[str]:
+        dep = sentence.annotations.dep
+        return [item.label for item in dep.tolist()] if dep else []
+
+    def write(self, directory: str = '.'):
+        total = sum(self.counts.values()) or 1
+        with open(os.path.join(directory, 'dep-labels.tsv'), encoding='utf-8', mode='w') as fp:
+            fp.write('label\tcount\tratio\n')
+            for label, freq in self.most_common():
+                fp.write(f'{label}\t{freq}\t{freq / total:.6f}\n')
+
+
+def aggregate_sentences(aggregators: list[Aggregator], sentences: Iterable[Sentence]) -> list[Aggregator]:
+    for sentence in sentences:
+        for aggregator in aggregators:
+            aggregator.update(sentence)
+    return aggregators
+
+
+def detached(sentence: Sentence) -> Sentence:
+    """
+    a copy of sentence with its layers, of which `super` references stop at the copy. a sentence pickles its
+    document, and the document pickles the whole corpus otherwise.
+    """
+    instance = Sentence(snt_id=sentence.ref_id)
+    instance.forms, instance.index, instance.word = sentence.forms, sentence.index, sentence.word
+    for layer in DATATYPES_BY_LAYER:
+        annotation = sentence.annotations.get(layer)
+        if annotation is not None:
+            annotation = copy.copy(annotation)
+            annotation.super = instance
+            instance.annotations.add(layer, annotation)
+    return instance
+
+
+def _aggregate_shard(job: tuple[list[Aggregator], list[str], Optional[list]]) -> list[Aggregator]:
+    """ worker of process pool: (empty aggregators, doc_ids, detached sentences or None if shared) → aggregators """
+    aggregators, doc_ids, sentences = job
+    if sentences is None:
+        corpus: Corpus = _SHARED['corpus']
+        documents = [corpus.get_document(doc_id) for doc_id in doc_ids]
+        sentences = (sentence for document in documents for sentence in document.sentences.values())
+    return aggregate_sentences(aggregators, sentences)
+
+
+class CorpusStatistics:
+    def __init__(self, aggregators: Iterable):
+        """
+        runs every registered aggregator over a corpus in a single pass, optionally sharded by documents across
+        processes. partial results of shards are merged in the order of documents.
+        stats = CorpusStatistics(['named-entity', 'srl-predicates', POSNGrams(n=3)])
+        stats.run(corpus, processes=4).write('.')
+        :param aggregators: names of registered aggregators or instances of Aggregator
+        """
+        self.aggregators: list[Aggregator] = [AGGREGATORS[a]() if isinstance(a, str) else a for a in aggregators]
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {[a.name for a in self.aggregators]}>'
+
+    def __getitem__(self, name: str) -> Aggregator:
+        for aggregator in self.aggregators:
+            if aggregator.name == name:
+                return aggregator
+        raise KeyError(name)
+
+    def run(self, corpus: Corpus, processes: Optional[int] = None, shards_per_process: int = 4):
+        """
+        :param corpus: Corpus
+        :param processes: number of worker processes, `os.cpu_count()` if None. 1 for a pass in this process.
+        :param shards_per_process: number of shards of documents per process
+        """
+        start = time.time()
+        doc_ids = list(corpus.documents)
+        processes = min(processes or os.cpu_count() or 1, max(1, len(doc_ids)))
+        if processes > 1:
+            size = -(-len(doc_ids) // (processes * shards_per_process))
+            shards = [doc_ids[i:i + size] for i in range(0, len(doc_ids), size)]
+            # forked workers read the corpus inherited from this process, others receive detached sentences of shards
+            forked = 'fork' in multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork') if forked else None
+            jobs = [
+                ([a.spawn() for a in self.aggregators], shard, None if forked else [
+                    detached(sentence) for d in shard for sentence in corpus.get_document(d).sentences.values()
+                ])
+                for shard in shards
+            ]
+            _SHARED['corpus'] = corpus
+            try:
+                with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+                    desc = f'- aggregating {len(corpus)} sentences in {len(shards)} shards ({processes} processes)'
+                    for partials in tqdm(executor.map(_aggregate_shard, jobs), total=len(jobs), desc=desc):
+                        for aggregator, partial in zip(self.aggregators, partials):
+                            aggregator.merge(partial)
+            finally:
+                _SHARED.pop('corpus', None)
+        else:
+            sentences = tqdm(corpus.iter_sentences(), total=len(corpus), desc=f'- aggregating {len(corpus)} sentences')
+            aggregate_sentences(self.aggregators, sentences)
+        print(f'- {len(self.aggregators)} aggregators, {time.time() - start:.2f} sec lapsed')
+        return self
+
+    def write(self, directory: str = '.'):
+        for aggregator in self.aggregators:
+            aggregator.write(directory)
+
+
+if __name__ == '__main__':
+    stats = CorpusStatistics(list(AGGREGATORS))
+    stats.run(Corpus.from_pickle('../corpus.pkl'))
+    stats.write('.')
@@ -0,0 +1,258 @@
+import sys
+import time
+from array import array
+from collections import Counter
+from typing import Any, Optional
+from tqdm import tqdm
+from synthetics.primitives.corpus.collection import Corpus, Sentence, DATATYPES_BY_LAYER
+from synthetics.primitives.corpus.layer import Item, Layer, POSItem, WSDItem, DEPItem
+from synthetics.utils.originals import save_pickle, load_pickle
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+Struct-of-arrays token tables of POS, WSD and DEP layers
+
+    tables = TokenTables.from_corpus(corpus)
+    tables['dep'].histogram('label')                       [('NP_SBJ', 3021), ('VP', 2450), ...]
+    tables['pos'].counts_per_sentence('label', 'NNP')      number of NNP tokens per sentence
+    tables.layer('NWRW1800000022.417.1.1', 'pos')          POSLayer of item views, built on demand
+
+each layer is a table of integer columns (numpy arrays if installed, `array` otherwise) with rows of tokens
+in the order of sentences. strings are stored as codes of a pool per column, and items are only created when
+they are asked for. corpus-wide passes over a column run without touching Python objects of tokens.
+"""
+
+TOKEN_TABLES_VERSION = 1
+
+# {layer: ((column, categorical), ...)} in the order of `__slots__` of items, `dependent` is a list per row
+TOKEN_COLUMNS = {
+    'pos': (('id', False), ('form', True), ('label', True), ('word_id', False), ('position', False)),
+    'wsd': (('word', True), ('sense_id', False), ('pos', True), ('begin', False), ('end', False), ('word_id', False)),
+    'dep': (('word_id', False), ('word_form', True), ('head', False), ('label', True), ('dependent', False))
+}
+TOKEN_ITEMS = {'pos': POSItem, 'wsd': WSDItem, 'dep': DEPItem}
+NESTED = frozenset({'dependent'})
+
+
+class StringPool:
+    def __init__(self):
+        """ strings of a column and their codes in the order of first occurrence """
+        self.strings: list[str] = []
+        self.codes: dict[str, int] = dict()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, code: int) -> str:
+        return self.strings[code]
+
+    def encode(self, string: str) -> int:
+        code = self.codes.get(string, None)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(sys.intern(string))
+        return code
+
+
+class TokenTable:
+    def __init__(self, layer: str):
+        """
+        columns of a token layer. rows of the sentence of handle `h` are `offsets[h]:offsets[h + 1]`,
+        and `dependent` of row `r` is `columns["dependent"][nested[r]:nested[r + 1]]`.
+        :param layer: one of "pos", "wsd" and "dep"
+        """
+        self.layer = layer
+        self.columns: dict[str, Any] = {column: array('i') for column, _ in TOKEN_COLUMNS[layer]}
+        self.pools: dict[str, StringPool] = {column: StringPool() for column, categorical in TOKEN_COLUMNS[layer] if categorical}
+        self.offsets: Any = array('I', [0])  # sentence handle → first row
+        self.nested: Any = array('I', [0])  # row → first value of `dependent`
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.layer}, sentences: {self.sentences}, rows: {len(self)}>'
+
+    @property
+    def sentences(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, instance: Optional[Layer]):
+        """ appends items of a layer of the next sentence, an empty sentence if None """
+        if not isinstance(self.offsets, array):
+            self.thaw()
+        for item in instance.tolist() if instance is not None else []:
+            for column, _ in TOKEN_COLUMNS[self.layer]:
+                value = getattr(item, column)
+                if column in NESTED:
+                    self.columns[column].extend(value)
+                    self.nested.append(len(self.columns[column]))
+                elif column in self.pools:
+                    self.columns[column].append(self.pools[column].encode(value))
+                else:
+                    self.columns[column].append(value)
+        self.offsets.append(len(self.columns[TOKEN_COLUMNS[self.layer][0][0]]))
+
+    def freeze(self):
+        """ columns into numpy arrays if numpy is installed """
+        if numpy is None or not isinstance(self.offsets, array):
+            return
+        for column, values in self.columns.items():
+            self.columns[column] = numpy.array(values, dtype=numpy.int32)
+        self.offsets = numpy.array(self.offsets, dtype=numpy.int64)
+        self.nested = numpy.array(self.nested, dtype=numpy.int64)
+
+    def thaw(self):
+        self.columns = {column: array('i', values.tolist()) for column, values in self.columns.items()}
+        self.offsets = array('I', self.offsets.tolist())
+        self.nested = array('I', self.nested.tolist())
+
+    def row(self, row: int) -> dict:
+        """ keyword arguments of the item of a row """
+        values = dict()
+        for column, _ in TOKEN_COLUMNS[self.layer]:
+            if column in NESTED:
+                values[column] = [int(v) for v in self.columns[column][self.nested[row]:self.nested[row + 1]]]
+            elif column in self.pools:
+                values[column] = self.pools[column][self.columns[column][row]]
+            else:
+                values[column] = int(self.columns[column][row])
+        return values
+
+    def item(self, row: int) -> Item:
+        return TOKEN_ITEMS[self.layer](**self.row(row))
+
+    def items(self, handle: int) -> list[Item]:
+        return [self.item(row) for row in range(self.offsets[handle], self.offsets[handle + 1])]
+
+    def sentence_of_rows(self):
+        """ sentence handle of every row """
+        counts = self.lengths()
+        if numpy is not None:
+            return numpy.repeat(numpy.arange(self.sentences, dtype=numpy.int32), counts)
+        handles = array('i')
+        for handle, count in enumerate(counts):
+            handles.extend([handle] * count)
+        return handles
+
+    def lengths(self):
+        """ number of rows per sentence """
+        if numpy is not None and not isinstance(self.offsets, array):
+            return numpy.diff(self.offsets)
+        return [self.offsets[h + 1] - self.offsets[h] for h in range(self.sentences)]
+
+    def histogram(self, column: str) -> list[tuple[Any, int]]:
+        """
+        frequencies of values of a column, in the descending order of counts.
+        ties keep the order of first occurrence as `Counter.most_common()` does.
+        """
+        if column in NESTED:
+            raise ValueError(f'`{column}` of `{self.layer}` is not a scalar column')
+        values = self.columns[column]
+        if numpy is not None and not isinstance(values, array):
+            if column in self.pools:
+                counts = numpy.bincount(values, minlength=len(self.pools[column])).tolist()
+                pairs = [(self.pools[column][code], count) for code, count in enumerate(counts) if count]
+            else:
+                # order of first occurrence of each distinct value
+                uniques, first, counts = numpy.unique(values, return_index=True, return_counts=True)
+                order = numpy.argsort(first, kind='stable')
+                pairs = list(zip(uniques[order].tolist(), counts[order].tolist()))
+        else:
+            counts = Counter(values)
+            pairs = [(self.pools[column][v] if column in self.pools else v, c) for v, c in counts.items()]
+        return sorted(pairs, key=lambda x: x[1], reverse=True)
+
+    def mask(self, column: str, value: Any):
+        """ rows of which `column` equals `value` """
+        if column in self.pools:
+            value = self.pools[column].codes.get(value, -1)
+        values = self.columns[column]
+        if numpy is not None and not isinstance(values, array):
+            return values == value
+        return [v == value for v in values]
+
+    def counts_per_sentence(self, column: str, value: Any):
+        """ number of rows of which `column` equals `value` per sentence """
+        mask = self.mask(column, value)
+        if numpy is not None and not isinstance(self.offsets, array):
+            return numpy.bincount(self.sentence_of_rows()[mask], minlength=self.sentences)
+        counts = [0] * self.sentences
+        for handle in range(self.sentences):
+            counts[handle] = sum(mask[self.offsets[handle]:self.offsets[handle + 1]])
+        return counts
+
+
+class TokenTables:
+    def __init__(self, layers: tuple[str, ...] = tuple(TOKEN_COLUMNS)):
+        """
+        array-backed representation of token layers of a corpus, in addition to its layers of items.
+        :param layers: some of "pos", "wsd" and "dep"
+        """
+        self.sentences: list[str] = []  # handle → snt_id
+        self.index: dict[str, int] = dict()  # snt_id → handle
+        self.tables: dict[str, TokenTable] = {layer: TokenTable(layer) for layer in layers}
+        self.version = TOKEN_TABLES_VERSION
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __repr__(self):
+        rows = {layer: len(table) for layer, table in self.tables.items()}
+        return f'<{self.__class__.__name__} → sentences: {len(self)}, rows: {rows}, numpy: {numpy is not None}>'
+
+    def __getitem__(self, layer: str) -> TokenTable:
+        return self.tables[layer]
+
+    @staticmethod
+    def from_corpus(corpus: Corpus, layers: tuple[str, ...] = tuple(TOKEN_COLUMNS)) -> 'TokenTables':
+        tables = TokenTables(layers=layers)
+        for sentence in tqdm(corpus.iter_sentences(), total=len(corpus), desc=f'- tabulating {len(corpus)} sentences'):
+            tables.add_sentence(sentence)
+        tables.freeze()
+        return tables
+
+    def add_sentence(self, sentence: Sentence):
+        self.index[sentence.ref_id] = len(self.sentences)
+        self.sentences.append(sentence.ref_id)
+        for layer, table in self.tables.items():
+            table.append(sentence.annotations.get(layer))
+
+    def freeze(self):
+        for table in self.tables.values():
+            table.freeze()
+
+    def items(self, snt_id: str, layer: str) -> list[Item]:
+        return self.tables[layer].items(self.index[snt_id])
+
+    def layer(self, snt_id: str, layer: str, super_instance: Optional[Sentence] = None) -> Layer:
+        """ a layer of the sentence made of item views, ex. to restore a layer of a released sentence """
+        instance = DATATYPES_BY_LAYER[layer].__new__(DATATYPES_BY_LAYER[layer])
+        Layer.__init__(instance, layer=layer, data=self.items(snt_id, layer), super_instance=super_instance)
+        return instance
+
+    def to_pickle(self, filename: str):
+        save_pickle(filename=filename, instance=self)
+
+    @staticmethod
+    def from_pickle(filename: str) -> Optional['TokenTables']:
+        tables = load_pickle(filename)
+        if getattr(tables, 'version', None) != TOKEN_TABLES_VERSION:
+            return None
+        tables.freeze()
+        return tables
+
+
+if __name__ == '__main__':
+    # python -m synthetics.primitives.corpus.tokens
+    token_tables = TokenTables.from_corpus(Corpus.from_pickle('../corpus.pkl'))
+    print(token_tables)
+
+    for name, label_column in (('pos', 'label'), ('wsd', 'pos'), ('dep', 'label')):
+        start = time.time()
+        histogram = token_tables[name].histogram(label_column)
+        print(f'- {name}.{label_column}: {histogram[:10]}, {time.time() - start:.3f} sec lapsed')
@@ -1,9 +1,25 @@
+import os
 import re
+import time
 import glob
-from typing import Optional
+import threading
+from os.path import exists
+from typing import Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from xml.etree.ElementTree import ElementTree, ParseError
+from xml.etree.ElementTree import iterparse, ParseError
 from synthetics.rules.verbalizations import VERBALIZATIONS
+from synthetics.utils.originals import save_pickle, load_pickle, file_signature
+from synthetics.utils.trie import Trie
+from synthetics.utils.lru import LRUCache
+
+# bump it whenever the layout of `VerbFrame` or the lexicon indexes changes, to invalidate stale caches
+LEXICON_CACHE_VERSION = 1
+
+# glob pattern of framefiles, which can be overridden by the environment variable or `VerbFrameLexicon(filepath=...)`
+FRAMEFILES = 'D:/Corpora & Language Resources/modu-corenlp/framefiles/*/*.xml'
+
+_UNCACHED = object()  # default of memo lookups, since None (unknown forms) is memoized as well
 
 
 class VerbFrame:
@@ -52,23 +68,149 @@ class ModuFrame(VerbFrame):
         super().__init__(filename, lemma, frame_id, edef, kdef)
 
 
+FRAME_SOURCES = {'kpb': PropBankFrame, 'etri': ETRIFrame, 'modu': ModuFrame}
+
+
+def frame_source(filename: str) -> str:
+    """ "framefiles/kpb/가다.xml" → "kpb", the name of parent directory is the source of frames """
+    return os.path.basename(os.path.dirname(filename.replace('\\', '/')))
+
+
+def compile_verbalizations(index: dict[str, list], verbalizations: dict[str, str] = VERBALIZATIONS):
+    """
+    resolves chains of `verbalizations` against `index` at once, so that lookups need no recursion at runtime.
+    the forms already in `index` take priority over their verbalizations, as they used to.
+    ex) {"늘리": "늘-01"} with index {"늘": [...]} → closure {"늘": [...], "늘리": [...]}
+    :param index: form to frames, `lemma_to_frames` or `root_to_frames`
+    :param verbalizations: form to frame id of which prefix before "-" is the form to be resolved
+    :return: (closure of form to frames, unresolved forms, cycles of forms)
+    """
+    closure = dict(index)
+    unresolved, cycles = [], []
+    for form in verbalizations:
+        if form in closure:
+            continue
+        chain = [form]
+        while True:
+            target = verbalizations[chain[-1]].split('-')[0]
+            if target in index:
+                for link in chain:
+                    closure.setdefault(link, index[target])
+                break
+            if target in chain:
+                # the same loop is met from each of its members, so it is kept in a canonical rotation
+                loop = chain[chain.index(target):]
+                pivot = loop.index(min(loop))
+                loop = tuple(loop[pivot:] + loop[:pivot])
+                if loop not in cycles:
+                    cycles.append(loop)
+                unresolved.append(form)
+                break
+            if target not in verbalizations:
+                unresolved.append(form)
+                break
+            chain.append(target)
+    return closure, unresolved, cycles
+
+
+def parse_frame_file(filename: str) -> list[tuple[VerbFrame, list[str]]]:
+    """
+    parses a single framefile of kpb, etri or modu incrementally.
+    :param filename: path of framefile
+    :return: list of (frame, relation forms to be indexed as lemma) in the order of the file
+    """
+    source = frame_source(filename)
+    if source not in FRAME_SOURCES:
+        raise ValueError(f'`{source}` is unsupported source of framefile: {filename}')
+    results = []
+    try:
+        # only direct children of the root are predicates, as `root.findall('predicate')` read them before
+        depth = 0
+        for event, predicate in iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1 or predicate.tag != 'predicate':
+                continue
+            lemma = predicate.find('lemma').text.strip()
+            for frameset in predicate.findall('frameset'):
+                frame_id = frameset.find('id').text.strip()
+                frame_id = frame_id.replace('.', '-')
+                frame_id = '-'.join(frame_id.split())
+                edef = frameset.find('edef').text
+                kdef = frameset.find('kdef').text if source == 'modu' else None
+                entry = FRAME_SOURCES[source](filename=filename, lemma=lemma, frame_id=frame_id, edef=edef, kdef=kdef)
+                for role in frameset.find('roleset'):
+                    kwargs = {k: v for k, v in role.items()}
+                    entry.add_argrole(**kwargs)
+                rels = []
+                for frame in frameset.findall('frame'):
+                    mapping = frame.find('mapping')
+                    if source == 'kpb' and not mapping.find(''):
+                        # kpb mappings have always been guarded by `mapping.find('')`, which never holds.
+                        continue
+                    rel = mapping.find('rel').text.strip()
+                    rel = rel.split('.')[0] if source == 'modu' else rel
+                    for mapitem in mapping.findall('mapitem'):
+                        src = mapitem.get('src')
+                        trg = mapitem.get('trg')
+                        trg = re.sub(r'\s+', '', trg) if source == 'modu' else trg.upper()
+                        entry.add_mapping(rel=rel, src=src, trg=trg)
+                    rels.append(rel)
+                results.append((entry, rels))
+            predicate.clear()
+    except ParseError as e:
+        print(filename)
+        raise e
+    return results
+
+
 class VerbFrameLexicon:
     instance = None
     intact = True
+    lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if not cls.instance:
             cls.instance = super().__new__(cls)
         return cls.instance
 
-    def __init__(self, filepath: str = 'D:/Corpora & Language Resources/modu-corenlp/framefiles/*/*.xml'):
+    def __init__(
+            self,
+            filepath: Optional[str] = None,
+            cache_file: Optional[str] = 'verb-frames.pkl',
+            content_hash: bool = False,
+            memo_size: int = 65_536
+    ):
+        """
+        the lexicon is loaded once on the first instantiation, and later calls return it regardless of args.
+        :param filepath: glob pattern of framefiles, `$SYNTHETICS_FRAMEFILES` or `FRAMEFILES` if None
+        :param cache_file: compiled cache of the parsed lexicon. it is rebuilt if any framefile is added, removed
+                           or modified since the cache was written. pass None to parse framefiles every time.
+        :param content_hash: invalidate the cache by hashes of framefiles instead of their mtime and size
+        :param memo_size: max number of memoized results of `match_frames_by_roots()`, see `cache_stats()`
+        """
         if VerbFrameLexicon.intact:
-            self.frame_files: list = glob.glob(filepath)
-            self.entries: dict = dict()
-            self.root_to_frames: dict[str, list] = dict()
-            self.lemma_to_frames: dict[str, list] = dict()
-            self.from_files()
-            VerbFrameLexicon.intact = False
+            # builder threads may reach here at once, only the first one loads the lexicon
+            with VerbFrameLexicon.lock:
+                if VerbFrameLexicon.intact:
+                    filepath = filepath or os.environ.get('SYNTHETICS_FRAMEFILES', FRAMEFILES)
+                    self.frame_files: list = sorted(glob.glob(filepath))
+                    self.entries: dict = dict()
+                    self.root_to_frames: dict[str, list] = dict()
+                    self.lemma_to_frames: dict[str, list] = dict()
+                    self.root_closure: dict[str, list] = dict()
+                    self.lemma_closure: dict[str, list] = dict()
+                    self.root_trie: Trie = Trie()
+                    self.memos: dict[str, LRUCache] = {'roots': LRUCache(maxsize=memo_size)}
+                    self.signature: str = file_signature(self.frame_files, content_hash=content_hash)
+                    if not (cache_file and self.from_cache(cache_file)):
+                        self.from_files()
+                        if cache_file and self.frame_files:
+                            self.to_cache(cache_file)
+                    self.build_tables()
+                    VerbFrameLexicon.intact = False
 
     def add_lemma(self, lemma_form: str, frame: VerbFrame):
         if lemma_form not in self.lemma_to_frames:
@@ -80,89 +222,121 @@ class VerbFrameLexicon:
             self.root_to_frames[root_form] = list()
         self.root_to_frames[root_form].append(frame)
 
+    def memoized(self, memo: str, key, resolve, *args):
+        frames = self.memos[memo].get(key, _UNCACHED)
+        if frames is _UNCACHED:
+            # misses are memoized as None too, unknown forms are looked up over and over otherwise.
+            frames = resolve(*args)
+            self.memos[memo].put(key, frames)
+        return frames
+
+    def cache_stats(self) -> dict[str, dict]:
+        """ hit/miss/eviction counters of memoized lookups """
+        return {name: memo.stats() for name, memo in self.memos.items()}
+
     def get_frames_by_lemma(self, lemma_form: str):
-        if lemma_form in self.lemma_to_frames:
-            return self.lemma_to_frames[lemma_form]
-        elif lemma_form in VERBALIZATIONS:
-            return self.get_frames_by_lemma(VERBALIZATIONS[lemma_form].split('-')[0])
-        else:
-            return None
+        return self.lemma_closure.get(lemma_form, None)
 
     def get_frames_by_root(self, root_form: str):
-        if root_form in self.root_to_frames:
-            return self.root_to_frames[root_form]
-        elif root_form in VERBALIZATIONS:
-            return self.get_frames_by_root(VERBALIZATIONS[root_form].split('-')[0])
+        return self.root_closure.get(root_form, None)
+
+    def build_tables(self):
+        """
+        compiles `VERBALIZATIONS` into closures of `lemma_to_frames` and `root_to_frames`, and indexes roots in a trie.
+        unresolved verbalizations and cycles are reported here once, instead of failing at lookups.
+        """
+        self.lemma_closure, unresolved_lemmas, lemma_cycles = compile_verbalizations(self.lemma_to_frames)
+        self.root_closure, unresolved_roots, root_cycles = compile_verbalizations(self.root_to_frames)
+        self.root_trie = Trie(self.root_closure.items())
+        for cycle in dict.fromkeys(lemma_cycles + root_cycles):
+            print(f'- cyclic verbalizations: {" → ".join(cycle + cycle[:1])}')
+        if self.frame_files:
+            print(f'- verbalizations unresolved: {len(unresolved_lemmas)} by lemmas, {len(unresolved_roots)} by roots '
+                  f'of {len(VERBALIZATIONS)}')
+
+    def match_frames_by_roots(self, root_forms: list[str], longest: bool = False) -> Optional[list]:
+        """
+        finds the shortest (or longest) known root which is a concatenation of leading `root_forms` in a single walk.
+        ex) ["오르", "내리"] → frames of "오르" (shortest), frames of "오르내리" (longest) if both are known
+        :param root_forms: forms of WSD items in a word
+        :param longest: prefer the longest match instead of the shortest one
+        :return: list of frames or None
+        """
+        return self.memoized('roots', (tuple(root_forms), longest), self.walk_roots, root_forms, longest)
+
+    def walk_roots(self, root_forms: list[str], longest: bool = False) -> Optional[list]:
+        boundaries, cursor = {0}, 0
+        for form in root_forms:
+            cursor += len(form)
+            boundaries.add(cursor)
+        found = None
+        for end, frames in self.root_trie.prefixes(''.join(root_forms)):
+            if end in boundaries:
+                if not longest:
+                    return frames
+                found = frames
+        return found
+
+    def match_frames_by_lemma(self, lemma_form: str) -> Optional[list]:
+        return self.get_frames_by_lemma(lemma_form)
+
+    def to_cache(self, filename: str):
+        payload = dict(
+            version=LEXICON_CACHE_VERSION,
+            signature=self.signature,
+            entries=self.entries,
+            root_to_frames=self.root_to_frames,
+            lemma_to_frames=self.lemma_to_frames
+        )
+        save_pickle(filename=filename, instance=payload)
+
+    def from_cache(self, filename: str) -> bool:
+        """
+        restores frames, rolesets, mappings and the root/lemma indexes from the compiled cache
+        :return: False if the cache is missing, of other version, or stale for current framefiles
+        """
+        if not exists(filename):
+            return False
+        start = time.time()
+        try:
+            payload = load_pickle(filename)
+        except Exception as e:
+            print(f'- ignoring broken verb frame cache `{filename}`: {e!r}')
+            return False
+        if not isinstance(payload, dict) or payload.get('version') != LEXICON_CACHE_VERSION:
+            return False
+        if payload.get('signature') != self.signature:
+            return False
+        self.entries = payload['entries']
+        self.root_to_frames = payload['root_to_frames']
+        self.lemma_to_frames = payload['lemma_to_frames']
+        print(f'- loading verb frames from `{filename}`, {time.time() - start:.2f} sec lapsed, {len(self.entries)} frames')
+        return True
+
+    def from_files(self, processes: Optional[int] = None):
+        """
+        parses framefiles across a process pool, and merges the frames in the order of `self.frame_files`,
+        so the resulting lexicon does not depend on the number of processes.
+        :param processes: number of worker processes, `os.cpu_count()` if None. 1 for parsing in this process.
+        """
+        processes = processes or os.cpu_count() or 1
+        processes = min(processes, len(self.frame_files))
+        desc = f'- loading {len(self.frame_files)} verb frame files ({processes} processes)'
+        if processes > 1:
+            chunksize = max(1, len(self.frame_files) // (processes * 8))
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = executor.map(parse_frame_file, self.frame_files, chunksize=chunksize)
+                self.merge(tqdm(results, total=len(self.frame_files), desc=desc))
         else:
-            return None
-
-    def from_files(self):
-        for filename in tqdm(self.frame_files, desc='- loading verb frame files'):
-            _dir, source, xml_file = filename.split('\\')
-
-            try:
-                root = ElementTree(file=filename).getroot()
-            except ParseError as e:
-                print(filename)
-                raise e
-
-            for predicate in root.findall('predicate'):
-                lemma = predicate.find('lemma').text.strip()
-                for frameset in predicate.findall('frameset'):
-                    frame_id = frameset.find('id').text.strip()
-                    frame_id = frame_id.replace('.', '-')
-                    frame_id = '-'.join(frame_id.split())
-                    edef = frameset.find('edef').text
-                    if source == 'kpb':
-                        entry = PropBankFrame(filename=filename, lemma=lemma, frame_id=frame_id, edef=edef)
-                        for role in frameset.find('roleset'):
-                            kwargs = {k: v for k, v in role.items()}
-                            entry.add_argrole(**kwargs)
-                        for frame in frameset.findall('frame'):
-                            mapping = frame.find('mapping')
-                            if mapping.find(''):
-                                rel = mapping.find('rel').text.strip()
-                                for mapitem in mapping.findall('mapitem'):
-                                    src = mapitem.get('src')
-                                    trg = mapitem.get('trg')
-                                    entry.add_mapping(rel=rel, src=src, trg=trg.upper())
-                                self.add_lemma(lemma_form=rel, frame=entry)
-                        self.add_frame(root_form=lemma, frame=entry)
-                        self.entries[entry.frame_id] = entry
-                    elif source == 'etri':
-                        entry = ETRIFrame(filename=filename, lemma=lemma, frame_id=frame_id, edef=edef)
-                        for role in frameset.find('roleset'):
-                            kwargs = {k: v for k, v in role.items()}
-                            entry.add_argrole(**kwargs)
-                        for frame in frameset.findall('frame'):
-                            mapping = frame.find('mapping')
-                            rel = mapping.find('rel').text.strip()
-                            for mapitem in mapping.findall('mapitem'):
-                                src = mapitem.get('src')
-                                trg = mapitem.get('trg')
-                                entry.add_mapping(rel=rel, src=src, trg=trg.upper())
-                            self.add_lemma(lemma_form=rel, frame=entry)
-                        self.add_frame(root_form=lemma, frame=entry)
-                        self.entries[entry.frame_id] = entry
-                    elif source == 'modu':
-                        kdef = frameset.find('kdef').text
-                        entry = ModuFrame(filename=filename, lemma=lemma, frame_id=frame_id, edef=edef, kdef=kdef)
-                        for role in frameset.find('roleset'):
-                            kwargs = {k: v for k, v in role.items()}
-                            entry.add_argrole(**kwargs)
-                        for frame in frameset.findall('frame'):
-                            mapping = frame.find('mapping')
-                            rel = mapping.find('rel').text.strip().split('.')[0]
-                            for mapitem in mapping.findall('mapitem'):
-                                src = mapitem.get('src')
-                                trg = mapitem.get('trg')
-                                entry.add_mapping(rel=rel, src=src, trg=re.sub(r'\s+', '', trg))
-                            self.add_lemma(lemma_form=rel, frame=entry)
-                        self.add_frame(root_form=lemma, frame=entry)
-                        self.entries[entry.frame_id] = entry
-                    else:
-                        raise ValueError
+            self.merge(tqdm(map(parse_frame_file, self.frame_files), total=len(self.frame_files), desc=desc))
 
+    def merge(self, results: Iterable[list[tuple[VerbFrame, list[str]]]]):
+        for frames in results:
+            for entry, rels in frames:
+                for rel in rels:
+                    self.add_lemma(lemma_form=rel, frame=entry)
+                self.add_frame(root_form=entry.lemma, frame=entry)
+                self.entries[entry.frame_id] = entry
 
 if __name__ == '__main__':
     lexicon = VerbFrameLexicon()
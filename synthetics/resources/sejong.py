@@ -1,18 +1,35 @@
+import os
 import re
 import time
 import glob
+import threading
+from os.path import exists
 from collections import defaultdict
 from xml.etree.ElementTree import ElementTree
 from typing import Optional, Union
 from tqdm import tqdm
-from synthetics.utils import save_pickle, load_pickle, timestamp
+from synthetics.utils.originals import save_pickle, load_pickle, timestamp, file_signature
 from synthetics.resources.stopitems import PRAGMATIC_IDIOMS
 
+# glob pattern of Sejong idiom files, which can be overridden by the environment variable or `IdiomLexicon(filepath=...)`
+IDIOMS = 'D:/Corpora & Language Resources/modu-corenlp/sejong/XML파일/상세전자사전/15. 관용표현_상세/1/*.xml'
+
+# bump it whenever the layout of `IdiomaticVerbFrames` or its index changes, to invalidate stale caches
+IDIOM_CACHE_VERSION = 1
+
+# particles stripped from the words of idioms, longer ones first. ex) "가슴에" → "가슴"
+PARTICLES = sorted([
+    '에게서', '으로서', '으로써', '에서', '에게', '한테', '으로', '까지', '부터', '처럼', '보다', '만큼', '이나',
+    '을', '를', '이', '가', '은', '는', '에', '의', '도', '로', '와', '과', '만'
+], key=len, reverse=True)
+
+# POS tags of which morphemes are not the content of a word: particles, endings and symbols
+FUNCTIONAL_TAGS = ('J', 'E', 'S')
+
 
 class Entry:
     def __init__(self, form: Optional[str] = None):
-        self.form: Optional[str] = None
-        pass
+        self.form: Optional[str] = form
 
 
 class VerbFrame(Entry):
@@ -52,15 +69,91 @@ def parse_selective_restriction(desc: str):
     pass
 
 
+def content_key(orth: str) -> tuple[str, ...]:
+    """
+    heuristic content morphemes of an idiom, particles of each word and "다" of the predicate are stripped.
+    ex) "가슴에 못을 박다" → ("가슴", "못", "박")
+    :param orth: orthographic form of idiom
+    :return: tuple of content morphemes
+    """
+    words = orth.split()
+    key = []
+    for n, word in enumerate(words):
+        if n == len(words) - 1 and word.endswith('다') and len(word) > 1:
+            key.append(word[:-1])
+            continue
+        for particle in PARTICLES:
+            if word.endswith(particle) and len(word) > len(particle):
+                word = word[:-len(particle)]
+                break
+        key.append(word)
+    return tuple(key)
+
+
+def content_forms(words: list[list[tuple[str, str]]]) -> list[str]:
+    """
+    content morphemes of POS tagged words, which are comparable with `content_key()` of idioms.
+    ex) [[("가슴", "NNG"), ("에", "JKB")], [("박", "VV"), ("았", "EP"), ("다", "EF")]] → ["가슴", "박"]
+    :param words: list of words, each of which is a list of (form, label) of morphemes
+    :return: list of str
+    """
+    return [''.join([form for form, label in word if not label.startswith(FUNCTIONAL_TAGS)]) for word in words]
+
+
 class IdiomaticVerbFrames(Lexicon):
     def __init__(self):
         super().__init__()
         self.entries: dict[str, VerbFrame] = dict()
+        self.index: dict[str, list[tuple[tuple[str, ...], list[str]]]] = dict()  # {anchor: [(key, [frame, ...])]}
+        self.signature: Optional[str] = None
+        self.version: int = IDIOM_CACHE_VERSION
 
     def add_entry(self, item: VerbFrame):
         self.entries[item.frame] = item
 
-    def from_files(self, files: Union[str, list[str], set[str], tuple[str]]):
+    def build_index(self):
+        """
+        indexes entries by their content morphemes, anchored at the first one. senses of an idiom share the key.
+        ex) {"가슴": [(("가슴", "못", "박"), ["가슴에-못을-박다-01", ...]), ...]}
+        """
+        frames_by_key = defaultdict(list)
+        for frame, entry in self.entries.items():
+            key = content_key(entry.form)
+            if len(key) > 1:
+                frames_by_key[key].append(frame)
+        self.index = dict()
+        for key, frames in frames_by_key.items():
+            self.index.setdefault(key[0], []).append((key, sorted(frames)))
+        for candidates in self.index.values():
+            # longer idioms are tried first, so "A B C" wins over "A B" at the same position
+            candidates.sort(key=lambda x: (-len(x[0]), x[0]))
+
+    def match(self, contents: list[str], starts_from: int = 1) -> list[tuple[int, int, list[str]]]:
+        """
+        finds idioms in a sequence of content morphemes in one pass, the longest and leftmost one first.
+        ex) match(["그", "가슴", "못", "박", "었"]) → [(2, 4, ["가슴에-못을-박다-01"])]
+        :param contents: content morphemes of words, see `content_forms()`
+        :param starts_from: index of the first word
+        :return: list of (first word index, last word index, frames) of non-overlapping idioms
+        """
+        matches = []
+        cursor = 0
+        while cursor < len(contents):
+            for key, frames in self.index.get(contents[cursor], []):
+                if tuple(contents[cursor:cursor + len(key)]) == key:
+                    matches.append((cursor + starts_from, cursor + len(key) - 1 + starts_from, frames))
+                    cursor += len(key)
+                    break
+            else:
+                cursor += 1
+        return matches
+
+    def from_files(self, files: Union[str, list[str], set[str], tuple[str]], side_files: Optional[str] = None):
+        """
+        :param files: glob pattern(s) of Sejong idiom XML files
+        :param side_files: directory to write the templates, selective restrictions and theta roles as TSV files,
+                           nothing is written if None.
+        """
 
         all_temp = defaultdict(set)
         all_sel_rst = defaultdict(set)
@@ -72,7 +165,7 @@ class IdiomaticVerbFrames(Lexicon):
         elif isinstance(files, (list, set, tuple)):
             for item in files:
                 target_files.extend(glob.glob(item))
-        target_files = [f for f in target_files if f.split('\\')[-1] not in PRAGMATIC_IDIOMS]
+        target_files = [f for f in target_files if os.path.basename(f.replace('\\', '/')) not in PRAGMATIC_IDIOMS]
 
         for target in tqdm(target_files, desc=f'{self} - loading {len(target_files)} files'):
             xml = ElementTree(file=target)
@@ -102,19 +195,21 @@ class IdiomaticVerbFrames(Lexicon):
                         if not theta:
                             print(frame_name, template, theta, selective)
 
-        with open('templetes.tsv', encoding='utf-8', mode='w') as fp:
-            for k, v in all_temp.items():
-                print(f'{k}', file=fp)
+        if side_files:
+            with open(os.path.join(side_files, 'templetes.tsv'), encoding='utf-8', mode='w') as fp:
+                for k, v in all_temp.items():
+                    print(f'{k}', file=fp)
 
-        with open('selectives.tsv', encoding='utf-8', mode='w') as fp:
-            for k, v in all_sel_rst.items():
-                print(f'{k}', file=fp)
+            with open(os.path.join(side_files, 'selectives.tsv'), encoding='utf-8', mode='w') as fp:
+                for k, v in all_sel_rst.items():
+                    print(f'{k}', file=fp)
 
-        with open('theta-roles.tsv', encoding='utf-8', mode='w') as fp:
-            for k, v in all_tht_rol.items():
-                print(f'{k}\t{v}', file=fp)
+            with open(os.path.join(side_files, 'theta-roles.tsv'), encoding='utf-8', mode='w') as fp:
+                for k, v in all_tht_rol.items():
+                    print(f'{k}\t{v}', file=fp)
 
         print(len(self.entries))
+        self.build_index()
 
     @staticmethod
     def from_pickle(filename):
@@ -126,10 +221,66 @@ class IdiomaticVerbFrames(Lexicon):
         return lexicon
 
 
+class IdiomLexicon:
+    instance = None
+    intact = True
+    lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if cls.instance is None:
+            cls.instance = super().__new__(cls)
+        return cls.instance
+
+    def __init__(self, filepath: Optional[str] = None, cache_file: Optional[str] = 'idioms.pkl'):
+        """
+        singleton of indexed `IdiomaticVerbFrames`, loaded once on the first instantiation.
+        Sejong idiom files are parsed only if the cache is missing or any of them is added, removed or modified.
+        :param filepath: glob pattern of idiom files, `$SYNTHETICS_IDIOMS` or `IDIOMS` if None
+        :param cache_file: pickled `IdiomaticVerbFrames` with its index. pass None to parse files every time.
+        """
+        if IdiomLexicon.intact:
+            with IdiomLexicon.lock:
+                if IdiomLexicon.intact:
+                    filepath = filepath or os.environ.get('SYNTHETICS_IDIOMS', IDIOMS)
+                    files = sorted(glob.glob(filepath))
+                    signature = file_signature(files)
+                    self.files: list[str] = files
+                    self.frames: Optional[IdiomaticVerbFrames] = None
+                    if cache_file and exists(cache_file):
+                        try:
+                            cached = IdiomaticVerbFrames.from_pickle(cache_file)
+                        except Exception as e:
+                            print(f'- ignoring broken idiom cache `{cache_file}`: {e!r}')
+                            cached = None
+                        if getattr(cached, 'version', None) == IDIOM_CACHE_VERSION and cached.signature == signature:
+                            self.frames = cached
+                    if self.frames is None:
+                        self.frames = IdiomaticVerbFrames()
+                        if files:
+                            self.frames.from_files(files=files)
+                        self.frames.signature = signature
+                        if cache_file and files:
+                            self.frames.to_pickle(cache_file)
+                    IdiomLexicon.intact = False
+
+    def __len__(self):
+        return len(self.frames)
+
+    def match(self, words: list[list[tuple[str, str]]], starts_from: int = 1) -> list[tuple[int, int, list[str]]]:
+        """
+        :param words: list of words, each of which is a list of (form, label) of morphemes
+        :param starts_from: index of the first word
+        :return: list of (first word index, last word index, frames) of non-overlapping idioms
+        """
+        if not self.frames.index:
+            return []
+        return self.frames.match(content_forms(words), starts_from=starts_from)
+
+
 if __name__ == '__main__':
     # idioms = "/Users/choe.hyonsu.gabrielle/modu-corenlp-essential/sejong/01_전자사전/XML파일/상세전자사전/15. 관용표현_상세/1/*.xml"
     idioms = 'D:/Corpora & Language Resources/modu-corenlp/sejong/XML파일/상세전자사전/15. 관용표현_상세/1/*.xml'
 
     frameset = IdiomaticVerbFrames()
-    frameset.from_files(files=idioms)
+    frameset.from_files(files=idioms, side_files='.')
     
\ No newline at end of file
@@ -1,10 +1,16 @@
+import os
 import re
+import json
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional
 from synthetics.utils.kr2num import kr2num
+from synthetics.utils.originals import load_json, file_signature, timestamp
 
-GENERAL_DATE_CONCEPTS = [
+GENERAL_DATE_CONCEPTS = frozenset([
     '공휴일', '휴일', '평일',
-]
-NAMED_DATES = [
+])
+NAMED_DATES = frozenset([
     '‘국제 스포츠 평화’의 날', 'Boxing day', 'National Korean War Veterans Armistice Day', '개천절',
     '경로의 날', '경찰의 날', '경칩', '곡우', '공무원 노동절', '과학 데이', '광군제', '광명성절', '광복절', '구정', '국경절',
     '국군의 날', '국제 고문피해자 지원의 날', '국제 아동절', '근로자의 날', '노동당 창건일', '노동절', '다케시마(독도)의 날',
@@ -19,7 +25,7 @@ NAMED_DATES = [
     '추석 명절', '추석명절', '추수감사절', '춘절', '춘제', '크리스마스', '크리스마스 이브', '크리스마스이브', '태양절', '하지',
     '한가위', '한국전쟁 참전용사 정전협정의 날', '한글날', '해일', '현충일', '히나마쓰리', '亥日', '春節', '穀雨', '雛祭り',
     '어린이날', '8·15', '3·1절 '
-]
+])
 DEIXIS_DATES = {
     '오늘': '+0',
     '금일': '+0',
@@ -48,15 +54,84 @@ DEIXIS_DATES = {
 }
 
 
-def datetime_preprocess(entity_str: str):
-    entity_str = re.sub(r'^(오는|올|이번|지난)\s', '', entity_str)
-    entity_str = re.sub(r'(쯤|께|경|중|치|\s정도|만$)', '', entity_str)
+DEIXIS_WEEKS = {
+    '이번 주': '+0', '이번주': '+0', '금주': '+0', '이주': '+0',
+    '지난주': '-1', '지난 주': '-1', '저번 주': '-1', '저번주': '-1', '전주': '-1',
+    '지지난주': '-2', '지지난 주': '-2',
+    '다음 주': '+1', '다음주': '+1', '내주': '+1', '차주': '+1',
+    '다다음 주': '+2', '다다음주': '+2'
+}
+DEIXIS_MONTHS = {
+    '이달': '+0', '이번 달': '+0', '이번달': '+0', '금월': '+0', '당월': '+0',
+    '지난달': '-1', '지난 달': '-1', '저번 달': '-1', '저번달': '-1', '전달': '-1', '전월': '-1',
+    '다음 달': '+1', '다음달': '+1', '내달': '+1', '익월': '+1'
+}
+DEIXIS_YEARS = {
+    '올해': '+0', '올': '+0', '금년': '+0', '당해': '+0', '이번 해': '+0',
+    '작년': '-1', '지난해': '-1', '지난 해': '-1', '전년': '-1', '작년도': '-1',
+    '재작년': '-2', '지지난해': '-2',
+    '내년': '+1', '다음 해': '+1', '이듬해': '+1', '명년': '+1', '내년도': '+1',
+    '내후년': '+2', '후년': '+2'
+}
+SEASONS = {
+    '봄': '봄', '봄철': '봄', '춘계': '봄',
+    '여름': '여름', '여름철': '여름', '하계': '여름',
+    '가을': '가을', '가을철': '가을', '추계': '가을',
+    '겨울': '겨울', '겨울철': '겨울', '동계': '겨울'
+}
+DAY_PERIODS = frozenset([
+    '새벽', '아침', '오전', '정오', '낮', '점심', '오후', '저녁', '밤', '자정', '심야', '한밤', '한밤중', '밤낮', '주간', '야간'
+])
+DAY_COUNTS = {
+    '하루': 1, '이틀': 2, '사흘': 3, '나흘': 4, '닷새': 5, '엿새': 6, '이레': 7, '여드레': 8, '아흐레': 9, '열흘': 10, '보름': 15
+}
+UNITS = {
+    '년': 'year', '해': 'year', '개월': 'month', '달': 'month', '주일': 'week', '주': 'week', '일': 'day',
+    '시간': 'hour', '분': 'minute', '초': 'second'
+}
+ORDINALS = '첫둘셋넷'
+DIRECTIONS = {'전': 'before', '이전': 'before', '후': 'after', '이후': 'after', '뒤': 'after'}
+IRREGULAR_MONTHS = {'유': 6, '시': 10}  # 유월, 시월
+
+# patterns are compiled once at import, they were compiled (or looked up in the `re` cache) on every call before.
+_NUMERAL = r'(\d+|[일이삼사오육칠팔구십백천]+)'
+_NATIVE_NUMERAL = r'(\d+|[한두세네다섯여섯일곱여덟아홉열]+)'
+PATTERNS = {
+    'relative': re.compile(r'^(?:(?:오는|올|이번|지난)\s|올(?=봄|여름|가을|겨울))'),
+    'suffix': re.compile(r'(쯤|께|경|중|치|\s정도|만$)'),
+    'kr_day': re.compile(r'[이삼]?십?\s?[일이삼사오육칠팔구]일'),
+    'digit_day': re.compile(r'\d\d?일?'),
+    'number': re.compile(r'\d+'),
+    'weekday': re.compile(r'[월화수목금토일]요?일?'),
+    'ordinal': re.compile(f'[{ORDINALS}]'),
+    'last': re.compile(r'마지막'),
+    'year': re.compile(r'(\d+)\s?년(?!간|대|째)'),
+    'month': re.compile(r'(\d+|[일이삼사오유육칠팔구시십]+)\s?월(?!요)'),
+    'day': re.compile(r'(\d+)\s?일(?!간|째|요)'),
+    'full_weekday': re.compile(r'([월화수목금토일])요일'),
+    'hour': re.compile(_NATIVE_NUMERAL + r'\s?시(?!간|대|즈음|경)'),
+    'minute': re.compile(_NUMERAL + r'\s?분(?!기)'),
+    'second': re.compile(r'(\d+)\s?초(?!반|순)'),
+    'half': re.compile(r'시\s?반'),
+    'century': re.compile(r'(\d+)\s?세기'),
+    'decade': re.compile(r'(\d+)\s?년대'),
+    'quantity': re.compile(r'(\d+(?:\.\d+)?|[한두세네다섯여섯일곱여덟아홉열일이삼사오육칠팔구십백천]+)\s?(개월|주일|시간|년|해|달|주|일|분|초)'),
+    'unit': re.compile(r'(년|월|일|시|분|초)$'),
+    'interval': re.compile(r'^(.+?)\s?(?:부터|~|∼|-|에서)\s?(.+?)(?:\s?까지)?$'),
+    'ordinal_week': re.compile(f'([{ORDINALS}])[째쨋]?\\s?주'),
+}
+
+
+def datetime_preprocess(entity_str: str, relative: bool = True):
+    if relative:
+        entity_str = PATTERNS['relative'].sub('', entity_str)
+    entity_str = PATTERNS['suffix'].sub('', entity_str)
     entity_str = entity_str.split('·')[-1]
     return entity_str.strip()
 
 
 def parse_number(entity_str: str) -> str:
-    return re.search(r'\d+', entity_str).group()
+    return PATTERNS['number'].search(entity_str).group()
 
 
 def parse_weekday(entity_str: str) -> str:
@@ -64,32 +139,337 @@ def parse_weekday(entity_str: str) -> str:
     return weekdays[weekdays.index(entity_str[0])] + '요일'
 
 
-class DateTimeNormalizer:
+def to_number(numeral: str) -> Optional[str]:
+    """ "12" → "12", "십이" → "12", "열두" → "12", "시" (of 시월) → "10" """
+    if numeral.isdigit():
+        return str(int(numeral))
+    if numeral in IRREGULAR_MONTHS:
+        return str(IRREGULAR_MONTHS[numeral])
+    number = kr2num(numeral)
+    return str(int(number)) if number else None
+
+
+def parse_components(entity_str: str) -> tuple[tuple[str, str], ...]:
+    """
+    calendar and clock components of date/time expression
+    ex) "2019년 3월 5일 오후 3시 20분" → ((":year", "2019"), (":month", "3"), (":day", "5"), (":dayperiod", "오후"), (":time", "15:20"))
+    :param entity_str: preprocessed date/time expression
+    :return: tuple of (relation, value) pairs in the order of year, month, day, weekday, dayperiod, time
+    """
+    attributes = []
+    for relation in ('year', 'month', 'day'):
+        found = PATTERNS[relation].search(entity_str)
+        if found and to_number(found.group(1)):
+            attributes.append((f':{relation}', to_number(found.group(1))))
+    found = PATTERNS['full_weekday'].search(entity_str)
+    if found:
+        attributes.append((':weekday', parse_weekday(found.group(1))))
+    period = next((word for word in entity_str.split() if word in DAY_PERIODS), None)
+    if period:
+        attributes.append((':dayperiod', period))
+    hour, minute, second = [PATTERNS[unit].search(entity_str) for unit in ('hour', 'minute', 'second')]
+    hour = to_number(hour.group(1)) if hour else None
+    minute = to_number(minute.group(1)) if minute else ('30' if hour and PATTERNS['half'].search(entity_str) else None)
+    second = to_number(second.group(1)) if second else None
+    if hour:
+        if period in ('오후', '저녁', '밤') and int(hour) < 12:
+            hour = str(int(hour) + 12)
+        clock = f'{hour}:{int(minute or 0):02d}' + (f':{int(second):02d}' if second else '')
+        attributes.append((':time', clock))
+    else:
+        if minute:
+            attributes.append((':minute', minute))
+        if second:
+            attributes.append((':second', second))
+    return tuple(attributes)
+
+
+def parse_quantity(entity_str: str) -> tuple[tuple[str, str], ...]:
+    """ "3년 동안" → ((":quant", "3"), (":unit", "year")), "사흘" → ((":quant", "3"), (":unit", "day")) """
+    for word in entity_str.split():
+        if word in DAY_COUNTS:
+            return (':quant', str(DAY_COUNTS[word])), (':unit', 'day')
+    found = PATTERNS['quantity'].search(entity_str)
+    if found:
+        quant = found.group(1) if found.group(1)[0].isdigit() else to_number(found.group(1))
+        if quant:
+            return (':quant', quant), (':unit', UNITS[found.group(2)])
+    return ()
+
+
+def normalize_day(entity_str: str) -> tuple[tuple[str, str], ...]:
+    if entity_str in GENERAL_DATE_CONCEPTS:
+        return (':general', entity_str),
+    elif entity_str in NAMED_DATES:
+        return (':named', entity_str),
+    elif entity_str in DEIXIS_DATES:
+        return (':day', DEIXIS_DATES[entity_str]),
+    components = parse_components(entity_str)
+    if any([relation in (':year', ':month') for relation, _ in components]):
+        # "2019년 3월 5일", the former rules took the first number only
+        return components
+    if PATTERNS['kr_day'].search(entity_str):
+        return (':day', str(kr2num(entity_str[:-1]))),
+    elif PATTERNS['digit_day'].search(entity_str):
+        return (':day', parse_number(entity_str)),
+    elif PATTERNS['weekday'].search(entity_str):
+        return (':weekday', parse_weekday(PATTERNS['weekday'].search(entity_str).group())),
+    elif PATTERNS['ordinal'].search(entity_str):
+        return (':day', 'D+' + str(ORDINALS.index(PATTERNS['ordinal'].search(entity_str).group()) + 1)),
+    elif PATTERNS['last'].search(entity_str):
+        return (':day', 'D-1'),
+    return ()
+
+
+def normalize_week(entity_str: str) -> tuple[tuple[str, str], ...]:
+    if entity_str in DEIXIS_WEEKS:
+        return (':week', DEIXIS_WEEKS[entity_str]),
+    attributes = [(r, v) for r, v in parse_components(entity_str) if r in (':year', ':month')]
+    ordinal = PATTERNS['ordinal_week'].search(entity_str)
+    if ordinal:
+        attributes.append((':week', 'W+' + str(ORDINALS.index(ordinal.group(1)) + 1)))
+    elif PATTERNS['last'].search(entity_str):
+        attributes.append((':week', 'W-1'))
+    return tuple(attributes)
+
+
+def normalize_month(entity_str: str) -> tuple[tuple[str, str], ...]:
+    if entity_str in DEIXIS_MONTHS:
+        return (':month', DEIXIS_MONTHS[entity_str]),
+    return parse_components(entity_str)
+
+
+def normalize_year(entity_str: str) -> tuple[tuple[str, str], ...]:
+    if entity_str in DEIXIS_YEARS:
+        return (':year', DEIXIS_YEARS[entity_str]),
+    return parse_components(entity_str)
+
+
+def normalize_season(entity_str: str) -> tuple[tuple[str, str], ...]:
+    attributes = [(r, v) for r, v in parse_components(entity_str) if r == ':year']
+    season = next((SEASONS[word] for word in entity_str.split() if word in SEASONS), None)
+    if season:
+        attributes.append((':season', season))
+    return tuple(attributes)
+
+
+def parse_interval(begin: str, end: str) -> tuple[tuple[str, tuple], ...]:
+    """
+    components of both ends of interval, a bare number of the beginning takes the unit of the end
+    ex) "16", "20일" → ((":op1", ((":day", "16"), )), (":op2", ((":day", "20"), )))
+    :return: empty if either end is not normalizable
+    """
+    unit = PATTERNS['unit'].search(end)
+    if unit and begin[-1:].isdigit():
+        begin += unit.group(1)
+    operands = parse_components(begin), parse_components(end)
+    if not all(operands):
+        return ()
+    return (':op1', operands[0]), (':op2', operands[1])
+
+
+def normalize_duration(entity_str: str) -> tuple[tuple[str, str], ...]:
+    interval = PATTERNS['interval'].search(entity_str)
+    if interval:
+        return parse_interval(interval.group(1).strip(), interval.group(2).strip())
+    if entity_str in DAY_PERIODS:
+        return (':dayperiod', entity_str),
+    return parse_quantity(entity_str)
+
+
+def normalize_others(entity_str: str) -> tuple[tuple[str, str], ...]:
+    century = PATTERNS['century'].search(entity_str)
+    if century:
+        return (':century', century.group(1)),
+    decade = PATTERNS['decade'].search(entity_str)
+    if decade:
+        return (':decade', decade.group(1)),
+    words = entity_str.split()
+    components = parse_components(entity_str)
+    if len(words) > 1 and words[-1] in DIRECTIONS:
+        direction = (':direction', DIRECTIONS[words[-1]]),
+        if any([relation in (':month', ':day') for relation, _ in components]):
+            # "8월 23일 이후" → after the date
+            return components + direction
+        if parse_quantity(entity_str):
+            # "3년 전" → 3 years before
+            return parse_quantity(entity_str) + direction
+    return components or parse_quantity(entity_str)
+
+
+def normalize_time(entity_str: str) -> tuple[tuple[str, str], ...]:
+    if entity_str in DAY_PERIODS:
+        return (':dayperiod', entity_str),
+    return parse_components(entity_str)
+
+
+# numerals are normalized by kr2num (on tries), its changes alter normalized spans as well
+SIGNATURE_SOURCES = [
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils', filename) for filename in ('kr2num.py', 'trie.py')
+]
+# deixes are looked up ahead of preprocessing, which strips "지난 " off "지난 주" otherwise
+DEIXES = {
+    'DT_DAY': (':day', DEIXIS_DATES),
+    'DT_WEEK': (':week', DEIXIS_WEEKS),
+    'DT_MONTH': (':month', DEIXIS_MONTHS),
+    'DT_YEAR': (':year', DEIXIS_YEARS)
+}
+NORMALIZERS = {
+    'DT_DURATION': normalize_duration,
+    'DT_DAY': normalize_day,
+    'DT_WEEK': normalize_week,
+    'DT_MONTH': normalize_month,
+    'DT_YEAR': normalize_year,
+    'DT_SEASON': normalize_season,
+    'DT_OTHERS': normalize_others,
+    'TI_DURATION': normalize_duration,
+    'TI_HOUR': normalize_time,
+    'TI_MINUTE': normalize_time,
+    'TI_SECOND': normalize_time,
+    'TI_OTHERS': normalize_time
+}
+
+
+@lru_cache(maxsize=65_536)
+def normalize(entity_type: str, entity_str: str) -> tuple[tuple[str, str], ...]:
+    """
+    memoized per distinct (type, span), a corpus repeats the same few thousand date/time spans over and over.
+    :return: tuple of (relation, value) pairs, empty if the span is not normalizable
+    """
+    if entity_type in DEIXES:
+        relation, deixes = DEIXES[entity_type]
+        for span in (entity_str.strip(), datetime_preprocess(entity_str, relative=False)):
+            if span in deixes:
+                return (relation, deixes[span]),
+    return NORMALIZERS[entity_type](datetime_preprocess(entity_str))
+
+
+def rules_signature() -> str:
+    """
+    content hash of this module and of kr2num, tables of normalized spans are stale once either is modified.
+    paths and mtimes are left out, so a table stays valid across checkouts, touches and other machines.
+    """
+    return file_signature([__file__] + SIGNATURE_SOURCES, content_hash=True)
+
+
+def to_attributes(pairs: list) -> tuple:
+    """ attributes of json (lists) into tuples, operands of intervals are nested pairs """
+    return tuple([(relation, to_attributes(value) if isinstance(value, list) else value) for relation, value in pairs])
+
+
+def format_value(value) -> str:
+    if isinstance(value, tuple):
+        return '(' + ' '.join([f'{r} {format_value(v)}' for r, v in value]) + ')'
+    return value
+
+
+class TemporalSpanTable:
     def __init__(self):
+        """
+        corpus-wide table of distinct DT_/TI_ spans, each of which is normalized once.
+        the table is saved as json, which is consulted by the AMR builder and is also reviewable by hand.
+        table = TemporalSpanTable().from_spans([('DT_DAY', '오늘'), ('DT_DAY', '오늘'), ('DT_YEAR', '지난해')])
+        table.get('DT_DAY', '오늘')
+        >> ((':day', '+0'),)
+        """
+        self.entries: dict[tuple[str, str], tuple[tuple[str, str], ...]] = dict()
+        self.counts: Counter = Counter()
+        self.signature: Optional[str] = None
+        self.update: Optional[str] = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → spans: {len(self)}, mentions: {sum(self.counts.values())}, update: {self.update}>'
+
+    def get(self, entity_type: str, entity_str: str) -> Optional[tuple[tuple[str, str], ...]]:
+        return self.entries.get((entity_type, entity_str), None)
+
+    def from_spans(self, spans: Iterable[tuple[str, str]], allow: Optional[Iterable[str]] = None):
+        """
+        :param spans: iterable of (entity_type, entity_str) of all mentions, types out of `allow` are skipped
+        :param allow: types to be normalized, every type of `NORMALIZERS` if None
+        """
+        allow = set(allow or NORMALIZERS)
+        self.counts.update([span for span in spans if span[0] in allow])
+        for entity_type, entity_str in self.counts:
+            if (entity_type, entity_str) not in self.entries:
+                self.entries[(entity_type, entity_str)] = normalize(entity_type, entity_str)
+        self.signature = rules_signature()
+        self.update = timestamp()
+        return self
+
+    def to_json(self, filename: str):
+        table = dict(update=self.update, signature=self.signature, entries=dict())
+        for (entity_type, entity_str), freq in self.counts.most_common():
+            attributes = [list(pair) for pair in self.entries[(entity_type, entity_str)]]
+            table['entries'].setdefault(entity_type, dict())[entity_str] = dict(freq=freq, attributes=attributes)
+        with open(filename, encoding='utf-8', mode='w') as fp:
+            json.dump(table, fp, ensure_ascii=False, indent=4)
+
+    def to_tsv(self, filename: str):
+        with open(filename, encoding='utf-8', mode='w') as fp:
+            fp.write('label\tspan\tfreq\tattributes\n')
+            for (entity_type, entity_str), freq in self.counts.most_common():
+                attributes = ' '.join([f'{r} {format_value(v)}' for r, v in self.entries[(entity_type, entity_str)]])
+                fp.write(f'{entity_type}\t{entity_str}\t{freq}\t{attributes}\n')
+
+    @classmethod
+    def from_json(cls, filename: str, strict: bool = True) -> Optional['TemporalSpanTable']:
+        """
+        :param filename: json file written by `to_json()`
+        :param strict: return None if the table was built with rules other than the current ones
+        :return: TemporalSpanTable or None
+        """
+        table = load_json(filename)
+        if strict and table['signature'] != rules_signature():
+            print(f'- `{filename}` is stale, the rules of date/time normalization have been modified since it was built.')
+            return None
+        instance = cls()
+        instance.signature, instance.update = table['signature'], table['update']
+        for entity_type, spans in table['entries'].items():
+            for entity_str, entry in spans.items():
+                instance.entries[(entity_type, entity_str)] = to_attributes(entry['attributes'])
+                instance.counts[(entity_type, entity_str)] = entry['freq']
+        return instance
+
+
+class DateTimeNormalizer:
+    def __init__(self, table: Optional[TemporalSpanTable] = None):
+        """
+        :param table: precomputed spans, consulted ahead of normalizing. unknown spans are normalized as usual.
+        """
         self.allow = ('DT_DURATION', 'DT_DAY', 'DT_WEEK', 'DT_MONTH', 'DT_YEAR', 'DT_SEASON', 'DT_OTHERS',
                       'TI_DURATION', 'TI_HOUR', 'TI_MINUTE', 'TI_SECOND', 'TI_OTHERS')
+        self.table: Optional[TemporalSpanTable] = table
 
-    def __call__(self, entity_type: str, entity_str: str):
+    def __call__(self, entity_type: str, entity_str: str) -> tuple[tuple[str, str], ...]:
+        """
+        normalizer = DateTimeNormalizer()
+        normalizer('DT_DAY', '지난 28일')
+        >> ((':day', '28'),)
+        :param entity_type: one of `self.allow`
+        :param entity_str: surface form of date/time entity
+        :return: tuple of (relation, value) pairs, empty if the span is not normalizable
+        """
         assert entity_type in self.allow
-        if entity_type == 'DT_DAY':
-            entity_str = datetime_preprocess(entity_str)
-            if entity_str in GENERAL_DATE_CONCEPTS:
-                return ':general', entity_str
-            elif entity_str in NAMED_DATES:
-                return ':named', entity_str
-            elif entity_str in DEIXIS_DATES:
-                return ':day', DEIXIS_DATES[entity_str]
-            elif re.search(r'[이삼]?십?\s?[일이삼사오육칠팔구]일', entity_str):
-                return ':day', kr2num(entity_str[:-1])
-            elif re.search(r'\d\d?일?', entity_str):
-                return ':day', parse_number(entity_str)
-            elif re.search(r'[월화수목금토일]요?일?', entity_str):
-                return ':weekday', parse_weekday(entity_str)
-            elif re.search(r'[첫둘셋넷]', entity_str):
-                return ':day', 'D+' + str(list('첫둘셋넷').index(entity_str[0]) + 1)
-            elif re.search(r'마지막', entity_str):
-                return ':day', 'D-1'
+        if self.table is not None:
+            attributes = self.table.get(entity_type, entity_str)
+            if attributes is not None:
+                return attributes
+        return normalize(entity_type, entity_str)
+
+    def batch(self, entities: Iterable[tuple[str, str]]) -> list[tuple[tuple[str, str], ...]]:
+        """
+        :param entities: iterable of (entity_type, entity_str)
+        :return: list of normalized attributes in the same order
+        """
+        return [self(entity_type, entity_str) for entity_type, entity_str in entities]
 
+    @staticmethod
+    def cache_info():
+        return normalize.cache_info()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,117 @@
+import os
+import glob
+import hashlib
+import inspect
+import threading
+from typing import Callable, Iterable, Optional
+from synthetics.rules.named_entities import NAMED_ENTITIES
+from synthetics.rules.date_entities import rules_signature
+from synthetics.rules.periphrastic_constructions import (
+    PERIPHRASTIC_CONSTRUCTIONS, PeriphrasticConstructions, match_windows, prioritize
+)
+from synthetics.resources.predicates import VerbFrameLexicon
+from synthetics.resources.sejong import IdiomLexicon
+from synthetics.utils.originals import file_signature
+
+"""
+Fingerprints of the rules a synthesized graph depends on
+
+a dependency is "family:argument", recorded by the stages of `AbstractMeaningRepresentation` while building.
+    code:amr      sources of graph construction (including layers of corpus and matching of periphrastic rules),
+                  any change invalidates every graph
+    mwe:<key>     a rule of `PERIPHRASTIC_CONSTRUCTIONS` which fired
+    ne:<label>    an entry of `NAMED_ENTITIES` which was looked up
+    dates:        rules of `date_entities`, for DT/TI entities normalized into attributes
+    roots:<forms> lookup of frames by WSD forms (tab-separated), resolved through `VERBALIZATIONS` and framefiles
+    lemma:<form>  lookup of frames by SRL lemma, resolved through `VERBALIZATIONS` and framefiles
+    idioms:       Sejong idiom lexicon as a whole, its matching code and the contents of idiom files
+a fingerprint is a digest of what the rule (or the result of lookup) is now, None if it does not exist.
+lookups are fingerprinted by their results rather than by the entries of `VERBALIZATIONS`, since the closure
+of verbalizations makes an entry affect lookups of other keys. recording the query of a lookup regardless of
+its result covers the rules which could have fired, ex. a new verbalization of a lemma that was not found.
+"""
+
+PACKAGE = os.path.dirname(os.path.dirname(__file__))
+CODE = [
+    os.path.join(PACKAGE, 'pipeline.py'),
+    *sorted(glob.glob(os.path.join(PACKAGE, 'primitives', 'amr', '*.py'))),
+    os.path.join(PACKAGE, 'primitives', 'corpus', 'layer.py'),
+    os.path.join(PACKAGE, 'primitives', 'corpus', 'collection.py')
+]
+# rules of `PERIPHRASTIC_CONSTRUCTIONS` are fingerprinted one by one as `mwe:<key>`, only the code matching them is
+# a part of `code:amr`. the module as a whole would invalidate every graph whenever a single rule changes.
+MATCHING_CODE = (prioritize, match_windows, PeriphrasticConstructions)
+IDIOM_CODE = [os.path.join(PACKAGE, 'resources', 'sejong.py')]
+
+
+def digest(value) -> str:
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def frame_id(frames: Optional[list]) -> Optional[str]:
+    # only the first frame is used as the concept
+    return frames[0].frame_id if frames else None
+
+
+FAMILIES: dict[str, Callable[[str], Optional[str]]] = {
+    'code': lambda _: digest((file_signature(CODE, content_hash=True), [inspect.getsource(c) for c in MATCHING_CODE])),
+    'mwe': lambda key: digest(PERIPHRASTIC_CONSTRUCTIONS[key]) if key in PERIPHRASTIC_CONSTRUCTIONS else None,
+    'ne': lambda label: digest((NAMED_ENTITIES[label][0], NAMED_ENTITIES[label][1].__name__))
+    if label in NAMED_ENTITIES else None,
+    'dates': lambda _: rules_signature(),
+    'roots': lambda forms: digest(frame_id(VerbFrameLexicon().match_frames_by_roots(forms.split('\t')))),
+    'lemma': lambda lemma: digest(frame_id(VerbFrameLexicon().match_frames_by_lemma(lemma_form=lemma))),
+    'idioms': lambda _: digest((
+        file_signature(IDIOM_CODE, content_hash=True), file_signature(IdiomLexicon().files, content_hash=True)
+    ))
+}
+
+
+def ruleset_keys() -> list[str]:
+    """ ids of rules which may fire on any sentence without being looked up, new ones are checked by `could_fire` """
+    return [f'mwe:{key}' for key in PERIPHRASTIC_CONSTRUCTIONS]
+
+
+def could_fire(dependency: str, numbered_words: list[tuple[int, str]]) -> bool:
+    """
+    whether a rule of `ruleset_keys()` matches a sentence, without building its graph
+    :param dependency: id of rule, ex. "mwe:-ㄴ 가운데"
+    :param numbered_words: `POSLayer.numbered_items()`
+    """
+    family, _, key = dependency.partition(':')
+    if family == 'mwe' and key in PERIPHRASTIC_CONSTRUCTIONS:
+        return bool(match_windows(PERIPHRASTIC_CONSTRUCTIONS[key][0], numbered_words))
+    return False
+
+
+class RuleFingerprints:
+    def __init__(self):
+        """
+        memo of fingerprints by dependency for a run. rules do not change while running,
+        so each dependency is resolved once no matter how many sentences share it.
+        """
+        self.memo: dict[str, Optional[str]] = dict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.memo)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → resolved: {len(self)}>'
+
+    def get(self, dependency: str) -> Optional[str]:
+        if dependency in self.memo:
+            return self.memo[dependency]
+        family, _, argument = dependency.partition(':')
+        resolver = FAMILIES.get(family, None)
+        fingerprint = resolver(argument) if resolver else None
+        with self.lock:
+            self.memo[dependency] = fingerprint
+        return fingerprint
+
+    def resolve(self, dependencies: Iterable[str]) -> dict[str, Optional[str]]:
+        return {dependency: self.get(dependency) for dependency in sorted(dependencies)}
+
+    def outdated(self, recorded: dict[str, Optional[str]]) -> list[str]:
+        """ dependencies of which fingerprints differ from the recorded ones """
+        return [dependency for dependency, fingerprint in recorded.items() if self.get(dependency) != fingerprint]
@@ -23,6 +23,7 @@ from synthetics.primitives.amr.concept import (
     AMREmailAddressEntityConcept,
     AMRHyperlink91Concept
 )
+from synthetics.primitives.amr.date_entity import AMRDateEntityConcept, AMRTemporalQuantityConcept
 
 
 NAMED_ENTITIES = {
@@ -199,35 +200,35 @@ NAMED_ENTITIES = {
     # ex. 기능주의건축, 노르만양식, 시토파건축, 도리스양식
 
     # DATE (DT) - 기간 및 계절, 시기/시대
-    'DT_DURATION': ('temporal-quantity|date-interval', AMRDummyNEConcept),
+    'DT_DURATION': ('temporal-quantity|date-interval', AMRTemporalQuantityConcept),
     # ex. ~부터 ~까지, ~ 간, 전반기/후반기, 성수기/비수기
-    'DT_DAY': ('date-entity', AMRDummyNEConcept),
+    'DT_DAY': ('date-entity', AMRDateEntityConcept),
     # ex. 입춘, 곡우, 내일, 모레, 금일, 당일, 29일
-    'DT_WEEK': ('date-entity', AMRDummyNEConcept),
+    'DT_WEEK': ('date-entity', AMRDateEntityConcept),
     # ex. 지난주, 이번 주, 다음 주, 첫 주, 둘째 주
-    'DT_MONTH': ('date-entity', AMRDummyNEConcept),
+    'DT_MONTH': ('date-entity', AMRDateEntityConcept),
     # ex. 이달, 지난달, 4월, 10월
-    'DT_YEAR': ('date-entity', AMRDummyNEConcept),
+    'DT_YEAR': ('date-entity', AMRDateEntityConcept),
     # ex. 작년, 내년, 올해, 서기 2910년, 영락1년
-    'DT_SEASON': ('date-entity', AMRDummyNEConcept),
+    'DT_SEASON': ('date-entity', AMRDateEntityConcept),
     # ex. 봄, 여름, 가을, 겨울, 춘계, 하계, 추계, 동계
     'DT_GEOAGE': ('ne.geographical-period*', AMRNamedEntityConcept),
     # ex. 원시시대, 구석기시대, 캄브리아기, 중생대, 원생대, 선사시대
     'DT_DYNASTY': ('ne.era', AMRNamedEntityConcept),
     # ex. 청대, 조선시대, 조선 후기, 명대, 고려시대, 고려 말
-    'DT_OTHERS': ('date-entity', AMRDummyNEConcept),
+    'DT_OTHERS': ('date-entity', AMRTemporalQuantityConcept),
     # ex. ~년 후/전, ~부터/까지/정도, ~세기, ~때
 
     # TIME (TI) - 시계상으로 나타나는 시/시각, 시간 범위
-    'TI_DURATION': ('temporal-quantity|date-interval', AMRDummyNEConcept),
+    'TI_DURATION': ('temporal-quantity|date-interval', AMRTemporalQuantityConcept),
     # ex. 6시~9시, 낮, 밤, 점심, 저녁, 오전, 오후, 밤낮
-    'TI_HOUR': ('date-entity', AMRDummyNEConcept),
+    'TI_HOUR': ('date-entity', AMRDateEntityConcept),
     # ex. 12시, 저녁 8시
-    'TI_MINUTE': ('date-entity', AMRDummyNEConcept),
+    'TI_MINUTE': ('date-entity', AMRDateEntityConcept),
     # ex. 13분, 30분, 29분
-    'TI_SECOND': ('date-entity', AMRDummyNEConcept),
+    'TI_SECOND': ('date-entity', AMRDateEntityConcept),
     # ex. 27초, 15초, 30초
-    'TI_OTHERS': ('date-entity', AMRDummyNEConcept),
+    'TI_OTHERS': ('date-entity', AMRDateEntityConcept),
     # ex. 3시 이전, 8시 20분, 6시까지
 
     # QUANTITY (QT) - 수량/분량, 순서/순차, 수사로 이루어진 표현
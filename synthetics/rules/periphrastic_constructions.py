@@ -1,6 +1,9 @@
+import re
+import threading
 from typing import Optional, Literal, Any
 from collections import defaultdict
 from functools import cache
+from synthetics.utils.originals import ngrams
 
 
 PERIPHRASTIC_CONSTRUCTIONS = {
@@ -302,9 +305,25 @@ def prioritize(rules: dict[str, tuple[str, Any]], sort: Literal['simple-to-compl
     return priority
 
 
+def match_windows(pattern: str, numbered_words: list[tuple[int, str]]) -> list[list[int]]:
+    """
+    windows of consecutive words matching every space-separated regex of `pattern`
+    :param pattern: ex. r"ETM$ ^가운데/NNG"
+    :param numbered_words: `POSLayer.numbered_items()`
+    :return: list of word ids of each matched window
+    """
+    queries = pattern.split()
+    matched = []
+    for numbered_ngram in ngrams(items=numbered_words, n=len(queries)):
+        if all([re.search(pattern=q, string=w) for q, (_, w) in zip(queries, numbered_ngram)]):
+            matched.append([idx for idx, _ in numbered_ngram])
+    return matched
+
+
 class PeriphrasticConstructions(object):
     instance = None
     intact = True
+    lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if not cls.instance:
@@ -313,15 +332,22 @@ class PeriphrasticConstructions(object):
 
     def __init__(self, sort: Literal['simple-to-complex', 'complex-to-simple'] = 'simple-to-complex'):
         if PeriphrasticConstructions.intact:
-            self.ruleset = PERIPHRASTIC_CONSTRUCTIONS
-            self.sort = sort
-            self.priority = prioritize(self.ruleset, sort=sort)
-            PeriphrasticConstructions.intact = False
+            with PeriphrasticConstructions.lock:
+                if PeriphrasticConstructions.intact:
+                    self.ruleset = PERIPHRASTIC_CONSTRUCTIONS
+                    self.sort = sort
+                    self.priority = prioritize(self.ruleset, sort=sort)
+                    PeriphrasticConstructions.intact = False
 
     @cache
     def get_patterns(self):
         return [self.ruleset[key] for key in self.priority]
 
+    @cache
+    def get_rules(self):
+        """ [(key, (pattern, guide))] in the order of priority """
+        return [(key, self.ruleset[key]) for key in self.priority]
+
 
 if __name__ == '__main__':
     pc = PeriphrasticConstructions(sort='simple-to-complex')
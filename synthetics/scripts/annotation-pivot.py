@@ -1,7 +1,47 @@
+import os
 import glob
+import sqlite3
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
 from tqdm import tqdm
-from synthetics.utils import load_json
+from synthetics.utils.originals import load_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    layer TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sentences INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    ref_id TEXT NOT NULL,
+    layer TEXT NOT NULL,
+    path TEXT NOT NULL,
+    form TEXT,
+    PRIMARY KEY (ref_id, layer)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sentences_by_path ON sentences (path);
+CREATE TABLE IF NOT EXISTS completeness (
+    ref_id TEXT PRIMARY KEY,
+    layers INTEGER NOT NULL,
+    texts INTEGER NOT NULL,
+    complete INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS completeness_by_complete ON completeness (complete, ref_id);
+"""
+
+
+def scan_file(job: tuple[str, str]) -> tuple[str, str, list[tuple[str, str]]]:
+    """ worker of process pool: (layer, filename) → (layer, filename, [(ref_id, form), ...]) """
+    layer, filename = job
+    rows = []
+    for document_instance in load_json(filename)['document']:
+        for sentence_instance in document_instance['sentence']:
+            rows.append((sentence_instance['id'], sentence_instance['form']))
+    return layer, filename, rows
 
 
 class AnnotationPivot:
@@ -29,47 +69,130 @@ class AnnotationPivot:
 
 
 class AnnotationPivotIndexer:
-    def __init__(self, layer_dirs: dict[str, str], file_extension='json'):
+    def __init__(self, layer_dirs: dict[str, str], file_extension='json', database: str = 'annotation-pivot.db'):
+        """
+        indexes which layers (and files) each sentence is annotated in, persisted in a SQLite database.
+        re-indexing is incremental, only files added, removed or modified (by mtime and size) since are scanned.
+        :param layer_dirs: {layer: directory of layer files}
+        :param file_extension: extension of layer files
+        :param database: filename of SQLite database
+        """
         self.layer_dirs = layer_dirs
-        self.layer_files = {k: glob.glob(v + f'\\*.{file_extension}') for k, v in layer_dirs.items()}
-        self.annotations = dict()
-        self.complete_items = None
-        self.complete_dirs = set()
+        self.layer_files = {k: sorted(glob.glob(os.path.join(v, f'*.{file_extension}'))) for k, v in layer_dirs.items()}
+        self.database = database
+        self.connection = sqlite3.connect(database)
+        self.connection.executescript(SCHEMA)
 
     def __repr__(self):
         layers = tuple(self.layer_dirs.keys())
-        return f'<{self.__class__.__name__} → {len(layers)} layers: {layers}>'
-
-    def index(self):
-        counts = defaultdict(int)
-        layers_set = set()
-
+        return f'<{self.__class__.__name__} → {len(layers)} layers: {layers}, database: {self.database}>'
+
+    def close(self):
+        self.connection.close()
+
+    def outdated_files(self) -> tuple[list[tuple[str, str]], list[str]]:
+        """
+        :return: ([(layer, filename) to be scanned], [filenames to be removed from the index])
+        """
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in self.connection.execute(
+            'SELECT path, mtime_ns, size FROM files'
+        )}
+        to_scan, on_disk = [], set()
         for layer, files in self.layer_files.items():
-            layers_set.add(layer)
-            for filename in tqdm(files, desc=f'- indexing {len(files)} files from `{layer}`({self.layer_dirs[layer]})'):
-                for document_instance in load_json(filename)['document']:
-                    for sentence_instance in document_instance['sentence']:
-                        ref_id = sentence_instance['id']
-                        text = sentence_instance['form']
-                        if ref_id in self.annotations:
-                            pivot = self.annotations[ref_id]
-                            pivot.append(layer=layer, locator=filename, text=text)
-                        else:
-                            pivot = AnnotationPivot(ref_id=ref_id)
-                            pivot.append(layer=layer, locator=filename, text=text)
-                            self.annotations[ref_id] = pivot
-
-        for key in self.annotations:
-            layers = self.annotations[key].get_layers()
-            self.annotations[key].complete = True if set(layers) == layers_set else False
-            counts['-'.join(layers)] += 1
-
-        self.complete_items = {k: v for k, v in self.annotations.items() if v.complete}
-
-        for k, v in tqdm(self.complete_items.items(), desc=f'- aggregating file paths of `complete` files'):
-            self.complete_dirs.update(v.get_related_dirs())
-
-        print(f'- {len(self.annotations)} annotations so far: {dict(counts)}')
+            for filename in files:
+                on_disk.add(filename)
+                stat = os.stat(filename)
+                if indexed.get(filename) != (stat.st_mtime_ns, stat.st_size):
+                    to_scan.append((layer, filename))
+        return to_scan, [path for path in indexed if path not in on_disk]
+
+    def index(self, processes: Optional[int] = None, chunksize: int = 4):
+        """
+        :param processes: number of worker processes, `os.cpu_count()` if None. files are scanned serially if 1.
+        :param chunksize: number of files sent to a worker at once
+        """
+        to_scan, removed = self.outdated_files()
+        layers = sorted(self.layer_files)
+        full = self.get_meta('layers') != ','.join(layers)
+        print(f'- {len(to_scan)} files to be (re)indexed, {len(removed)} files to be removed from `{self.database}`')
+
+        cursor = self.connection.cursor()
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS touched (ref_id TEXT PRIMARY KEY) WITHOUT ROWID')
+        cursor.execute('DELETE FROM touched')
+        for path in removed + [filename for _, filename in to_scan]:
+            cursor.execute('INSERT OR IGNORE INTO touched SELECT ref_id FROM sentences WHERE path = ?', (path, ))
+            cursor.execute('DELETE FROM sentences WHERE path = ?', (path, ))
+            cursor.execute('DELETE FROM files WHERE path = ?', (path, ))
+
+        if to_scan:
+            processes = processes or os.cpu_count()
+            if processes > 1:
+                executor = ProcessPoolExecutor(max_workers=processes)
+                results = executor.map(scan_file, to_scan, chunksize=chunksize)
+            else:
+                executor = None
+                results = map(scan_file, to_scan)
+            for layer, filename, rows in tqdm(results, total=len(to_scan), desc=f'- indexing {len(to_scan)} files'):
+                stat = os.stat(filename)
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO sentences (ref_id, layer, path, form) VALUES (?, ?, ?, ?)',
+                    [(ref_id, layer, filename, form) for ref_id, form in rows]
+                )
+                cursor.executemany('INSERT OR IGNORE INTO touched VALUES (?)', [(ref_id, ) for ref_id, _ in rows])
+                cursor.execute(
+                    'INSERT OR REPLACE INTO files (path, layer, mtime_ns, size, sentences) VALUES (?, ?, ?, ?, ?)',
+                    (filename, layer, stat.st_mtime_ns, stat.st_size, len(rows))
+                )
+            if executor:
+                executor.shutdown()
+
+        # completeness is recomputed only for touched sentences, or for all if the set of layers has changed.
+        scope = '' if full else 'WHERE ref_id IN (SELECT ref_id FROM touched)'
+        cursor.execute(f'DELETE FROM completeness {scope}')
+        cursor.execute(
+            f'INSERT INTO completeness (ref_id, layers, texts, complete) '
+            f'SELECT ref_id, COUNT(*), COUNT(DISTINCT form), COUNT(*) = ? FROM sentences {scope} GROUP BY ref_id',
+            (len(layers), )
+        )
+        self.set_meta('layers', ','.join(layers), cursor=cursor)
+        self.connection.commit()
+
+        counts = dict(self.connection.execute('SELECT layers, COUNT(*) FROM completeness GROUP BY layers'))
+        print(f'- {sum(counts.values())} annotations so far, by the number of layers: {counts}')
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key, )).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str, cursor: Optional[sqlite3.Cursor] = None):
+        (cursor or self.connection).execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def complete_items(self, limit: Optional[int] = None) -> Iterator[str]:
+        """ ref_ids of sentences annotated in all layers, by the index on `completeness (complete, ref_id)` """
+        query = 'SELECT ref_id FROM completeness WHERE complete = 1 ORDER BY ref_id'
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        for (ref_id, ) in self.connection.execute(query):
+            yield ref_id
+
+    def count_complete(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM completeness WHERE complete = 1').fetchone()[0]
+
+    def complete_dirs(self) -> set[str]:
+        """ layer files which have any of complete sentences """
+        return {path for (path, ) in self.connection.execute(
+            'SELECT DISTINCT s.path FROM completeness c JOIN sentences s ON s.ref_id = c.ref_id WHERE c.complete = 1'
+        )}
+
+    def get_pivot(self, ref_id: str) -> Optional[AnnotationPivot]:
+        rows = self.connection.execute('SELECT layer, path, form FROM sentences WHERE ref_id = ?', (ref_id, )).fetchall()
+        if not rows:
+            return None
+        pivot = AnnotationPivot(ref_id=ref_id)
+        for layer, path, form in rows:
+            pivot.append(layer=layer, locator=path, text=form)
+        pivot.complete = len(pivot) == len(self.layer_files)
+        return pivot
 
 
 if __name__ == '__main__':
@@ -80,5 +203,7 @@ if __name__ == '__main__':
 
     indexer.index()
 
-    print(len(indexer.complete_dirs), indexer.complete_dirs)
+    complete_dirs = indexer.complete_dirs()
+    print(indexer.count_complete(), len(complete_dirs), complete_dirs)
     print(indexer.layer_files)
+    indexer.close()
@@ -0,0 +1,15 @@
+import sys
+import time
+from synthetics.utils.outputs import OutputDiff
+
+if __name__ == '__main__':
+    # python output-diff.py before.outputs.txt after.outputs.txt [diff.txt]
+    before_file, after_file = sys.argv[1], sys.argv[2]
+    report_file = sys.argv[3] if len(sys.argv) > 3 else 'outputs.diff.txt'
+
+    start = time.time()
+    diff = OutputDiff(before_file=before_file, after_file=after_file).run()
+    print(f'- comparing `{before_file}` and `{after_file}`, {time.time() - start:.2f} sec lapsed')
+    for key, count in diff.counts().items():
+        print(f'{key}\t{count}')
+    diff.to_text(report_file)
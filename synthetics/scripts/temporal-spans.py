@@ -0,0 +1,20 @@
+from synthetics.utils.originals import load_pickle
+from synthetics.primitives.corpus import Corpus
+from synthetics.rules.date_entities import TemporalSpanTable
+
+if __name__ == '__main__':
+    corpus: Corpus = load_pickle('../corpus.pkl')
+
+    # every mention of the EL layer (or NER if missing) as the builder does, distinct spans are normalized only once
+    spans = []
+    for snt in corpus.iter_sentences():
+        layer = snt.annotations.el or snt.annotations.ner
+        if layer:
+            spans.extend([(ne.label, ne.form) for ne in layer.tolist()])
+
+    table = TemporalSpanTable().from_spans(spans)
+    print(table)
+
+    # `temporal-spans.json` is consulted by `graph.warm_up()` if it is located in the working directory.
+    table.to_json('temporal-spans.json')
+    table.to_tsv('temporal-spans.tsv')
@@ -1,4 +1,8 @@
+import re
 import math
+from functools import lru_cache
+from typing import Iterable, Union
+from synthetics.utils.trie import Trie
 
 """
 Developed by Junseong Kim, Atlas Guide
@@ -7,7 +11,8 @@ Korean to number
 
 Forked & Modified by WieeRd
 
-# TODO: bug - consecutive arabic numbers: ex) 12만2천
+Tokens are looked up on a longest-match trie, so "일곱" and "일흔" are no more shadowed by "일".
+A run of arabic digits is a single coefficient token. ex) 12만2천 → 122000, 1,500 → 1500
 """
 
 numbers = [
@@ -84,22 +89,52 @@ float_nums = [
 ]
 
 
-def kr2num(kr_str):
+def token(value: Union[int, float]) -> tuple[Union[int, float], bool, bool]:
+    """
+    (value, is_natural, is_big_unit) of a token, flags are computed once here instead of on every call.
+    natural tokens are powers of ten (1, 10, 100, ...) and big units are 만, 억, 조, 경, 해.
+    """
+    is_natural = value > 0 and math.log10(value).is_integer()
+    is_big_unit = is_natural and math.log10(value) > 3 and (math.log10(value) - 4) % 4 == 0
+    return value, is_natural, is_big_unit
+
+
+NUMBERS = Trie([(number, token(value)) for number, value in numbers])
+FLOAT_NUMS = dict(float_nums)
+DIGITS = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?')
+
+
+def tokenize(kr_str: str) -> list[tuple[Union[int, float], bool, bool]]:
     decode_result = []
+    index = 0
+    while index < len(kr_str):
+        digits = DIGITS.match(kr_str, index)
+        if digits and len(digits.group()) > 1:
+            # consecutive arabic digits are a single coefficient, they were summed up digit by digit before
+            run = digits.group().replace(',', '')
+            decode_result.append((float(run) if '.' in run else int(run), False, False))
+            index = digits.end()
+            continue
+        found = NUMBERS.longest_prefix(kr_str, start=index)
+        if found:
+            index, value = found
+            decode_result.append(value)
+        else:
+            index += 1
+    return decode_result
+
+
+def parse(kr_str: str) -> Union[int, float]:
     result = 0
     temp_result = 0
-    index = 0
 
     float_dividing = kr_str.split("점")
     float_result = ""
     if len(float_dividing) == 2:
         kr_str = float_dividing[0]
-        float_num = float_dividing[1]
-        for c in float_num:
-            for float_num, float_value in float_nums:
-                if c == float_num:
-                    float_result += str(float_value)
-                    break
+        for c in float_dividing[1]:
+            if c in FLOAT_NUMS:
+                float_result += str(FLOAT_NUMS[c])
         if len(float_result) == 0:
             float_result = 0.0
         else:
@@ -107,19 +142,10 @@ def kr2num(kr_str):
     else:
         float_result = 0.0
 
-    while index < len(kr_str):
-        for number, true_value in numbers:
-            if index + len(number) <= len(kr_str):
-                if kr_str[index:index + len(number)] == number:
-                    decode_result.append((true_value, math.log10(true_value).is_integer()))
-                    if len(number) == 2:
-                        index += 1
-                    break
-        index += 1
-
-    for index, (number, is_natural) in enumerate(decode_result):
+    decode_result = tokenize(kr_str)
+    for index, (number, is_natural, is_big_unit) in enumerate(decode_result):
         if is_natural:
-            if math.log10(number) > 3 and (math.log10(number) - 4) % 4 == 0:
+            if is_big_unit:
                 result += temp_result * number
                 temp_result = 0
 
@@ -136,7 +162,7 @@ def kr2num(kr_str):
                 temp_result += number
             elif not decode_result[index + 1][1]:
                 temp_result += number
-            elif math.log10(decode_result[index + 1][0]) > 3 and (math.log10(decode_result[index + 1][0]) - 4) % 4 == 0:
+            elif decode_result[index + 1][2]:
                 temp_result += number
 
     result += temp_result
@@ -145,3 +171,19 @@ def kr2num(kr_str):
         result += float_result
 
     return result
+
+
+@lru_cache(maxsize=65_536)
+def kr2num(kr_str: str) -> Union[int, float]:
+    """
+    kr2num("12만2천")
+    >> 122000
+    :param kr_str: numeral expression in hangul and/or arabic digits
+    :return: int, or float if it has a fractional part
+    """
+    return parse(kr_str)
+
+
+def kr2num_batch(spans: Iterable[str]) -> list[Union[int, float]]:
+    """ kr2num over spans, repeated spans are served from the memo of `kr2num` """
+    return [kr2num(span) for span in spans]
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 100_000):
+        """
+        bounded mapping with least-recently-used eviction and hit/miss/eviction counters. it is thread-safe.
+        :param maxsize: max number of items, the least recently used one is evicted beyond it.
+        """
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key: Hashable):
+        return key in self.items
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.stats()}>'
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self.items),
+            maxsize=self.maxsize,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0
+        )
@@ -2,6 +2,7 @@ import os
 import json
 import glob
 import pickle
+import hashlib
 import datetime
 from os.path import exists
 from typing import Any, Union, Iterable
@@ -57,6 +58,43 @@ def load_pickle(filename: str):
         return pickle.load(fp)
 
 
+# root of the package, sources are identified by paths relative to it in content hashes
+PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def relative_path(filename: str) -> str:
+    """ path relative to the package for its sources, the basename for files out of it (ex. data files) """
+    path = os.path.abspath(filename)
+    try:
+        inside = os.path.commonpath([path, PACKAGE]) == PACKAGE
+    except ValueError:
+        # another drive on Windows
+        inside = False
+    return os.path.relpath(path, PACKAGE).replace(os.sep, '/') if inside else os.path.basename(path)
+
+
+def file_signature(files: Iterable[str], content_hash: bool = False) -> str:
+    """
+    fingerprint of a set of files to invalidate caches derived from them
+    :param files: filenames
+    :param content_hash: hash only the contents of files and their paths relative to the package, so that the
+                         signature survives checkouts, touches and copies of the repository. otherwise only
+                         (path, mtime, size) are considered, which is cheap for large data files.
+    :return: hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if content_hash:
+        for name, filename in sorted([(relative_path(f), f) for f in files]):
+            with open(filename, 'rb') as fp:
+                digest.update(f'{name}|'.encode('utf-8'))
+                digest.update(hashlib.blake2b(fp.read(), digest_size=16).digest())
+        return digest.hexdigest()
+    for filename in sorted(files):
+        stat = os.stat(filename)
+        digest.update(f'{filename}|{stat.st_mtime_ns}|{stat.st_size}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
 def timestamp():
     return datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
 
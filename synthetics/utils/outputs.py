@@ -0,0 +1,349 @@
+import os
+import re
+import mmap
+import hashlib
+from collections import Counter
+from typing import Iterator, Optional
+
+"""
+Readers of synthesized output files (ex. `10-45.outputs.txt`)
+
+an output file is a sequence of blocks separated by blank lines, and each block is made of metadata lines
+(`# ::key value`) followed by a penman-like graph. the graphs are not always decodable by penman, since
+variables of amalgamated nodes are tuples (ex. "(7, 8, 9)"), so they are read by a tolerant parser here.
+"""
+
+METADATA = re.compile(r'^# ::(\S+)(?: (.*))?$')
+
+# metadata which differs run by run even if the graph is the same
+VOLATILE = ('update', )
+
+# variables of amalgamated nodes are python tuples rendered as they are, ex. "(7, 8, 9)" or "(7,)"
+GRAPH_TOKENS = re.compile(
+    r'\s*(?:'
+    r'(?P<string>"(?:[^"\\]|\\.)*")'
+    r'|(?P<tuple>\([^()/":\s]+,(?:\s*[^()/":\s]+,?)*\))'
+    r'|(?P<open>\()'
+    r'|(?P<close>\))'
+    r'|(?P<slash>/)'
+    r'|(?P<role>:[^\s()"]+)'
+    r'|(?P<symbol>[^\s()"]+)'
+    r')'
+)
+ALIGNMENT = re.compile(r'~w\.([\d,]+)$')
+
+# roles of which `-of` suffix does not mean the inversion
+NON_INVERTIBLE = frozenset({':consist-of', ':prep-out-of', ':prep-on-behalf-of'})
+
+
+class Block:
+    def __init__(self, metadata: dict[str, str], graph: str, span: tuple[int, int] = (0, 0)):
+        """
+        a single graph with its metadata in output file
+        :param metadata: {key: value} of `# ::key value` lines, in the order of lines
+        :param graph: text of graph
+        :param span: (begin, end) byte offsets of the block in the file
+        """
+        self.metadata = metadata
+        self.graph = graph
+        self.span = span
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → id: {self.ref_id}, span: {self.span}>'
+
+    @property
+    def ref_id(self) -> Optional[str]:
+        return self.metadata.get('id', None)
+
+
+def parse_block(text: str, span: tuple[int, int] = (0, 0)) -> Block:
+    metadata, graph = dict(), []
+    for line in text.split('\n'):
+        matched = METADATA.match(line) if not graph else None
+        if matched:
+            metadata[matched.group(1)] = matched.group(2) or ''
+        elif line.strip() and not line.startswith('#'):
+            graph.append(line)
+    return Block(metadata=metadata, graph='\n'.join(graph), span=span)
+
+
+def iter_raw_blocks(filename: str) -> Iterator[tuple[bytes, tuple[int, int]]]:
+    """ streams (raw bytes, (begin, end)) of blocks without decoding them """
+    with open(filename, 'rb') as fp:
+        begin, position, lines = 0, 0, []
+        for line in fp:
+            if line.strip():
+                if not lines:
+                    begin = position
+                lines.append(line)
+            elif lines:
+                yield b''.join(lines), (begin, position)
+                lines = []
+            position += len(line)
+        if lines:
+            yield b''.join(lines), (begin, position)
+
+
+def iter_blocks(filename: str) -> Iterator[Block]:
+    for raw, span in iter_raw_blocks(filename):
+        yield parse_block(raw.decode('utf-8'), span=span)
+
+
+def index_blocks(filename: str) -> dict[str, tuple[int, int]]:
+    """
+    byte offsets of blocks by `::id`, read without decoding graphs
+    :return: {snt_id: (begin, end)}
+    """
+    index = dict()
+    for raw, span in iter_raw_blocks(filename):
+        for line in raw.split(b'\n'):
+            if line.startswith(b'# ::id '):
+                index[line[7:].strip().decode('utf-8')] = span
+                break
+    return index
+
+
+class BlockReader:
+    def __init__(self, filename: str, index: Optional[dict[str, tuple[int, int]]] = None):
+        """
+        random access to blocks of an output file by `::id`, over a memory-mapped file
+        :param filename: output file
+        :param index: offsets by `index_blocks()`, indexed again if None
+        """
+        self.filename = filename
+        self.index = index_blocks(filename) if index is None else index
+        self.fp = open(filename, 'rb')
+        self.buffer = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(filename) else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, snt_id: str):
+        return snt_id in self.index
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.filename}, blocks: {len(self)}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, snt_id: str) -> Optional[Block]:
+        span = self.index.get(snt_id, None)
+        return self.read(span) if span else None
+
+    def read(self, span: tuple[int, int]) -> Block:
+        begin, end = span
+        return parse_block(self.buffer[begin:end].decode('utf-8'), span=span)
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+        self.fp.close()
+
+
+class ParsedGraph:
+    def __init__(self):
+        """
+        triples of a graph for comparison. inverted roles (`:ARG0-of`) are normalized to the forward ones.
+        instances: {variable: concept without alignment}
+        attributes: [(variable, role, constant)], including (top, ":TOP", concept) as Smatch does
+        relations: [(source variable, role, target variable)]
+        anchors: {variable: word ids of `~w.` alignment}
+        """
+        self.top: Optional[str] = None
+        self.instances: dict[str, str] = dict()
+        self.attributes: list[tuple[str, str, str]] = list()
+        self.relations: list[tuple[str, str, str]] = list()
+        self.anchors: dict[str, frozenset[int]] = dict()
+
+    def __len__(self):
+        return len(self.instances) + len(self.attributes) + len(self.relations)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → top: {self.top}, instances: {len(self.instances)}, triples: {len(self)}>'
+
+
+def parse_graph(text: str) -> ParsedGraph:
+    """
+    tolerant parser of penman-like graph. tuple variables, unknown reentrancies and unbalanced brackets
+    do not raise, so that a partially broken graph is still compared by what is readable.
+    :param text: graph without metadata
+    :return: ParsedGraph
+    """
+    graph = ParsedGraph()
+    tokens = [(m.lastgroup, m.group(m.lastgroup)) for m in GRAPH_TOKENS.finditer(text) if m.lastgroup]
+    stack: list[str] = []
+    role: Optional[str] = None
+    values: list[tuple[str, str, str, str]] = []  # (source, role, kind, value) resolved after all instances
+    n = 0
+    while n < len(tokens):
+        kind, token = tokens[n]
+        if kind == 'open':
+            # `(var / concept`, where var may be a tuple
+            variable, concept, m = None, None, n + 1
+            if m < len(tokens) and tokens[m][0] in ('symbol', 'tuple'):
+                variable = tokens[m][1]
+                m += 1
+            if m < len(tokens) and tokens[m][0] == 'slash':
+                m += 1
+                if m < len(tokens) and tokens[m][0] in ('symbol', 'string', 'tuple'):
+                    concept = tokens[m][1]
+                    m += 1
+            if variable is None:
+                variable = f'_{n}'
+            if concept is not None:
+                aligned = ALIGNMENT.search(concept)
+                if aligned:
+                    graph.anchors[variable] = frozenset(int(i) for i in aligned.group(1).split(',') if i)
+                    concept = concept[:aligned.start()]
+                graph.instances[variable] = concept
+            if stack and role:
+                values.append((stack[-1], role, 'variable', variable))
+            elif not stack and graph.top is None:
+                graph.top = variable
+            stack.append(variable)
+            role = None
+            n = m
+            continue
+        if kind == 'close':
+            if stack:
+                stack.pop()
+            role = None
+        elif kind == 'role':
+            role = token
+        elif role and stack:
+            values.append((stack[-1], role, kind, token))
+            role = None
+        n += 1
+
+    for source, role, kind, value in values:
+        if kind == 'string':
+            constant = value
+        else:
+            constant = ALIGNMENT.sub('', value)
+        if kind in ('variable', 'tuple', 'symbol') and constant in graph.instances:
+            if role.endswith('-of') and role not in NON_INVERTIBLE:
+                graph.relations.append((constant, role[:-3], source))
+            else:
+                graph.relations.append((source, role, constant))
+        else:
+            graph.attributes.append((source, role, constant))
+    if graph.top is not None and graph.top in graph.instances:
+        graph.attributes.append((graph.top, ':TOP', graph.instances[graph.top]))
+    return graph
+
+
+def fingerprint_block(raw: bytes, volatile: tuple[str, ...] = VOLATILE) -> tuple[Optional[str], bytes]:
+    """
+    digest of a block without decoding it, ignoring volatile metadata and trailing blanks of lines
+    :param raw: raw bytes of block
+    :param volatile: metadata keys to be ignored
+    :return: (snt_id, digest)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    snt_id = None
+    prefixes = tuple(f'# ::{key}'.encode('utf-8') for key in volatile)
+    for line in raw.split(b'\n'):
+        line = line.rstrip()
+        if line.startswith(b'# ::id '):
+            snt_id = line[7:].strip().decode('utf-8')
+        elif line.startswith(prefixes):
+            continue
+        digest.update(line)
+        digest.update(b'\n')
+    return snt_id, digest.digest()
+
+
+def change_types(before: Block, after: Block, volatile: tuple[str, ...] = VOLATILE) -> list[str]:
+    """
+    kinds of changes between two blocks of the same `::id`
+    :return: any of "metadata", "concepts", "relations", "attributes", or "structure" if the graphs differ
+             in none of them (ex. rewired edges or reordered nodes)
+    """
+    types = []
+    if {k: v for k, v in before.metadata.items() if k not in volatile} != \
+            {k: v for k, v in after.metadata.items() if k not in volatile}:
+        types.append('metadata')
+    if before.graph != after.graph:
+        old, new = parse_graph(before.graph), parse_graph(after.graph)
+        if Counter(old.instances.values()) != Counter(new.instances.values()):
+            types.append('concepts')
+        if Counter(role for _, role, _ in old.relations) != Counter(role for _, role, _ in new.relations):
+            types.append('relations')
+        # `:TOP` attribute repeats the concept of the top, which is counted in "concepts" already
+        if Counter((role, value) for _, role, value in old.attributes if role != ':TOP') != \
+                Counter((role, value) for _, role, value in new.attributes if role != ':TOP'):
+            types.append('attributes')
+        if not types or types == ['metadata']:
+            types.append('structure')
+    return types
+
+
+class OutputDiff:
+    def __init__(self, before_file: str, after_file: str, volatile: tuple[str, ...] = VOLATILE):
+        """
+        streaming diff of two output files by `::id`. blocks are compared by digests first, so that only
+        changed ones are decoded and parsed to tell the kinds of changes.
+        :param before_file: output file of the previous run
+        :param after_file: output file of the new run
+        :param volatile: metadata keys to be ignored (ex. "update")
+        """
+        self.before_file = before_file
+        self.after_file = after_file
+        self.volatile = volatile
+        self.added: list[str] = []
+        self.removed: list[str] = []
+        self.changed: dict[str, list[str]] = dict()  # {snt_id: change types}
+        self.unchanged: int = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → {self.counts()}>'
+
+    def run(self):
+        # digests and offsets of the previous run, only 16 bytes and a span per graph are kept in memory
+        before: dict[str, tuple[bytes, tuple[int, int]]] = dict()
+        for raw, span in iter_raw_blocks(self.before_file):
+            snt_id, digest = fingerprint_block(raw, volatile=self.volatile)
+            before[snt_id] = (digest, span)
+
+        changed_spans = dict()
+        seen = set()
+        for raw, span in iter_raw_blocks(self.after_file):
+            snt_id, digest = fingerprint_block(raw, volatile=self.volatile)
+            seen.add(snt_id)
+            if snt_id not in before:
+                self.added.append(snt_id)
+            elif before[snt_id][0] == digest:
+                self.unchanged += 1
+            else:
+                changed_spans[snt_id] = (before[snt_id][1], span)
+        self.removed = [snt_id for snt_id in before if snt_id not in seen]
+
+        if changed_spans:
+            with BlockReader(self.before_file, index=dict()) as old, BlockReader(self.after_file, index=dict()) as new:
+                for snt_id, (old_span, new_span) in changed_spans.items():
+                    self.changed[snt_id] = change_types(old.read(old_span), new.read(new_span), volatile=self.volatile)
+        return self
+
+    def counts(self) -> dict[str, int]:
+        by_type = Counter(t for types in self.changed.values() for t in types)
+        return dict(
+            added=len(self.added),
+            removed=len(self.removed),
+            changed=len(self.changed),
+            unchanged=self.unchanged,
+            **{f'changed.{t}': n for t, n in sorted(by_type.items())}
+        )
+
+    def to_text(self, filename: str):
+        """ `+ id` for added, `- id` for removed and `~ id types` for changed graphs """
+        with open(filename, encoding='utf-8', mode='w') as fp:
+            for snt_id in self.added:
+                fp.write(f'+ {snt_id}\n')
+            for snt_id in self.removed:
+                fp.write(f'- {snt_id}\n')
+            for snt_id, types in self.changed.items():
+                fp.write(f'~ {snt_id}\t{",".join(types)}\n')
@@ -0,0 +1,79 @@
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+_VALUE = object()  # key of the value stored in a node, which never collides with characters
+
+
+class Trie:
+    def __init__(self, items: Optional[Iterable[tuple[Sequence, Any]]] = None):
+        """
+        character trie mapping sequences (usually str) to values
+        trie = Trie([('오르', 1), ('오르내리', 2)])
+        trie.longest_prefix('오르내리다')
+        >> (4, 2)
+        :param items: initial (key, value) pairs
+        """
+        self.root: dict = dict()
+        self.size: int = 0
+        for key, value in items or []:
+            self.insert(key, value)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key: Sequence):
+        node = self.find_node(key)
+        return node is not None and _VALUE in node
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} → keys: {self.size}>'
+
+    def insert(self, key: Sequence, value: Any):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, dict())
+        if _VALUE not in node:
+            self.size += 1
+        node[_VALUE] = value
+
+    def find_node(self, key: Sequence) -> Optional[dict]:
+        node = self.root
+        for char in key:
+            node = node.get(char, None)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key: Sequence, default: Any = None) -> Any:
+        node = self.find_node(key)
+        if node is None:
+            return default
+        return node.get(_VALUE, default)
+
+    def prefixes(self, sequence: Sequence, start: int = 0) -> Iterator[tuple[int, Any]]:
+        """
+        walks `sequence` from `start` once, and yields (end, value) of every key which is a prefix of it
+        :return: iterator of (end index of the prefix, value)
+        """
+        node = self.root
+        if _VALUE in node:
+            yield start, node[_VALUE]
+        for end in range(start, len(sequence)):
+            node = node.get(sequence[end], None)
+            if node is None:
+                return
+            if _VALUE in node:
+                yield end + 1, node[_VALUE]
+
+    def longest_prefix(self, sequence: Sequence, start: int = 0) -> Optional[tuple[int, Any]]:
+        """
+        :return: (end index, value) of the longest key which is a prefix of `sequence[start:]`, None if nothing
+        """
+        found = None
+        for found in self.prefixes(sequence, start=start):
+            pass
+        return found
+
+    def shortest_prefix(self, sequence: Sequence, start: int = 0) -> Optional[tuple[int, Any]]:
+        for found in self.prefixes(sequence, start=start):
+            return found
+        return None